@@ -1,19 +1,28 @@
 import base64
 import json
+import os
 import secrets
 
 import click
 from flask import current_app
 from werkzeug.exceptions import NotFound
 
+from core.helper.model_provider_cache import ProviderConfigurationsCache
+from core.model_runtime import model_providers
+from core.model_runtime.model_providers.__base.model_schema_bundle import ModelSchemaBundle
+from core.model_runtime.model_providers.model_provider_factory import ModelProviderFactory
+from core.rag.datasource.keyword.jieba.jieba_postings import JiebaPostings
 from core.rag.datasource.vdb.vector_factory import Vector
 from core.rag.models.document import Document
+from core.tools.provider import builtin as builtin_tool_providers
+from core.tools.tool_manager import ToolManager
+from core.utils.manifest_helper import dump_manifest
 from extensions.ext_database import db
 from libs.helper import email as email_validate
 from libs.password import hash_password, password_pattern, valid_password
 from libs.rsa import generate_key_pair
 from models.account import Tenant
-from models.dataset import Dataset, DatasetCollectionBinding, DocumentSegment
+from models.dataset import Dataset, DatasetCollectionBinding, DatasetKeywordTable, DocumentSegment, Embedding
 from models.dataset import Document as DatasetDocument
 from models.model import (
     Account,
@@ -246,6 +255,9 @@ def reset_encrypt_key_pair():
         ).delete()
         db.session.commit()
 
+        # the private key cached for the tenant is dropped by `generate_key_pair`
+        ProviderConfigurationsCache.invalidate(tenant.id)
+
         click.echo(
             click.style(
                 "Congratulations! "
@@ -689,6 +701,125 @@ def convert_to_agent_apps():
     )
 
 
+@click.command("migrate-embedding-format", help="Rewrite pickled embedding caches to the binary format.")
+@click.option(
+    "--batch-size",
+    default=1000,
+    prompt=False,
+    help="The number of embedding rows to rewrite per commit, Default is 1000.",
+)
+def migrate_embedding_format(batch_size: int):
+    """
+    Rewrite embedding caches stored as pickled float lists to the compact float32 binary format.
+    """
+    click.echo(click.style("Start migrate embedding format.", fg="green"))
+    migrated_count = 0
+    total_count = 0
+    last_id = None
+    while True:
+        query = db.session.query(Embedding).order_by(Embedding.id)
+        if last_id:
+            query = query.filter(Embedding.id > last_id)
+
+        embeddings = query.limit(batch_size).all()
+        if not embeddings:
+            break
+
+        last_id = embeddings[-1].id
+        total_count += len(embeddings)
+        try:
+            for embedding in embeddings:
+                if not embedding.is_legacy_format:
+                    continue
+
+                embedding.set_embedding(embedding.get_embedding())
+                migrated_count += 1
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            click.echo(
+                click.style(
+                    "Migrate embedding format error: {} {}".format(
+                        e.__class__.__name__, str(e)
+                    ),
+                    fg="red",
+                )
+            )
+            return
+
+        click.echo(f"Processed {total_count} embeddings, {migrated_count} migrated.")
+
+    click.echo(
+        click.style(
+            f"Congratulations! Migrated {migrated_count} of {total_count} embeddings.",
+            fg="green",
+        )
+    )
+
+
+@click.command("migrate-keyword-postings", help="Copy jieba keyword tables to the keyword postings store.")
+def migrate_keyword_postings():
+    """
+    Copy keyword tables of the `jieba` keyword store to the `jieba_postings` keyword store.
+    """
+    click.echo(click.style("Start migrate keyword postings.", fg="green"))
+    migrated_count = 0
+    dataset_ids = [row.dataset_id for row in db.session.query(DatasetKeywordTable.dataset_id).all()]
+    for dataset_id in dataset_ids:
+        try:
+            dataset = db.session.query(Dataset).filter(Dataset.id == dataset_id).first()
+            if not dataset or not dataset.dataset_keyword_table:
+                continue
+
+            keyword_table_dict = dataset.dataset_keyword_table.keyword_table_dict
+            if not keyword_table_dict:
+                continue
+
+            JiebaPostings(dataset).import_keyword_table(keyword_table_dict['__data__']['table'])
+            migrated_count += 1
+            click.echo(f"Migrated keyword table of dataset {dataset_id}.")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(
+                click.style(
+                    "Migrate keyword table of dataset {} error: {} {}".format(
+                        dataset_id, e.__class__.__name__, str(e)
+                    ),
+                    fg="red",
+                )
+            )
+            continue
+
+    click.echo(
+        click.style(
+            f"Congratulations! Migrated keyword tables of {migrated_count} datasets.",
+            fg="green",
+        )
+    )
+
+
+@click.command("build-manifests", help="Build the manifests of model and tool providers and the model schema bundle.")
+def build_manifests():
+    """
+    Build the manifests of model providers and builtin tools from their yaml files,
+    providers are then indexed without scanning their folders and loaded on first use.
+    Also bundle the provider and model schemas, so they are not parsed from the yaml files at runtime.
+    """
+    manifests = [
+        (os.path.dirname(model_providers.__file__), ModelProviderFactory.build_manifest()),
+        (os.path.dirname(builtin_tool_providers.__file__), ToolManager.build_builtin_providers_manifest()),
+    ]
+    for folder_path, manifest in manifests:
+        manifest_file_name = dump_manifest(folder_path, manifest)
+        click.echo(f"Built manifest {manifest_file_name}.")
+
+    bundle_file_name = ModelSchemaBundle.dump()
+    click.echo(f"Built model schema bundle {bundle_file_name}.")
+
+    click.echo(click.style("Congratulations! Manifests built.", fg="green"))
+
+
 def register_commands(app):
     app.cli.add_command(register)
     app.cli.add_command(reset_password)
@@ -696,4 +827,7 @@ def register_commands(app):
     app.cli.add_command(reset_encrypt_key_pair)
     app.cli.add_command(vdb_migrate)
     app.cli.add_command(convert_to_agent_apps)
+    app.cli.add_command(migrate_embedding_format)
+    app.cli.add_command(migrate_keyword_postings)
     app.cli.add_command(create_workspace)
+    app.cli.add_command(build_manifests)
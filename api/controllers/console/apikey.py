@@ -3,6 +3,7 @@ from flask_login import current_user
 from flask_restful import Resource, fields, marshal_with
 from werkzeug.exceptions import Forbidden
 
+from core.helper.api_token_cache import ApiTokenCache, ApiTokenLastUsedAtBuffer
 from extensions.ext_database import db
 from libs.helper import TimestampField
 from libs.login import login_required
@@ -55,6 +56,13 @@ class BaseApiKeyListResource(Resource):
         keys = db.session.query(ApiToken). \
             filter(ApiToken.type == self.resource_type, getattr(ApiToken, self.resource_id_field) == resource_id). \
             all()
+
+        # last used times not written to the database yet
+        last_used_at = ApiTokenLastUsedAtBuffer.get([key.id for key in keys])
+        for key in keys:
+            if key.id in last_used_at:
+                key.last_used_at = last_used_at[key.id]
+
         return {"items": keys}
 
     @marshal_with(api_key_fields)
@@ -111,9 +119,13 @@ class BaseApiKeyResource(Resource):
         if key is None:
             flask_restful.abort(404, message='API key not found')
 
+        # the key is expired once deleted
+        api_token_cache = ApiTokenCache(key.type, key.token)
         db.session.query(ApiToken).filter(ApiToken.id == api_key_id).delete()
         db.session.commit()
 
+        api_token_cache.delete()
+
         return {'result': 'success'}, 204
 
 
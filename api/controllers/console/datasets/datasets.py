@@ -12,6 +12,7 @@ from controllers.console.datasets.error import DatasetNameDuplicateError
 from controllers.console.setup import setup_required
 from controllers.console.wraps import account_initialization_required
 from core.errors.error import LLMBadRequestError, ProviderTokenNotInitError
+from core.helper.api_token_cache import ApiTokenCache, ApiTokenLastUsedAtBuffer
 from core.indexing_runner import IndexingRunner
 from core.model_runtime.entities.model_entities import ModelType
 from core.provider_manager import ProviderManager
@@ -393,6 +394,13 @@ class DatasetApiKeyApi(Resource):
         keys = db.session.query(ApiToken). \
             filter(ApiToken.type == self.resource_type, ApiToken.tenant_id == current_user.current_tenant_id). \
             all()
+
+        # last used times not written to the database yet
+        last_used_at = ApiTokenLastUsedAtBuffer.get([key.id for key in keys])
+        for key in keys:
+            if key.id in last_used_at:
+                key.last_used_at = last_used_at[key.id]
+
         return {"items": keys}
 
     @setup_required
@@ -446,9 +454,13 @@ class DatasetApiDeleteApi(Resource):
         if key is None:
             flask_restful.abort(404, message='API key not found')
 
+        # the key is expired once deleted
+        api_token_cache = ApiTokenCache(key.type, key.token)
         db.session.query(ApiToken).filter(ApiToken.id == api_key_id).delete()
         db.session.commit()
 
+        api_token_cache.delete()
+
         return {'result': 'success'}, 204
 
 
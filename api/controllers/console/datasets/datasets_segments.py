@@ -422,10 +422,18 @@ class DatasetDocumentSegmentBatchImportApi(Resource):
         if cache_result is None:
             raise ValueError("The job is not exist.")
 
-        return {
+        # a processing job reports its progress as `processing:<processed>/<total>`
+        job_status, _, progress = cache_result.decode().partition(':')
+        result = {
             'job_id': job_id,
-            'job_status': cache_result.decode()
-        }, 200
+            'job_status': job_status
+        }
+        if progress:
+            processed_count, _, total_count = progress.partition('/')
+            result['processed_count'] = int(processed_count)
+            result['total_count'] = int(total_count)
+
+        return result, 200
 
 
 api.add_resource(DatasetDocumentSegmentListApi,
@@ -10,6 +10,7 @@ from flask_restful import Resource
 from pydantic import BaseModel
 from werkzeug.exceptions import Forbidden, NotFound, Unauthorized
 
+from core.helper.api_token_cache import ApiTokenCache, ApiTokenLastUsedAtBuffer
 from extensions.ext_database import db
 from libs.login import _get_user
 from models.account import Account, Tenant, TenantAccountJoin, TenantStatus
@@ -180,16 +181,29 @@ def validate_and_get_api_token(scope=None):
     if auth_scheme != 'bearer':
         raise Unauthorized("Authorization scheme must be 'Bearer'")
 
-    api_token = db.session.query(ApiToken).filter(
-        ApiToken.token == auth_token,
-        ApiToken.type == scope,
-    ).first()
-
-    if not api_token:
-        raise Unauthorized("Access token is invalid")
-
-    api_token.last_used_at = datetime.now(timezone.utc).replace(tzinfo=None)
-    db.session.commit()
+    api_token_cache = ApiTokenCache(scope, auth_token)
+    cached_api_token = api_token_cache.get()
+    if cached_api_token:
+        # not bound to the session, only the resolved app and workspace are read from it
+        api_token = ApiToken(**cached_api_token, token=auth_token)
+    else:
+        api_token = db.session.query(ApiToken).filter(
+            ApiToken.token == auth_token,
+            ApiToken.type == scope,
+        ).first()
+
+        if not api_token:
+            raise Unauthorized("Access token is invalid")
+
+        api_token_cache.set({
+            'id': api_token.id,
+            'app_id': api_token.app_id,
+            'tenant_id': api_token.tenant_id,
+            'type': api_token.type,
+        })
+
+    # written to the database by the periodic task update_api_token_last_used_at_task
+    ApiTokenLastUsedAtBuffer.set(api_token.id, datetime.now(timezone.utc).replace(tzinfo=None))
 
     return api_token
 
@@ -1,6 +1,5 @@
 import logging
 import os
-import time
 from typing import Optional, cast
 
 from core.app.apps.advanced_chat.app_config_manager import AdvancedChatAppConfig
@@ -13,6 +12,7 @@ from core.app.entities.app_invoke_entities import (
     InvokeFrom,
 )
 from core.app.entities.queue_entities import QueueAnnotationReplyEvent, QueueStopEvent, QueueTextChunkEvent
+from core.model_runtime.utils.text_stream import iter_text_chunks
 from core.moderation.base import ModerationException
 from core.workflow.entities.node_entities import SystemVariable
 from core.workflow.nodes.base_node import UserFrom
@@ -202,14 +202,13 @@ class AdvancedChatAppRunner(AppRunner):
         """
         if stream:
             index = 0
-            for token in text:
+            for token in iter_text_chunks(text):
                 queue_manager.publish(
                     QueueTextChunkEvent(
                         text=token
                     ), PublishFrom.APPLICATION_MANAGER
                 )
                 index += 1
-                time.sleep(0.01)
 
         queue_manager.publish(
             QueueStopEvent(stopped_by=stopped_by),
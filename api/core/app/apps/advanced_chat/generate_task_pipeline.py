@@ -39,6 +39,7 @@ from core.app.task_pipeline.workflow_cycle_manage import WorkflowCycleManage
 from core.file.file_obj import FileVar
 from core.model_runtime.entities.llm_entities import LLMUsage
 from core.model_runtime.utils.encoders import jsonable_encoder
+from core.model_runtime.utils.text_stream import iter_text_chunks
 from core.workflow.entities.node_entities import NodeType, SystemVariable
 from core.workflow.nodes.answer.answer_node import AnswerNode
 from core.workflow.nodes.answer.entities import TextGenerateRouteChunk, VarGenerateRouteChunk
@@ -48,7 +49,6 @@ from models.account import Account
 from models.model import Conversation, EndUser, Message
 from models.workflow import (
     Workflow,
-    WorkflowNodeExecution,
     WorkflowRunStatus,
 )
 
@@ -171,119 +171,126 @@ class AdvancedChatAppGenerateTaskPipeline(BasedGenerateTaskPipeline, WorkflowCyc
         Process stream response.
         :return:
         """
-        for message in self._queue_manager.listen():
-            event = message.event
-
-            if isinstance(event, QueueErrorEvent):
-                err = self._handle_error(event, self._message)
-                yield self._error_to_stream_response(err)
-                break
-            elif isinstance(event, QueueWorkflowStartedEvent):
-                workflow_run = self._handle_workflow_start()
-
-                self._message = db.session.query(Message).filter(Message.id == self._message.id).first()
-                self._message.workflow_run_id = workflow_run.id
-
-                db.session.commit()
-                db.session.refresh(self._message)
-                db.session.close()
-
-                yield self._workflow_start_to_stream_response(
-                    task_id=self._application_generate_entity.task_id,
-                    workflow_run=workflow_run
-                )
-            elif isinstance(event, QueueNodeStartedEvent):
-                workflow_node_execution = self._handle_node_start(event)
+        try:
+            for message in self._queue_manager.listen():
+                event = message.event
 
-                # search stream_generate_routes if node id is answer start at node
-                if not self._task_state.current_stream_generate_state and event.node_id in self._stream_generate_routes:
-                    self._task_state.current_stream_generate_state = self._stream_generate_routes[event.node_id]
+                if isinstance(event, QueueErrorEvent):
+                    err = self._handle_error(event, self._message)
+                    yield self._error_to_stream_response(err)
+                    break
+                elif isinstance(event, QueueWorkflowStartedEvent):
+                    workflow_run = self._handle_workflow_start()
 
-                    # generate stream outputs when node started
-                    yield from self._generate_stream_outputs_when_node_started()
+                    self._message = db.session.query(Message).filter(Message.id == self._message.id).first()
+                    self._message.workflow_run_id = workflow_run.id
 
-                yield self._workflow_node_start_to_stream_response(
-                    event=event,
-                    task_id=self._application_generate_entity.task_id,
-                    workflow_node_execution=workflow_node_execution
-                )
-            elif isinstance(event, QueueNodeSucceededEvent | QueueNodeFailedEvent):
-                workflow_node_execution = self._handle_node_finished(event)
+                    db.session.commit()
+                    db.session.refresh(self._message)
+                    db.session.close()
 
-                # stream outputs when node finished
-                generator = self._generate_stream_outputs_when_node_finished()
-                if generator:
-                    yield from generator
-
-                yield self._workflow_node_finish_to_stream_response(
-                    task_id=self._application_generate_entity.task_id,
-                    workflow_node_execution=workflow_node_execution
-                )
-            elif isinstance(event, QueueStopEvent | QueueWorkflowSucceededEvent | QueueWorkflowFailedEvent):
-                workflow_run = self._handle_workflow_finished(event)
-                if workflow_run:
-                    yield self._workflow_finish_to_stream_response(
+                    yield self._workflow_start_to_stream_response(
                         task_id=self._application_generate_entity.task_id,
                         workflow_run=workflow_run
                     )
+                elif isinstance(event, QueueNodeStartedEvent):
+                    workflow_node_execution = self._handle_node_start(event)
+
+                    # search stream_generate_routes if node id is answer start at node
+                    if not self._task_state.current_stream_generate_state and event.node_id in self._stream_generate_routes:
+                        self._task_state.current_stream_generate_state = self._stream_generate_routes[event.node_id]
+
+                        # generate stream outputs when node started
+                        yield from self._generate_stream_outputs_when_node_started()
+
+                    yield self._workflow_node_start_to_stream_response(
+                        event=event,
+                        task_id=self._application_generate_entity.task_id,
+                        workflow_node_execution=workflow_node_execution
+                    )
+                elif isinstance(event, QueueNodeSucceededEvent | QueueNodeFailedEvent):
+                    workflow_node_execution = self._handle_node_finished(event)
+
+                    # stream outputs when node finished
+                    generator = self._generate_stream_outputs_when_node_finished()
+                    if generator:
+                        yield from generator
 
-                    if workflow_run.status == WorkflowRunStatus.FAILED.value:
-                        err_event = QueueErrorEvent(error=ValueError(f'Run failed: {workflow_run.error}'))
-                        yield self._error_to_stream_response(self._handle_error(err_event, self._message))
+                    yield self._workflow_node_finish_to_stream_response(
+                        task_id=self._application_generate_entity.task_id,
+                        workflow_node_execution=workflow_node_execution
+                    )
+                elif isinstance(event, QueueStopEvent | QueueWorkflowSucceededEvent | QueueWorkflowFailedEvent):
+                    workflow_run = self._handle_workflow_finished(event)
+                    if workflow_run:
+                        yield self._workflow_finish_to_stream_response(
+                            task_id=self._application_generate_entity.task_id,
+                            workflow_run=workflow_run
+                        )
+
+                        if workflow_run.status == WorkflowRunStatus.FAILED.value:
+                            err_event = QueueErrorEvent(error=ValueError(f'Run failed: {workflow_run.error}'))
+                            yield self._error_to_stream_response(self._handle_error(err_event, self._message))
+                            break
+
+                    if isinstance(event, QueueStopEvent):
+                        # Save message
+                        self._save_message()
+
+                        yield self._message_end_to_stream_response()
                         break
+                    else:
+                        self._queue_manager.publish(
+                            QueueAdvancedChatMessageEndEvent(),
+                            PublishFrom.TASK_PIPELINE
+                        )
+                elif isinstance(event, QueueAdvancedChatMessageEndEvent):
+                    output_moderation_answer = self._handle_output_moderation_when_task_finished(self._task_state.answer)
+                    if output_moderation_answer:
+                        self._task_state.answer = output_moderation_answer
+                        yield self._message_replace_to_stream_response(answer=output_moderation_answer)
 
-                if isinstance(event, QueueStopEvent):
                     # Save message
                     self._save_message()
 
                     yield self._message_end_to_stream_response()
-                    break
-                else:
-                    self._queue_manager.publish(
-                        QueueAdvancedChatMessageEndEvent(),
-                        PublishFrom.TASK_PIPELINE
-                    )
-            elif isinstance(event, QueueAdvancedChatMessageEndEvent):
-                output_moderation_answer = self._handle_output_moderation_when_task_finished(self._task_state.answer)
-                if output_moderation_answer:
-                    self._task_state.answer = output_moderation_answer
-                    yield self._message_replace_to_stream_response(answer=output_moderation_answer)
-
-                # Save message
-                self._save_message()
-
-                yield self._message_end_to_stream_response()
-            elif isinstance(event, QueueRetrieverResourcesEvent):
-                self._handle_retriever_resources(event)
-            elif isinstance(event, QueueAnnotationReplyEvent):
-                self._handle_annotation_reply(event)
-            # elif isinstance(event, QueueMessageFileEvent):
-            #     response = self._message_file_to_stream_response(event)
-            #     if response:
-            #         yield response
-            elif isinstance(event, QueueTextChunkEvent):
-                delta_text = event.text
-                if delta_text is None:
-                    continue
+                elif isinstance(event, QueueRetrieverResourcesEvent):
+                    self._handle_retriever_resources(event)
+                elif isinstance(event, QueueAnnotationReplyEvent):
+                    self._handle_annotation_reply(event)
+                # elif isinstance(event, QueueMessageFileEvent):
+                #     response = self._message_file_to_stream_response(event)
+                #     if response:
+                #         yield response
+                elif isinstance(event, QueueTextChunkEvent):
+                    delta_text = event.text
+                    if delta_text is None:
+                        continue
 
-                if not self._is_stream_out_support(
-                        event=event
-                ):
-                    continue
+                    if not self._is_stream_out_support(
+                            event=event
+                    ):
+                        if event.metadata and event.metadata.get('node_id'):
+                            # chunks of the node were dropped, full outputs will be sent when node finished
+                            self._task_state.unstreamed_node_ids.add(event.metadata['node_id'])
+                        continue
 
-                # handle output moderation chunk
-                should_direct_answer = self._handle_output_moderation_chunk(delta_text)
-                if should_direct_answer:
-                    continue
+                    # handle output moderation chunk
+                    should_direct_answer = self._handle_output_moderation_chunk(delta_text)
+                    if should_direct_answer:
+                        continue
 
-                self._task_state.answer += delta_text
-                yield self._message_to_stream_response(delta_text, self._message.id)
-            elif isinstance(event, QueueMessageReplaceEvent):
-                yield self._message_replace_to_stream_response(answer=event.text)
-            elif isinstance(event, QueuePingEvent):
-                yield self._ping_stream_response()
-            else:
-                continue
+                    self._task_state.answer += delta_text
+                    yield self._message_to_stream_response(delta_text, self._message.id)
+                elif isinstance(event, QueueMessageReplaceEvent):
+                    yield self._message_replace_to_stream_response(answer=event.text)
+                elif isinstance(event, QueuePingEvent):
+                    yield self._ping_stream_response()
+                else:
+                    continue
+        finally:
+            # write the node executions left when the client disconnects or on error
+            self._flush_workflow_node_executions()
 
         if self._conversation_name_generate_thread:
             self._conversation_name_generate_thread.join()
@@ -424,7 +431,7 @@ class AdvancedChatAppGenerateTaskPipeline(BasedGenerateTaskPipeline, WorkflowCyc
             for route_chunk in route_chunks:
                 if route_chunk.type == 'text':
                     route_chunk = cast(TextGenerateRouteChunk, route_chunk)
-                    for token in route_chunk.text:
+                    for token in iter_text_chunks(route_chunk.text):
                         # handle output moderation chunk
                         should_direct_answer = self._handle_output_moderation_chunk(token)
                         if should_direct_answer:
@@ -432,7 +439,6 @@ class AdvancedChatAppGenerateTaskPipeline(BasedGenerateTaskPipeline, WorkflowCyc
 
                         self._task_state.answer += token
                         yield self._message_to_stream_response(token, self._message.id)
-                        time.sleep(0.01)
                 else:
                     break
 
@@ -457,10 +463,9 @@ class AdvancedChatAppGenerateTaskPipeline(BasedGenerateTaskPipeline, WorkflowCyc
         for route_chunk in route_chunks:
             if route_chunk.type == 'text':
                 route_chunk = cast(TextGenerateRouteChunk, route_chunk)
-                for token in route_chunk.text:
+                for token in iter_text_chunks(route_chunk.text):
                     self._task_state.answer += token
                     yield self._message_to_stream_response(token, self._message.id)
-                    time.sleep(0.01)
             else:
                 route_chunk = cast(VarGenerateRouteChunk, route_chunk)
                 value_selector = route_chunk.value_selector
@@ -478,21 +483,22 @@ class AdvancedChatAppGenerateTaskPipeline(BasedGenerateTaskPipeline, WorkflowCyc
                     if route_chunk_node_id not in self._task_state.ran_node_execution_infos:
                         break
 
-                    latest_node_execution_info = self._task_state.latest_node_execution_info
-
                     # get route chunk node execution info
                     route_chunk_node_execution_info = self._task_state.ran_node_execution_infos[route_chunk_node_id]
+
+                    # nodes may run in parallel, wait for the route chunk node to finish
+                    if not route_chunk_node_execution_info.finished:
+                        break
+
                     if (route_chunk_node_execution_info.node_type == NodeType.LLM
-                            and latest_node_execution_info.node_type == NodeType.LLM):
+                            and route_chunk_node_id not in self._task_state.unstreamed_node_ids):
                         # only LLM support chunk stream output
                         self._task_state.current_stream_generate_state.current_route_position += 1
                         continue
 
-                    # get route chunk node execution
-                    route_chunk_node_execution = db.session.query(WorkflowNodeExecution).filter(
-                        WorkflowNodeExecution.id == route_chunk_node_execution_info.workflow_node_execution_id).first()
-
-                    outputs = route_chunk_node_execution.outputs_dict
+                    # get route chunk node execution outputs, they may not be written yet
+                    outputs = self._workflow_node_execution_recorder.get_json_value(
+                        route_chunk_node_execution_info.workflow_node_execution_id, 'outputs')
 
                     # get value from outputs
                     value = None
@@ -544,9 +550,9 @@ class AdvancedChatAppGenerateTaskPipeline(BasedGenerateTaskPipeline, WorkflowCyc
                             # other types
                             text = json.dumps(value, ensure_ascii=False)
 
-                    if text:
-                        self._task_state.answer += text
-                        yield self._message_to_stream_response(text, self._message.id)
+                    for token in iter_text_chunks(text):
+                        self._task_state.answer += token
+                        yield self._message_to_stream_response(token, self._message.id)
 
             self._task_state.current_stream_generate_state.current_route_position += 1
 
@@ -567,6 +573,9 @@ class AdvancedChatAppGenerateTaskPipeline(BasedGenerateTaskPipeline, WorkflowCyc
         if 'node_id' not in event.metadata:
             return True
 
+        if event.metadata['node_id'] in self._task_state.unstreamed_node_ids:
+            return False
+
         node_type = event.metadata.get('node_type')
         stream_output_value_selector = event.metadata.get('value_selector')
         if not stream_output_value_selector:
@@ -2,11 +2,16 @@ import queue
 import time
 from abc import abstractmethod
 from collections.abc import Generator
+from datetime import datetime
+from decimal import Decimal
 from enum import Enum
 from typing import Any
 
+from pydantic import BaseModel
+from pydantic.fields import ModelField
 from sqlalchemy.orm import DeclarativeMeta
 
+from core.app.apps.task_stop_listener import TASK_STOP_POLL_INTERVAL, TaskStopListener
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.queue_entities import (
     AppQueueEvent,
@@ -23,6 +28,9 @@ class PublishFrom(Enum):
 
 
 class AppQueueManager:
+    # event type to names of its fields that may hold arbitrary objects, resolved once per event type
+    _event_fields_to_check: dict[type[AppQueueEvent], tuple[str, ...]] = {}
+
     def __init__(self, task_id: str,
                  user_id: str,
                  invoke_from: InvokeFrom) -> None:
@@ -41,6 +49,9 @@ class AppQueueManager:
 
         self._q = q
 
+        self._stopped_event = TaskStopListener.register(self._task_id)
+        self._stop_flag_polled_at = 0.0
+
     def listen(self) -> Generator:
         """
         Listen to queue
@@ -99,7 +110,9 @@ class AppQueueManager:
         :param pub_from:
         :return:
         """
-        self._check_for_sqlalchemy_models(event.dict())
+        for field_name in self._get_event_fields_to_check(type(event)):
+            self._check_for_sqlalchemy_models(getattr(event, field_name))
+
         self._publish(event, pub_from)
 
     @abstractmethod
@@ -128,15 +141,26 @@ class AppQueueManager:
 
         stopped_cache_key = cls._generate_stopped_cache_key(task_id)
         redis_client.setex(stopped_cache_key, 600, 1)
+        TaskStopListener.notify(task_id)
 
     def _is_stopped(self) -> bool:
         """
-        Check if task is stopped
+        Check if task is stopped, the stop flag is pushed to the stop event of the task,
+        redis is only polled as a fallback at a fixed interval
         :return:
         """
+        if self._stopped_event.is_set():
+            return True
+
+        now = time.monotonic()
+        if now - self._stop_flag_polled_at < TASK_STOP_POLL_INTERVAL:
+            return False
+
+        self._stop_flag_polled_at = now
         stopped_cache_key = AppQueueManager._generate_stopped_cache_key(self._task_id)
         result = redis_client.get(stopped_cache_key)
         if result is not None:
+            self._stopped_event.set()
             return True
 
         return False
@@ -159,9 +183,31 @@ class AppQueueManager:
         """
         return f"generate_task_stopped:{task_id}"
 
+    @classmethod
+    def _get_event_fields_to_check(cls, event_type: type[AppQueueEvent]) -> tuple[str, ...]:
+        """
+        Get fields of event type which may hold SQLAlchemy models.
+        Fields typed as primitives, enums or models made of them are validated by pydantic and skipped,
+        so events like LLM chunks are published without walking their data.
+        :param event_type: event type
+        :return: field names
+        """
+        field_names = cls._event_fields_to_check.get(event_type)
+        if field_names is None:
+            field_names = tuple(
+                name for name, field in event_type.__fields__.items()
+                if not _is_validated_field(field, set())
+            )
+            cls._event_fields_to_check[event_type] = field_names
+
+        return field_names
+
     def _check_for_sqlalchemy_models(self, data: Any):
         # from entity to dict or list
-        if isinstance(data, dict):
+        if isinstance(data, BaseModel):
+            for value in data.__dict__.values():
+                self._check_for_sqlalchemy_models(value)
+        elif isinstance(data, dict):
             for key, value in data.items():
                 self._check_for_sqlalchemy_models(value)
         elif isinstance(data, list):
@@ -173,5 +219,39 @@ class AppQueueManager:
                                 "that cause thread safety issues is not allowed.")
 
 
+def _is_validated_field(field: ModelField, resolving: set[type]) -> bool:
+    """
+    Check if pydantic validates values of the field into primitives, enums or models made of them
+    :param field: model field
+    :param resolving: models being resolved, to stop at recursive models
+    :return:
+    """
+    if field.key_field and not _is_validated_field(field.key_field, resolving):
+        return False
+
+    if field.sub_fields and not all(_is_validated_field(sub_field, resolving) for sub_field in field.sub_fields):
+        return False
+
+    if not isinstance(field.type_, type):
+        # unions are validated if all their members are
+        return bool(field.sub_fields)
+
+    return _is_validated_type(field.type_, resolving)
+
+
+def _is_validated_type(type_: type, resolving: set[type]) -> bool:
+    if issubclass(type_, str | int | float | bool | Decimal | datetime | Enum):
+        return True
+
+    if not issubclass(type_, BaseModel):
+        return False
+
+    if type_ in resolving:
+        return True
+
+    resolving.add(type_)
+    return all(_is_validated_field(field, resolving) for field in type_.__fields__.values())
+
+
 class GenerateTaskStoppedException(Exception):
     pass
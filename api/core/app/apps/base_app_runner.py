@@ -1,4 +1,3 @@
-import time
 from collections.abc import Generator
 from typing import Optional, Union, cast
 
@@ -21,6 +20,7 @@ from core.model_runtime.entities.message_entities import AssistantPromptMessage,
 from core.model_runtime.entities.model_entities import ModelPropertyKey
 from core.model_runtime.errors.invoke import InvokeBadRequestError
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
+from core.model_runtime.utils.text_stream import iter_text_chunks
 from core.moderation.input_moderation import InputModeration
 from core.prompt.advanced_prompt_transform import AdvancedPromptTransform
 from core.prompt.entities.advanced_prompt_entities import ChatModelMessage, CompletionModelPromptTemplate, MemoryConfig
@@ -215,7 +215,7 @@ class AppRunner:
         """
         if stream:
             index = 0
-            for token in text:
+            for token in iter_text_chunks(text):
                 chunk = LLMResultChunk(
                     model=app_generate_entity.model_config.model,
                     prompt_messages=prompt_messages,
@@ -231,7 +231,6 @@ class AppRunner:
                     ), PublishFrom.APPLICATION_MANAGER
                 )
                 index += 1
-                time.sleep(0.01)
 
         queue_manager.publish(
             QueueMessageEndEvent(
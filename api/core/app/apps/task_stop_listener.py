@@ -0,0 +1,74 @@
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Optional
+
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+# seconds between two fallback polls of the stop flag of a task, in case a stop message is missed
+TASK_STOP_POLL_INTERVAL = float(os.environ.get('TASK_STOP_POLL_INTERVAL', 1))
+
+
+class TaskStopListener:
+    """
+    Fan out task stop messages of redis pub/sub to local events of the tasks running in this process,
+    so a running task checks whether it is stopped without a redis round-trip.
+    """
+    _channel = 'generate_task_stopped'
+    _events: 'weakref.WeakValueDictionary[str, threading.Event]' = weakref.WeakValueDictionary()
+    _lock = threading.Lock()
+    _thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def register(cls, task_id: str) -> threading.Event:
+        """
+        Register a task, the returned event is set when the task is stopped.
+        The task is unregistered when the event is no longer referenced.
+        :param task_id: task id
+        :return: stop event of the task
+        """
+        event = threading.Event()
+        with cls._lock:
+            cls._events[task_id] = event
+            if cls._thread is None:
+                cls._thread = threading.Thread(target=cls._listen, name='task-stop-listener', daemon=True)
+                cls._thread.start()
+
+        return event
+
+    @classmethod
+    def notify(cls, task_id: str) -> None:
+        """
+        Notify all processes that the task is stopped
+        :param task_id: task id
+        :return:
+        """
+        redis_client.publish(cls._channel, task_id)
+
+    @classmethod
+    def _set(cls, task_id: str) -> None:
+        with cls._lock:
+            event = cls._events.get(task_id)
+
+        if event is not None:
+            event.set()
+
+    @classmethod
+    def _listen(cls) -> None:
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(cls._channel)
+                for message in pubsub.listen():
+                    if message and message.get('type') == 'message':
+                        cls._set(message['data'].decode('utf-8'))
+            except Exception:
+                # messages published while reconnecting are caught up by the fallback poll
+                logger.exception('task stop listener disconnected, reconnecting')
+                time.sleep(1)
+            finally:
+                pubsub.close()
@@ -146,55 +146,59 @@ class WorkflowAppGenerateTaskPipeline(BasedGenerateTaskPipeline, WorkflowCycleMa
         Process stream response.
         :return:
         """
-        for message in self._queue_manager.listen():
-            event = message.event
-
-            if isinstance(event, QueueErrorEvent):
-                err = self._handle_error(event)
-                yield self._error_to_stream_response(err)
-                break
-            elif isinstance(event, QueueWorkflowStartedEvent):
-                workflow_run = self._handle_workflow_start()
-                yield self._workflow_start_to_stream_response(
-                    task_id=self._application_generate_entity.task_id,
-                    workflow_run=workflow_run
-                )
-            elif isinstance(event, QueueNodeStartedEvent):
-                workflow_node_execution = self._handle_node_start(event)
-                yield self._workflow_node_start_to_stream_response(
-                    event=event,
-                    task_id=self._application_generate_entity.task_id,
-                    workflow_node_execution=workflow_node_execution
-                )
-            elif isinstance(event, QueueNodeSucceededEvent | QueueNodeFailedEvent):
-                workflow_node_execution = self._handle_node_finished(event)
-                yield self._workflow_node_finish_to_stream_response(
-                    task_id=self._application_generate_entity.task_id,
-                    workflow_node_execution=workflow_node_execution
-                )
-            elif isinstance(event, QueueStopEvent | QueueWorkflowSucceededEvent | QueueWorkflowFailedEvent):
-                workflow_run = self._handle_workflow_finished(event)
+        try:
+            for message in self._queue_manager.listen():
+                event = message.event
+
+                if isinstance(event, QueueErrorEvent):
+                    err = self._handle_error(event)
+                    yield self._error_to_stream_response(err)
+                    break
+                elif isinstance(event, QueueWorkflowStartedEvent):
+                    workflow_run = self._handle_workflow_start()
+                    yield self._workflow_start_to_stream_response(
+                        task_id=self._application_generate_entity.task_id,
+                        workflow_run=workflow_run
+                    )
+                elif isinstance(event, QueueNodeStartedEvent):
+                    workflow_node_execution = self._handle_node_start(event)
+                    yield self._workflow_node_start_to_stream_response(
+                        event=event,
+                        task_id=self._application_generate_entity.task_id,
+                        workflow_node_execution=workflow_node_execution
+                    )
+                elif isinstance(event, QueueNodeSucceededEvent | QueueNodeFailedEvent):
+                    workflow_node_execution = self._handle_node_finished(event)
+                    yield self._workflow_node_finish_to_stream_response(
+                        task_id=self._application_generate_entity.task_id,
+                        workflow_node_execution=workflow_node_execution
+                    )
+                elif isinstance(event, QueueStopEvent | QueueWorkflowSucceededEvent | QueueWorkflowFailedEvent):
+                    workflow_run = self._handle_workflow_finished(event)
 
-                # save workflow app log
-                self._save_workflow_app_log(workflow_run)
+                    # save workflow app log
+                    self._save_workflow_app_log(workflow_run)
 
-                yield self._workflow_finish_to_stream_response(
-                    task_id=self._application_generate_entity.task_id,
-                    workflow_run=workflow_run
-                )
-            elif isinstance(event, QueueTextChunkEvent):
-                delta_text = event.text
-                if delta_text is None:
+                    yield self._workflow_finish_to_stream_response(
+                        task_id=self._application_generate_entity.task_id,
+                        workflow_run=workflow_run
+                    )
+                elif isinstance(event, QueueTextChunkEvent):
+                    delta_text = event.text
+                    if delta_text is None:
+                        continue
+
+                    self._task_state.answer += delta_text
+                    yield self._text_chunk_to_stream_response(delta_text)
+                elif isinstance(event, QueueMessageReplaceEvent):
+                    yield self._text_replace_to_stream_response(event.text)
+                elif isinstance(event, QueuePingEvent):
+                    yield self._ping_stream_response()
+                else:
                     continue
-
-                self._task_state.answer += delta_text
-                yield self._text_chunk_to_stream_response(delta_text)
-            elif isinstance(event, QueueMessageReplaceEvent):
-                yield self._text_replace_to_stream_response(event.text)
-            elif isinstance(event, QueuePingEvent):
-                yield self._ping_stream_response()
-            else:
-                continue
+        finally:
+            # write the node executions left when the client disconnects or on error
+            self._flush_workflow_node_executions()
 
     def _save_workflow_app_log(self, workflow_run: WorkflowRun) -> None:
         """
@@ -25,6 +25,7 @@ class NodeExecutionInfo(BaseModel):
     workflow_node_execution_id: str
     node_type: NodeType
     start_at: float
+    finished: bool = False
 
 
 class TaskState(BaseModel):
@@ -63,6 +64,7 @@ class AdvancedChatTaskState(WorkflowTaskState):
     usage: LLMUsage
 
     current_stream_generate_state: Optional[StreamGenerateRoute] = None
+    unstreamed_node_ids: set[str] = set()
 
 
 class StreamEvent(Enum):
@@ -1,8 +1,12 @@
 import json
+import logging
 import time
+import uuid
 from datetime import datetime, timezone
 from typing import Any, Optional, Union, cast
 
+from flask import current_app
+
 from core.app.entities.app_invoke_entities import AdvancedChatAppGenerateEntity, InvokeFrom, WorkflowAppGenerateEntity
 from core.app.entities.queue_entities import (
     QueueNodeFailedEvent,
@@ -21,6 +25,7 @@ from core.app.entities.task_entities import (
     WorkflowStartStreamResponse,
     WorkflowTaskState,
 )
+from core.app.task_pipeline.workflow_node_execution_recorder import WorkflowNodeExecutionRecorder
 from core.file.file_obj import FileVar
 from core.model_runtime.utils.encoders import jsonable_encoder
 from core.tools.tool_manager import ToolManager
@@ -41,6 +46,8 @@ from models.workflow import (
     WorkflowRunTriggeredFrom,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class WorkflowCycleManage:
     _application_generate_entity: Union[AdvancedChatAppGenerateEntity, WorkflowAppGenerateEntity]
@@ -48,6 +55,8 @@ class WorkflowCycleManage:
     _user: Union[Account, EndUser]
     _task_state: Union[AdvancedChatTaskState, WorkflowTaskState]
     _workflow_system_variables: dict[SystemVariable, Any]
+    _workflow_run: Optional[WorkflowRun] = None
+    _workflow_node_execution_recorder: Optional[WorkflowNodeExecutionRecorder] = None
 
     def _init_workflow_run(self, workflow: Workflow,
                            triggered_from: WorkflowRunTriggeredFrom,
@@ -173,8 +182,9 @@ class WorkflowCycleManage:
         :param predecessor_node_id: predecessor node id if exists
         :return:
         """
-        # init workflow node execution
+        # init workflow node execution, it is written by the recorder in the background
         workflow_node_execution = WorkflowNodeExecution(
+            id=str(uuid.uuid4()),
             tenant_id=workflow_run.tenant_id,
             app_id=workflow_run.app_id,
             workflow_id=workflow_run.workflow_id,
@@ -186,14 +196,13 @@ class WorkflowCycleManage:
             node_type=node_type.value,
             title=node_title,
             status=WorkflowNodeExecutionStatus.RUNNING.value,
+            elapsed_time=0,
             created_by_role=workflow_run.created_by_role,
-            created_by=workflow_run.created_by
+            created_by=workflow_run.created_by,
+            created_at=datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
         )
 
-        db.session.add(workflow_node_execution)
-        db.session.commit()
-        db.session.refresh(workflow_node_execution)
-        db.session.close()
+        self._workflow_node_execution_recorder.save(workflow_node_execution)
 
         return workflow_node_execution
 
@@ -218,16 +227,15 @@ class WorkflowCycleManage:
 
         workflow_node_execution.status = WorkflowNodeExecutionStatus.SUCCEEDED.value
         workflow_node_execution.elapsed_time = time.perf_counter() - start_at
-        workflow_node_execution.inputs = json.dumps(inputs) if inputs else None
-        workflow_node_execution.process_data = json.dumps(process_data) if process_data else None
-        workflow_node_execution.outputs = json.dumps(outputs) if outputs else None
-        workflow_node_execution.execution_metadata = json.dumps(jsonable_encoder(execution_metadata)) \
-            if execution_metadata else None
         workflow_node_execution.finished_at = datetime.now(timezone.utc).replace(tzinfo=None)
 
-        db.session.commit()
-        db.session.refresh(workflow_node_execution)
-        db.session.close()
+        # serialized by the recorder when written
+        self._workflow_node_execution_recorder.save(workflow_node_execution, json_values={
+            'inputs': inputs or None,
+            'process_data': process_data or None,
+            'outputs': outputs or None,
+            'execution_metadata': jsonable_encoder(execution_metadata) if execution_metadata else None
+        })
 
         return workflow_node_execution
 
@@ -252,13 +260,13 @@ class WorkflowCycleManage:
         workflow_node_execution.error = error
         workflow_node_execution.elapsed_time = time.perf_counter() - start_at
         workflow_node_execution.finished_at = datetime.now(timezone.utc).replace(tzinfo=None)
-        workflow_node_execution.inputs = json.dumps(inputs) if inputs else None
-        workflow_node_execution.process_data = json.dumps(process_data) if process_data else None
-        workflow_node_execution.outputs = json.dumps(outputs) if outputs else None
 
-        db.session.commit()
-        db.session.refresh(workflow_node_execution)
-        db.session.close()
+        # serialized by the recorder when written
+        self._workflow_node_execution_recorder.save(workflow_node_execution, json_values={
+            'inputs': inputs or None,
+            'process_data': process_data or None,
+            'outputs': outputs or None
+        })
 
         return workflow_node_execution
 
@@ -348,7 +356,7 @@ class WorkflowCycleManage:
                 title=workflow_node_execution.title,
                 index=workflow_node_execution.index,
                 predecessor_node_id=workflow_node_execution.predecessor_node_id,
-                inputs=workflow_node_execution.inputs_dict,
+                inputs=self._workflow_node_execution_recorder.get_json_value(workflow_node_execution.id, 'inputs'),
                 created_at=int(workflow_node_execution.created_at.timestamp())
             )
         )
@@ -372,6 +380,11 @@ class WorkflowCycleManage:
         :param workflow_node_execution: workflow node execution
         :return:
         """
+        json_values = {
+            column: self._workflow_node_execution_recorder.get_json_value(workflow_node_execution.id, column)
+            for column in WorkflowNodeExecutionRecorder.json_columns
+        }
+
         return NodeFinishStreamResponse(
             task_id=task_id,
             workflow_run_id=workflow_node_execution.workflow_run_id,
@@ -382,16 +395,16 @@ class WorkflowCycleManage:
                 index=workflow_node_execution.index,
                 title=workflow_node_execution.title,
                 predecessor_node_id=workflow_node_execution.predecessor_node_id,
-                inputs=workflow_node_execution.inputs_dict,
-                process_data=workflow_node_execution.process_data_dict,
-                outputs=workflow_node_execution.outputs_dict,
+                inputs=json_values['inputs'],
+                process_data=json_values['process_data'],
+                outputs=json_values['outputs'],
                 status=workflow_node_execution.status,
                 error=workflow_node_execution.error,
                 elapsed_time=workflow_node_execution.elapsed_time,
-                execution_metadata=workflow_node_execution.execution_metadata_dict,
+                execution_metadata=json_values['execution_metadata'],
                 created_at=int(workflow_node_execution.created_at.timestamp()),
                 finished_at=int(workflow_node_execution.finished_at.timestamp()),
-                files=self._fetch_files_from_node_outputs(workflow_node_execution.outputs_dict)
+                files=self._fetch_files_from_node_outputs(json_values['outputs'])
             )
         )
 
@@ -412,12 +425,15 @@ class WorkflowCycleManage:
 
         db.session.close()
 
+        # node executions are initialized from the detached workflow run, without querying it on each node start
+        self._workflow_run = workflow_run
+        self._workflow_node_execution_recorder = WorkflowNodeExecutionRecorder(current_app._get_current_object())
+
         return workflow_run
 
     def _handle_node_start(self, event: QueueNodeStartedEvent) -> WorkflowNodeExecution:
-        workflow_run = db.session.query(WorkflowRun).filter(WorkflowRun.id == self._task_state.workflow_run_id).first()
         workflow_node_execution = self._init_node_execution_from_workflow_run(
-            workflow_run=workflow_run,
+            workflow_run=self._workflow_run,
             node_id=event.node_id,
             node_type=event.node_type,
             node_title=event.node_data.title,
@@ -436,14 +452,13 @@ class WorkflowCycleManage:
 
         self._task_state.total_steps += 1
 
-        db.session.close()
-
         return workflow_node_execution
 
     def _handle_node_finished(self, event: QueueNodeSucceededEvent | QueueNodeFailedEvent) -> WorkflowNodeExecution:
         current_node_execution = self._task_state.ran_node_execution_infos[event.node_id]
-        workflow_node_execution = db.session.query(WorkflowNodeExecution).filter(
-            WorkflowNodeExecution.id == current_node_execution.workflow_node_execution_id).first()
+        current_node_execution.finished = True
+        workflow_node_execution = self._workflow_node_execution_recorder.get(
+            current_node_execution.workflow_node_execution_id)
         if isinstance(event, QueueNodeSucceededEvent):
             workflow_node_execution = self._workflow_node_execution_success(
                 workflow_node_execution=workflow_node_execution,
@@ -459,7 +474,8 @@ class WorkflowCycleManage:
                     int(event.execution_metadata.get(NodeRunMetadataKey.TOTAL_TOKENS)))
 
             if workflow_node_execution.node_type == NodeType.LLM.value:
-                outputs = workflow_node_execution.outputs_dict
+                outputs = self._workflow_node_execution_recorder.get_json_value(workflow_node_execution.id,
+                                                                                'outputs')
                 usage_dict = outputs.get('usage', {})
                 self._task_state.metadata['usage'] = usage_dict
         else:
@@ -472,12 +488,33 @@ class WorkflowCycleManage:
                 outputs=event.outputs
             )
 
-        db.session.close()
-
         return workflow_node_execution
 
     def _handle_workflow_finished(self, event: QueueStopEvent | QueueWorkflowSucceededEvent | QueueWorkflowFailedEvent) \
             -> Optional[WorkflowRun]:
+        if not self._workflow_node_execution_recorder:
+            # workflow not started
+            return None
+
+        if isinstance(event, QueueStopEvent):
+            # nodes may run in parallel, mark all unfinished nodes as stopped
+            for node_execution_info in self._task_state.ran_node_execution_infos.values():
+                if node_execution_info.finished:
+                    continue
+
+                workflow_node_execution = self._workflow_node_execution_recorder.get(
+                    node_execution_info.workflow_node_execution_id)
+                if (workflow_node_execution
+                        and workflow_node_execution.status == WorkflowNodeExecutionStatus.RUNNING.value):
+                    self._workflow_node_execution_failed(
+                        workflow_node_execution=workflow_node_execution,
+                        start_at=node_execution_info.start_at,
+                        error='Workflow stopped.'
+                    )
+
+        # node executions are written before the workflow run finishes
+        self._workflow_node_execution_recorder.flush()
+
         workflow_run = db.session.query(WorkflowRun).filter(
             WorkflowRun.id == self._task_state.workflow_run_id).first()
         if not workflow_run:
@@ -492,18 +529,6 @@ class WorkflowCycleManage:
                 status=WorkflowRunStatus.STOPPED,
                 error='Workflow stopped.'
             )
-
-            latest_node_execution_info = self._task_state.latest_node_execution_info
-            if latest_node_execution_info:
-                workflow_node_execution = db.session.query(WorkflowNodeExecution).filter(
-                    WorkflowNodeExecution.id == latest_node_execution_info.workflow_node_execution_id).first()
-                if (workflow_node_execution
-                        and workflow_node_execution.status == WorkflowNodeExecutionStatus.RUNNING.value):
-                    self._workflow_node_execution_failed(
-                        workflow_node_execution=workflow_node_execution,
-                        start_at=latest_node_execution_info.start_at,
-                        error='Workflow stopped.'
-                    )
         elif isinstance(event, QueueWorkflowFailedEvent):
             workflow_run = self._workflow_run_failed(
                 workflow_run=workflow_run,
@@ -514,10 +539,16 @@ class WorkflowCycleManage:
                 error=event.error
             )
         else:
-            if self._task_state.latest_node_execution_info:
-                workflow_node_execution = db.session.query(WorkflowNodeExecution).filter(
-                    WorkflowNodeExecution.id == self._task_state.latest_node_execution_info.workflow_node_execution_id).first()
-                outputs = workflow_node_execution.outputs
+            # nodes may run in parallel, outputs come from the end node if it ran
+            output_node_execution_info = next(
+                (node_execution_info for node_execution_info in self._task_state.ran_node_execution_infos.values()
+                 if node_execution_info.node_type == NodeType.END),
+                self._task_state.latest_node_execution_info
+            )
+            if output_node_execution_info:
+                outputs = self._workflow_node_execution_recorder.get_json_value(
+                    output_node_execution_info.workflow_node_execution_id, 'outputs')
+                outputs = json.dumps(outputs) if outputs else None
             else:
                 outputs = None
 
@@ -535,6 +566,20 @@ class WorkflowCycleManage:
 
         return workflow_run
 
+    def _flush_workflow_node_executions(self) -> None:
+        """
+        Write the saved node executions which are not written yet, when the task pipeline exits
+        :return:
+        """
+        if not self._workflow_node_execution_recorder:
+            return
+
+        try:
+            self._workflow_node_execution_recorder.flush()
+        except Exception:
+            # do not mask the error the task pipeline exits with
+            logger.exception('Failed to flush workflow node executions.')
+
     def _fetch_files_from_node_outputs(self, outputs_dict: dict) -> list[dict]:
         """
         Fetch files from node outputs
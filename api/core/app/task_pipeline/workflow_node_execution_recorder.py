@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+from flask import Flask
+
+from extensions.ext_database import db
+from models.workflow import WorkflowNodeExecution
+
+logger = logging.getLogger(__name__)
+
+# max number of workflow node execution batches written concurrently in a process
+WORKFLOW_RECORDER_MAX_WORKERS = int(os.environ.get('WORKFLOW_RECORDER_MAX_WORKERS', 8))
+
+
+class WorkflowNodeExecutionRecorder:
+    """
+    Write-behind recorder of the node executions of a workflow run.
+
+    Node executions are kept in memory by the task pipeline, which builds its stream responses from them.
+    The values of their JSON columns are kept as objects, and only serialized when written. Their changes are
+    written in batches on a shared executor, off the response path. A run writes at most one batch at a time,
+    so changes are written in order, and changes made while a batch is written are merged into the next batch.
+    `flush` writes the remaining changes when the workflow run finishes, or when the task pipeline exits.
+    """
+    # columns of JSON text, saved as objects
+    json_columns = ('inputs', 'process_data', 'outputs', 'execution_metadata')
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, flask_app: Flask):
+        self._flask_app = flask_app
+        self._node_executions: dict[str, WorkflowNodeExecution] = {}
+        # node execution id to the objects of its JSON columns
+        self._json_values: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # node execution id to its column values which are not written yet
+        self._pending_values: dict[str, dict] = {}
+        self._inserted_ids: set[str] = set()
+        self._write_future: Optional[Future] = None
+
+    def get(self, workflow_node_execution_id: str) -> Optional[WorkflowNodeExecution]:
+        """
+        Get in-memory workflow node execution
+        :param workflow_node_execution_id: workflow node execution id
+        :return:
+        """
+        return self._node_executions.get(workflow_node_execution_id)
+
+    def get_json_value(self, workflow_node_execution_id: str, column: str) -> Any:
+        """
+        Get the object of a JSON column of in-memory workflow node execution
+        :param workflow_node_execution_id: workflow node execution id
+        :param column: JSON column name, e.g. outputs
+        :return:
+        """
+        return self._json_values.get(workflow_node_execution_id, {}).get(column)
+
+    def save(self, workflow_node_execution: WorkflowNodeExecution, json_values: Optional[dict[str, Any]] = None) \
+            -> None:
+        """
+        Save the current state of workflow node execution, it is written later in the background
+        :param workflow_node_execution: transient workflow node execution with id assigned
+        :param json_values: objects of the JSON columns, replacing the saved ones, serialized when written
+        :return:
+        """
+        values = {key: getattr(workflow_node_execution, key) for key in WorkflowNodeExecution.__table__.columns.keys()}
+        if json_values is not None:
+            self._json_values[workflow_node_execution.id] = json_values
+        values.update(self._json_values.get(workflow_node_execution.id, {}))
+
+        self._node_executions[workflow_node_execution.id] = workflow_node_execution
+        with self._lock:
+            self._pending_values[workflow_node_execution.id] = values
+            if self._write_future is None:
+                self._write_future = self._get_executor().submit(self._write_in_background)
+
+    def flush(self) -> None:
+        """
+        Write all saved changes, in the calling thread if they are not being written in the background
+        :return:
+        """
+        with self._lock:
+            future = self._write_future
+
+        if future and not future.cancel():
+            future.result()
+
+        with self._lock:
+            self._write_future = None
+            pending_values = self._pending_values
+            self._pending_values = {}
+
+        if pending_values:
+            self._write(pending_values)
+
+    def _write_in_background(self) -> None:
+        with self._flask_app.app_context():
+            while True:
+                with self._lock:
+                    if not self._pending_values:
+                        self._write_future = None
+                        return
+
+                    pending_values = self._pending_values
+                    self._pending_values = {}
+
+                try:
+                    self._write(pending_values)
+                except Exception:
+                    logger.exception('Failed to write workflow node executions, retry on next save or flush.')
+                    with self._lock:
+                        # changes saved meanwhile are newer
+                        self._pending_values = {**pending_values, **self._pending_values}
+                        self._write_future = None
+                    return
+
+    def _write(self, pending_values: dict[str, dict]) -> None:
+        pending_values = {node_execution_id: self._serialize(values)
+                          for node_execution_id, values in pending_values.items()}
+        inserts = [values for node_execution_id, values in pending_values.items()
+                   if node_execution_id not in self._inserted_ids]
+        updates = [values for node_execution_id, values in pending_values.items()
+                   if node_execution_id in self._inserted_ids]
+
+        try:
+            if inserts:
+                db.session.bulk_insert_mappings(WorkflowNodeExecution, inserts)
+            if updates:
+                db.session.bulk_update_mappings(WorkflowNodeExecution, updates)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        self._inserted_ids.update(values['id'] for values in inserts)
+
+    @classmethod
+    def _serialize(cls, values: dict) -> dict:
+        return {
+            **values,
+            **{
+                column: json.dumps(values[column]) if values.get(column) else None
+                for column in cls.json_columns
+                if not isinstance(values.get(column), str)
+            }
+        }
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=WORKFLOW_RECORDER_MAX_WORKERS,
+                                                       thread_name_prefix='workflow_node_execution_recorder')
+
+        return cls._executor
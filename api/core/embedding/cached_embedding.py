@@ -1,10 +1,17 @@
 import base64
 import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
 from typing import Optional, cast
 
 import numpy as np
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 
+from core.embedding.embedding_codec import decode_embedding, encode_embedding, is_encoded_embedding
 from core.model_manager import ModelInstance
 from core.model_runtime.entities.model_entities import ModelPropertyKey
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
@@ -14,10 +21,63 @@ from extensions.ext_redis import redis_client
 from libs import helper
 from models.dataset import Embedding
 
+QUERY_EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get('QUERY_EMBEDDING_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+# seconds between info logs of the embedding cache counters of a process, 0 disables them
+EMBEDDING_CACHE_STATS_LOG_INTERVAL = float(os.environ.get('EMBEDDING_CACHE_STATS_LOG_INTERVAL', 300))
+
 logger = logging.getLogger(__name__)
 
 
+class LRUBytesCache:
+    """
+    Thread-safe LRU cache of bytes values, bounded by the total size of values.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._lock = Lock()
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self._max_bytes:
+            return
+
+        with self._lock:
+            old_value = self._items.pop(key, None)
+            if old_value is not None:
+                self._size -= len(old_value)
+
+            self._items[key] = value
+            self._size += len(value)
+            while self._size > self._max_bytes:
+                _, evicted_value = self._items.popitem(last=False)
+                self._size -= len(evicted_value)
+
+
 class CacheEmbedding(Embeddings):
+    # max hashes per IN (...) lookup and max rows per bulk insert
+    _BULK_BATCH_SIZE = 500
+
+    # cache hit counters, keyed by (provider, model)
+    _CACHE_STATS_COUNTERS = ('hit', 'miss', 'query_local_hit', 'query_redis_hit', 'query_miss')
+    _cache_stats_lock = Lock()
+    _cache_stats: dict[tuple[str, str], dict[str, int]] = {}
+    _cache_stats_logged_at = time.monotonic()
+
+    # in-process tier in front of redis for query embeddings, and in-flight queries being embedded
+    _query_cache = LRUBytesCache(max_bytes=QUERY_EMBEDDING_CACHE_MAX_BYTES)
+    _query_inflight_lock = Lock()
+    _query_inflight: dict[str, Future] = {}
+
     def __init__(self, model_instance: ModelInstance, user: Optional[str] = None) -> None:
         self._model_instance = model_instance
         self._user = user
@@ -25,19 +85,23 @@ class CacheEmbedding(Embeddings):
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
         """Embed search docs in batches of 10."""
         # use doc embedding cache or store if not exists
-        text_embeddings = [None for _ in range(len(texts))]
-        embedding_queue_indices = []
-        for i, text in enumerate(texts):
-            hash = helper.generate_text_hash(text)
-            embedding = db.session.query(Embedding).filter_by(model_name=self._model_instance.model,
-                                                              hash=hash,
-                                                              provider_name=self._model_instance.provider).first()
-            if embedding:
-                text_embeddings[i] = embedding.get_embedding()
-            else:
-                embedding_queue_indices.append(i)
-        if embedding_queue_indices:
-            embedding_queue_texts = [texts[i] for i in embedding_queue_indices]
+        text_hashes = [helper.generate_text_hash(text) for text in texts]
+        cached_embeddings = self._get_cached_embeddings(set(text_hashes))
+
+        text_embeddings = [cached_embeddings.get(hash) for hash in text_hashes]
+
+        # embed each missing text only once
+        embedding_queue_hashes = {}
+        embedding_queue_texts = []
+        for text, hash in zip(texts, text_hashes):
+            if hash not in cached_embeddings and hash not in embedding_queue_hashes:
+                embedding_queue_hashes[hash] = len(embedding_queue_texts)
+                embedding_queue_texts.append(text)
+
+        hit_count = len([embedding for embedding in text_embeddings if embedding is not None])
+        self._record_cache_stats(hit=hit_count, miss=len(texts) - hit_count)
+
+        if embedding_queue_texts:
             embedding_queue_embeddings = []
             try:
                 model_type_instance = cast(TextEmbeddingModel, self._model_instance.model_type_instance)
@@ -57,25 +121,15 @@ class CacheEmbedding(Embeddings):
                         try:
                             normalized_embedding = (vector / np.linalg.norm(vector)).tolist()
                             embedding_queue_embeddings.append(normalized_embedding)
-                        except IntegrityError:
-                            db.session.rollback()
                         except Exception as e:
                             logging.exception('Failed transform embedding: ', e)
-                cache_embeddings = []
-                try:
-                    for i, embedding in zip(embedding_queue_indices, embedding_queue_embeddings):
-                        text_embeddings[i] = embedding
-                        hash = helper.generate_text_hash(texts[i])
-                        if hash not in cache_embeddings:
-                            embedding_cache = Embedding(model_name=self._model_instance.model,
-                                                        hash=hash,
-                                                        provider_name=self._model_instance.provider)
-                            embedding_cache.set_embedding(embedding)
-                            db.session.add(embedding_cache)
-                            cache_embeddings.append(hash)
-                    db.session.commit()
-                except IntegrityError:
-                    db.session.rollback()
+
+                new_embeddings = dict(zip(embedding_queue_hashes, embedding_queue_embeddings))
+                for i, hash in enumerate(text_hashes):
+                    if text_embeddings[i] is None:
+                        text_embeddings[i] = new_embeddings.get(hash)
+
+                self._save_embeddings(new_embeddings)
             except Exception as ex:
                 db.session.rollback()
                 logger.error('Failed to embed documents: ', ex)
@@ -83,15 +137,170 @@ class CacheEmbedding(Embeddings):
 
         return text_embeddings
 
+    def _get_cached_embeddings(self, hashes: set[str]) -> dict[str, list[float]]:
+        """
+        Get cached embeddings of text hashes with chunked IN (...) queries.
+        :param hashes: text hashes
+        :return: hash to embedding mapping of the cached ones
+        """
+        hashes = list(hashes)
+        cached_embeddings = {}
+        for i in range(0, len(hashes), self._BULK_BATCH_SIZE):
+            embeddings = db.session.query(Embedding).filter(
+                Embedding.model_name == self._model_instance.model,
+                Embedding.provider_name == self._model_instance.provider,
+                Embedding.hash.in_(hashes[i:i + self._BULK_BATCH_SIZE])
+            ).all()
+
+            for embedding in embeddings:
+                cached_embeddings[embedding.hash] = embedding.get_embedding()
+
+        return cached_embeddings
+
+    def _save_embeddings(self, hash_embeddings: dict[str, list[float]]) -> None:
+        """
+        Save embeddings to cache with bulk inserts, rows already cached by others are ignored.
+        :param hash_embeddings: hash to embedding mapping
+        :return:
+        """
+        if not hash_embeddings:
+            return
+
+        rows = []
+        for hash, embedding in hash_embeddings.items():
+            embedding_cache = Embedding(model_name=self._model_instance.model,
+                                        hash=hash,
+                                        provider_name=self._model_instance.provider)
+            embedding_cache.set_embedding(embedding)
+            rows.append({
+                'model_name': embedding_cache.model_name,
+                'hash': embedding_cache.hash,
+                'provider_name': embedding_cache.provider_name,
+                'embedding': embedding_cache.embedding
+            })
+
+        try:
+            for i in range(0, len(rows), self._BULK_BATCH_SIZE):
+                db.session.execute(
+                    insert(Embedding).values(rows[i:i + self._BULK_BATCH_SIZE]).on_conflict_do_nothing(
+                        index_elements=['model_name', 'hash', 'provider_name']
+                    )
+                )
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
+    def _record_cache_stats(self, **counts: int) -> None:
+        """
+        Record embedding cache counters of current provider and model.
+        :param counts: counter increments, `hit` and `miss` for documents,
+            `query_local_hit`, `query_redis_hit` and `query_miss` for queries
+        :return:
+        """
+        key = (self._model_instance.provider, self._model_instance.model)
+        now = time.monotonic()
+        with self._cache_stats_lock:
+            stats = self._cache_stats.setdefault(key, dict.fromkeys(self._CACHE_STATS_COUNTERS, 0))
+            for name, count in counts.items():
+                stats[name] += count
+
+            should_log = 0 < EMBEDDING_CACHE_STATS_LOG_INTERVAL <= now - CacheEmbedding._cache_stats_logged_at
+            if should_log:
+                CacheEmbedding._cache_stats_logged_at = now
+
+        logger.debug(f'Embedding cache of {key[0]}/{key[1]}: {counts}')
+        if should_log:
+            self._log_cache_stats()
+
+    @classmethod
+    def get_cache_stats(cls) -> dict[str, dict]:
+        """
+        Get embedding cache counters and document cache hit ratio per provider and model.
+        :return: stats keyed by `provider/model`
+        """
+        with cls._cache_stats_lock:
+            stats = {key: dict(value) for key, value in cls._cache_stats.items()}
+
+        return {
+            f'{provider}/{model}': {
+                **value,
+                'hit_ratio': value['hit'] / (value['hit'] + value['miss']) if value['hit'] + value['miss'] else 0.0
+            }
+            for (provider, model), value in stats.items()
+        }
+
+    @classmethod
+    def _log_cache_stats(cls) -> None:
+        stats = cls.get_cache_stats()
+        logger.info('Embedding cache stats of process %s: %s', os.getpid(), '; '.join(
+            f"{key} hit_ratio={value['hit_ratio']:.2f} hit={value['hit']} miss={value['miss']} "
+            f"query_local_hit={value['query_local_hit']} query_redis_hit={value['query_redis_hit']} "
+            f"query_miss={value['query_miss']}"
+            for key, value in sorted(stats.items())
+        ))
+
     def embed_query(self, text: str) -> list[float]:
         """Embed query text."""
         # use doc embedding cache or store if not exists
         hash = helper.generate_text_hash(text)
         embedding_cache_key = f'{self._model_instance.provider}_{self._model_instance.model}_{hash}'
-        embedding = redis_client.get(embedding_cache_key)
+
+        # in-process cache first, no network call for hot queries
+        embedding = self._query_cache.get(embedding_cache_key)
         if embedding:
-            redis_client.expire(embedding_cache_key, 600)
-            return list(np.frombuffer(base64.b64decode(embedding), dtype="float"))
+            self._record_cache_stats(query_local_hit=1)
+            return decode_embedding(embedding).tolist()
+
+        # coalesce concurrent misses of the same query, only one of them invokes the model
+        with self._query_inflight_lock:
+            future = self._query_inflight.get(embedding_cache_key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._query_inflight[embedding_cache_key] = future
+
+        if not is_owner:
+            return decode_embedding(future.result()).tolist()
+
+        try:
+            embedding = self._embed_query_with_redis_cache(embedding_cache_key, text)
+            self._query_cache.set(embedding_cache_key, embedding)
+            future.set_result(embedding)
+        except Exception as ex:
+            future.set_exception(ex)
+            raise ex
+        finally:
+            with self._query_inflight_lock:
+                self._query_inflight.pop(embedding_cache_key, None)
+
+        return decode_embedding(embedding).tolist()
+
+    def _embed_query_with_redis_cache(self, embedding_cache_key: str, text: str) -> bytes:
+        """
+        Embed query text with redis cache.
+        :param embedding_cache_key: embedding cache key
+        :param text: query text
+        :return: encoded embedding
+        """
+        try:
+            # get and refresh ttl in one round-trip
+            pipeline = redis_client.pipeline(transaction=False)
+            pipeline.get(embedding_cache_key)
+            pipeline.expire(embedding_cache_key, 600)
+            embedding, _ = pipeline.execute()
+        except Exception:
+            logging.exception('Failed to get embedding from redis')
+            embedding = None
+
+        if embedding:
+            self._record_cache_stats(query_redis_hit=1)
+            if is_encoded_embedding(embedding):
+                return embedding
+
+            # values cached before the binary codec are base64 float64 strings
+            return encode_embedding(np.frombuffer(base64.b64decode(embedding), dtype="float"))
+
+        self._record_cache_stats(query_miss=1)
         try:
             embedding_result = self._model_instance.invoke_text_embedding(
                 texts=[text],
@@ -103,19 +312,10 @@ class CacheEmbedding(Embeddings):
         except Exception as ex:
             raise ex
 
+        embedding = encode_embedding(embedding_results)
         try:
-            # encode embedding to base64
-            embedding_vector = np.array(embedding_results)
-            vector_bytes = embedding_vector.tobytes()
-            # Transform to Base64
-            encoded_vector = base64.b64encode(vector_bytes)
-            # Transform to string
-            encoded_str = encoded_vector.decode("utf-8")
-            redis_client.setex(embedding_cache_key, 600, encoded_str)
-
-        except IntegrityError:
-            db.session.rollback()
+            redis_client.setex(embedding_cache_key, 600, embedding)
         except:
             logging.exception('Failed to add embedding to redis')
 
-        return embedding_results
+        return embedding
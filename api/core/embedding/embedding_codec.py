@@ -0,0 +1,56 @@
+import struct
+from typing import Union
+
+import numpy as np
+
+# Binary layout of an encoded embedding, all little-endian:
+#
+#   magic    3 bytes  b'\x00EM', never the first bytes of a pickle or a base64 string
+#   version  1 byte   format version
+#   dims     4 bytes  uint32, number of dimensions
+#   data     dims * 4 bytes float32
+#
+# The 8 bytes header keeps the float32 data aligned for numpy.frombuffer.
+EMBEDDING_CODEC_MAGIC = b'\x00EM'
+EMBEDDING_CODEC_VERSION = 1
+
+_HEADER = struct.Struct('<3sBI')
+_DTYPE = np.dtype('<f4')
+
+
+def encode_embedding(embedding: Union[list[float], np.ndarray]) -> bytes:
+    """
+    Encode embedding to compact float32 bytes with header
+    :param embedding: embedding vector
+    :return: encoded bytes
+    """
+    vector = np.asarray(embedding, dtype=_DTYPE)
+    return _HEADER.pack(EMBEDDING_CODEC_MAGIC, EMBEDDING_CODEC_VERSION, vector.shape[0]) + vector.tobytes()
+
+
+def is_encoded_embedding(data: bytes) -> bool:
+    """
+    Check whether data is encoded by embedding codec
+    :param data: raw bytes
+    :return:
+    """
+    return data[:len(EMBEDDING_CODEC_MAGIC)] == EMBEDDING_CODEC_MAGIC
+
+
+def decode_embedding(data: bytes) -> np.ndarray:
+    """
+    Decode encoded embedding bytes without copying, the returned array is read-only
+    :param data: encoded bytes
+    :return: float32 embedding vector
+    """
+    if not is_encoded_embedding(data):
+        raise ValueError('invalid embedding codec magic')
+
+    _, version, dims = _HEADER.unpack_from(data)
+    if version != EMBEDDING_CODEC_VERSION:
+        raise ValueError(f'unsupported embedding codec version {version}')
+
+    if len(data) != _HEADER.size + dims * _DTYPE.itemsize:
+        raise ValueError('invalid embedding codec length')
+
+    return np.frombuffer(data, dtype=_DTYPE, count=dims, offset=_HEADER.size)
@@ -0,0 +1,186 @@
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, TypeVar
+
+from core.model_runtime.errors.invoke import InvokeRateLimitError
+
+logger = logging.getLogger(__name__)
+
+# max number of embedding batches of a provider running concurrently in a process
+INDEXING_EMBEDDING_MAX_CONCURRENCY = int(os.environ.get('INDEXING_EMBEDDING_MAX_CONCURRENCY', 10))
+# per provider override of the max concurrency, e.g. `openai=32,cohere=4`
+INDEXING_EMBEDDING_PROVIDER_MAX_CONCURRENCY = os.environ.get('INDEXING_EMBEDDING_PROVIDER_MAX_CONCURRENCY', '')
+# min number of texts of an embedding batch, each batch is upserted and its segments completed at once
+INDEXING_EMBEDDING_BATCH_MIN_SIZE = int(os.environ.get('INDEXING_EMBEDDING_BATCH_MIN_SIZE', 10))
+# max tokens of the texts of an embedding batch
+INDEXING_EMBEDDING_BATCH_MAX_TOKENS = int(os.environ.get('INDEXING_EMBEDDING_BATCH_MAX_TOKENS', 100000))
+# max retries of an embedding batch which hit the rate limit of the provider
+INDEXING_EMBEDDING_MAX_RETRIES = int(os.environ.get('INDEXING_EMBEDDING_MAX_RETRIES', 8))
+
+T = TypeVar('T')
+
+
+def get_provider_max_concurrency(provider: str) -> int:
+    """
+    Get max embedding concurrency of provider
+    :param provider: provider name
+    :return:
+    """
+    for item in INDEXING_EMBEDDING_PROVIDER_MAX_CONCURRENCY.split(','):
+        name, _, value = item.partition('=')
+        if name.strip() == provider and value.strip():
+            return max(int(value), 1)
+
+    return max(INDEXING_EMBEDDING_MAX_CONCURRENCY, 1)
+
+
+class AIMDConcurrencyLimiter:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+
+    The limit grows by one after a limit's worth of successful batches and halves on rate limit errors,
+    so it converges to the throughput the provider actually allows.
+    """
+    # rate limit errors of batches started before a decrease belong to the same overload, ignore them meanwhile
+    DECREASE_INTERVAL = 1.0
+
+    def __init__(self, max_limit: int, initial_limit: Optional[int] = None):
+        self.max_limit = max_limit
+        self.limit = float(initial_limit or max(max_limit // 2, 1))
+        self._in_flight = 0
+        self._decreased_at = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+
+            self._in_flight += 1
+
+    def release(self, rate_limited: bool = False) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if rate_limited:
+                if now - self._decreased_at >= self.DECREASE_INTERVAL:
+                    self.limit = max(self.limit / 2, 1.0)
+                    self._decreased_at = now
+            else:
+                self.limit = min(self.limit + 1 / self.limit, float(self.max_limit))
+
+            self._condition.notify_all()
+
+
+class EmbeddingBatchScheduler:
+    """
+    Run embedding batches of a provider with adaptive concurrency.
+
+    Limiters are shared by all indexing runs of a tenant and provider in the process, since they share
+    the rate limit of the provider credentials. Batches that hit the rate limit are retried with backoff.
+    """
+    _limiters: dict[tuple[str, str], AIMDConcurrencyLimiter] = {}
+    _limiters_lock = threading.Lock()
+
+    # seconds of the first backoff after a rate limit error, doubled on each retry
+    BACKOFF_BASE = 1.0
+    BACKOFF_MAX = 60.0
+
+    def __init__(self, tenant_id: str, provider: str):
+        self.provider = provider
+        self.limiter = self._get_limiter(tenant_id, provider)
+
+    @staticmethod
+    def plan_batches(items: Sequence[T], token_counts: Sequence[int], max_chunks: int,
+                     max_tokens: int = INDEXING_EMBEDDING_BATCH_MAX_TOKENS,
+                     min_size: int = INDEXING_EMBEDDING_BATCH_MIN_SIZE) -> list[list[T]]:
+        """
+        Pack items into batches in order. A batch is embedded in requests of max chunks texts, so it holds
+        the smallest multiple of max chunks texts which is at least the min size, bounded by the max tokens
+        :param items: items to embed
+        :param token_counts: token count of each item
+        :param max_chunks: max number of texts of an embedding request
+        :param max_tokens: max tokens of a batch
+        :param min_size: min number of texts of a batch
+        :return: batches
+        """
+        max_size = max_chunks * math.ceil(min_size / max_chunks)
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for item, tokens in zip(items, token_counts):
+            if batch and (len(batch) >= max_size or batch_tokens + tokens > max_tokens):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+
+            batch.append(item)
+            batch_tokens += tokens
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def run(self, batches: list[T], func: Callable[[T], None]) -> None:
+        """
+        Run func on each batch, raise the first error other than exhausted rate limit retries
+        :param batches: batches
+        :param func: function embedding a batch
+        :return:
+        """
+        if not batches:
+            return
+
+        failed = threading.Event()
+
+        def run_batch(batch: T) -> None:
+            retries = 0
+            while not failed.is_set():
+                self.limiter.acquire()
+                rate_limited = False
+                try:
+                    func(batch)
+                    return
+                except InvokeRateLimitError:
+                    rate_limited = True
+                    if retries >= INDEXING_EMBEDDING_MAX_RETRIES:
+                        raise
+                except Exception:
+                    failed.set()
+                    raise
+                finally:
+                    self.limiter.release(rate_limited=rate_limited)
+
+                backoff = min(self.BACKOFF_BASE * 2 ** retries, self.BACKOFF_MAX)
+                retries += 1
+                logger.warning(f'Embedding rate limited by {self.provider}, '
+                               f'retry {retries} in {backoff:.1f}s, concurrency limit {int(self.limiter.limit)}')
+                time.sleep(backoff * random.uniform(0.5, 1.0))
+
+        max_workers = min(self.limiter.max_limit, len(batches))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='embedding_batch') as executor:
+            futures = [executor.submit(run_batch, batch) for batch in batches]
+            try:
+                for future in futures:
+                    future.result()
+            except Exception:
+                failed.set()
+                raise
+
+    @classmethod
+    def _get_limiter(cls, tenant_id: str, provider: str) -> AIMDConcurrencyLimiter:
+        with cls._limiters_lock:
+            key = (tenant_id, provider)
+            limiter = cls._limiters.get(key)
+            if limiter is None:
+                limiter = AIMDConcurrencyLimiter(max_limit=get_provider_max_concurrency(provider))
+                cls._limiters[key] = limiter
+
+            return limiter
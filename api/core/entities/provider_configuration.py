@@ -10,7 +10,11 @@ from pydantic import BaseModel
 from core.entities.model_entities import ModelStatus, ModelWithProviderEntity, SimpleModelProviderEntity
 from core.entities.provider_entities import CustomConfiguration, SystemConfiguration, SystemConfigurationStatus
 from core.helper import encrypter
-from core.helper.model_provider_cache import ProviderCredentialsCache, ProviderCredentialsCacheType
+from core.helper.model_provider_cache import (
+    ProviderConfigurationsCache,
+    ProviderCredentialsCache,
+    ProviderCredentialsCacheType,
+)
 from core.model_runtime.entities.model_entities import FetchFrom, ModelType
 from core.model_runtime.entities.provider_entities import (
     ConfigurateMethod,
@@ -80,13 +84,14 @@ class ProviderConfiguration(BaseModel):
 
             return copy_credentials
         else:
+            # configurations are shared between requests, and model runtimes may modify the credentials
             if self.custom_configuration.models:
                 for model_configuration in self.custom_configuration.models:
                     if model_configuration.model_type == model_type and model_configuration.model == model:
-                        return model_configuration.credentials
+                        return model_configuration.credentials.copy()
 
             if self.custom_configuration.provider:
-                return self.custom_configuration.provider.credentials
+                return self.custom_configuration.provider.credentials.copy()
             else:
                 return None
 
@@ -223,6 +228,7 @@ class ProviderConfiguration(BaseModel):
         )
 
         provider_model_credentials_cache.delete()
+        ProviderConfigurationsCache.invalidate(self.tenant_id)
 
         self.switch_preferred_provider_type(ProviderType.CUSTOM)
 
@@ -253,6 +259,7 @@ class ProviderConfiguration(BaseModel):
             )
 
             provider_model_credentials_cache.delete()
+            ProviderConfigurationsCache.invalidate(self.tenant_id)
 
     def get_custom_model_credentials(self, model_type: ModelType, model: str, obfuscated: bool = False) \
             -> Optional[dict]:
@@ -372,6 +379,7 @@ class ProviderConfiguration(BaseModel):
         )
 
         provider_model_credentials_cache.delete()
+        ProviderConfigurationsCache.invalidate(self.tenant_id)
 
     def delete_custom_model_credentials(self, model_type: ModelType, model: str) -> None:
         """
@@ -401,6 +409,7 @@ class ProviderConfiguration(BaseModel):
             )
 
             provider_model_credentials_cache.delete()
+            ProviderConfigurationsCache.invalidate(self.tenant_id)
 
     def get_provider_instance(self) -> ModelProvider:
         """
@@ -452,6 +461,7 @@ class ProviderConfiguration(BaseModel):
             db.session.add(preferred_model_provider)
 
         db.session.commit()
+        ProviderConfigurationsCache.invalidate(self.tenant_id)
 
     def _extract_secret_variables(self, credential_form_schemas: list[CredentialFormSchema]) -> list[str]:
         """
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from json import JSONDecodeError
+from typing import Optional
+
+from extensions.ext_redis import redis_client
+
+# seconds an api token resolved to its app and workspace is cached
+API_TOKEN_CACHE_TTL = int(os.environ.get('API_TOKEN_CACHE_TTL', 600))
+
+
+class ApiTokenCache:
+    def __init__(self, scope: str, token: str):
+        # tokens are secrets, only their hashes are kept in redis
+        self.cache_key = f"api_token:{scope}:{hashlib.sha256(token.encode()).hexdigest()}"
+
+    def get(self) -> Optional[dict]:
+        """
+        Get cached api token.
+
+        :return: id, app_id, tenant_id and type of the api token
+        """
+        cached_api_token = redis_client.get(self.cache_key)
+        if cached_api_token:
+            try:
+                return json.loads(cached_api_token.decode('utf-8'))
+            except JSONDecodeError:
+                return None
+        else:
+            return None
+
+    def set(self, api_token: dict) -> None:
+        """
+        Cache api token.
+
+        :param api_token: id, app_id, tenant_id and type of the api token
+        :return:
+        """
+        redis_client.setex(self.cache_key, API_TOKEN_CACHE_TTL, json.dumps(api_token))
+
+    def delete(self) -> None:
+        """
+        Delete cached api token.
+
+        :return:
+        """
+        redis_client.delete(self.cache_key)
+
+
+class ApiTokenLastUsedAtBuffer:
+    """
+    Last used time of api tokens buffered in a redis hash, and written to the database by a periodic task,
+    which is scheduled by celery beat.
+
+    Each request only sets the time of its token in the hash, so all uses of a token between two flushes are
+    coalesced into one update. A flush renames the hash first, and deletes it once the times are written,
+    so the times of a failed flush are written by the next one.
+    """
+    cache_key = 'api_token_last_used_at'
+    flushing_cache_key = 'api_token_last_used_at:flushing'
+
+    @classmethod
+    def set(cls, api_token_id: str, last_used_at: datetime) -> None:
+        """
+        Set last used time of api token.
+
+        :param api_token_id: api token id
+        :param last_used_at: last used time
+        :return:
+        """
+        redis_client.hset(cls.cache_key, api_token_id, last_used_at.isoformat())
+
+    @classmethod
+    def get(cls, api_token_ids: list[str]) -> dict[str, datetime]:
+        """
+        Get last used time of api tokens which is not written to the database yet.
+
+        :param api_token_ids: api token ids
+        :return: api token id to last used time
+        """
+        if not api_token_ids:
+            return {}
+
+        last_used_at = {}
+        for key in [cls.flushing_cache_key, cls.cache_key]:
+            for api_token_id, value in zip(api_token_ids, redis_client.hmget(key, api_token_ids)):
+                if value:
+                    last_used_at[api_token_id] = datetime.fromisoformat(value.decode('utf-8'))
+
+        return last_used_at
+
+    @classmethod
+    def begin_flush(cls) -> dict[str, datetime]:
+        """
+        Take the buffered last used times to write to the database.
+
+        :return: api token id to last used time
+        """
+        if not redis_client.exists(cls.flushing_cache_key):
+            if not redis_client.exists(cls.cache_key):
+                return {}
+
+            redis_client.rename(cls.cache_key, cls.flushing_cache_key)
+
+        return {
+            api_token_id.decode('utf-8'): datetime.fromisoformat(value.decode('utf-8'))
+            for api_token_id, value in redis_client.hgetall(cls.flushing_cache_key).items()
+        }
+
+    @classmethod
+    def complete_flush(cls) -> None:
+        """
+        Drop the last used times written to the database.
+
+        :return:
+        """
+        redis_client.delete(cls.flushing_cache_key)
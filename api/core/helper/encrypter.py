@@ -1,9 +1,22 @@
 import base64
+import os
+from threading import Lock
+
+from cachetools import TTLCache
 
 from extensions.ext_database import db
 from libs import rsa
 from models.account import Tenant
 
+# seconds a decrypted token is cached in process, and max number of tokens cached
+DECRYPTED_TOKEN_CACHE_TTL = int(os.environ.get('DECRYPTED_TOKEN_CACHE_TTL', 60))
+DECRYPTED_TOKEN_CACHE_MAX_SIZE = int(os.environ.get('DECRYPTED_TOKEN_CACHE_MAX_SIZE', 10000))
+
+# (tenant id, encrypted token) to decrypted token, an encrypted token never changes its decrypted value,
+# updated credentials are encrypted into new tokens and never read stale values
+_decrypted_token_cache = TTLCache(maxsize=DECRYPTED_TOKEN_CACHE_MAX_SIZE, ttl=DECRYPTED_TOKEN_CACHE_TTL)
+_decrypted_token_cache_lock = Lock()
+
 
 def obfuscated_token(token: str):
     return token[:6] + '*' * (len(token) - 8) + token[-2:]
@@ -16,13 +29,19 @@ def encrypt_token(tenant_id: str, token: str):
 
 
 def decrypt_token(tenant_id: str, token: str):
-    return rsa.decrypt(base64.b64decode(token), tenant_id)
+    with _decrypted_token_cache_lock:
+        decrypted_token = _decrypted_token_cache.get((tenant_id, token))
 
+    if decrypted_token is None:
+        decrypted_token = rsa.decrypt(base64.b64decode(token), tenant_id)
+        with _decrypted_token_cache_lock:
+            _decrypted_token_cache[(tenant_id, token)] = decrypted_token
+
+    return decrypted_token
 
-def batch_decrypt_token(tenant_id: str, tokens: list[str]):
-    rsa_key, cipher_rsa = rsa.get_decrypt_decoding(tenant_id)
 
-    return [rsa.decrypt_token_with_decoding(base64.b64decode(token), rsa_key, cipher_rsa) for token in tokens]
+def batch_decrypt_token(tenant_id: str, tokens: list[str]):
+    return [decrypt_token(tenant_id, token) for token in tokens]
 
 
 def get_decrypt_decoding(tenant_id: str):
@@ -1,10 +1,24 @@
 import json
+import os
+import time
+from collections import OrderedDict
 from enum import Enum
 from json import JSONDecodeError
-from typing import Optional
+from threading import Lock
+from typing import TYPE_CHECKING, Optional
 
 from extensions.ext_redis import redis_client
 
+if TYPE_CHECKING:
+    from core.entities.provider_configuration import ProviderConfigurations
+
+# max seconds provider configurations are cached in process, bounds staleness of records written by other services
+PROVIDER_CONFIGURATIONS_CACHE_TTL = int(os.environ.get('PROVIDER_CONFIGURATIONS_CACHE_TTL', 300))
+# min seconds between two checks of the version of cached provider configurations in redis
+PROVIDER_CONFIGURATIONS_CACHE_CHECK_INTERVAL = float(os.environ.get('PROVIDER_CONFIGURATIONS_CACHE_CHECK_INTERVAL', 1))
+# max number of tenants whose provider configurations are cached in process
+PROVIDER_CONFIGURATIONS_CACHE_MAX_TENANTS = int(os.environ.get('PROVIDER_CONFIGURATIONS_CACHE_MAX_TENANTS', 1000))
+
 
 class ProviderCredentialsCacheType(Enum):
     PROVIDER = "provider"
@@ -49,3 +63,95 @@ class ProviderCredentialsCache:
         :return:
         """
         redis_client.delete(self.cache_key)
+
+
+class _ProviderConfigurationsCacheEntry:
+    def __init__(self, version: int, provider_configurations: 'ProviderConfigurations'):
+        self.version = version
+        self.provider_configurations = provider_configurations
+        self.cached_at = time.monotonic()
+        self.checked_at = self.cached_at
+
+
+class ProviderConfigurationsCache:
+    """
+    In-process cache of the provider configurations of tenants, stamped with a version of the tenant in redis.
+
+    Writes to the provider records of a tenant invalidate it, which drops the configurations cached in this process
+    and bumps the version, so other processes rebuild them once they see the new version. Cached configurations are
+    shared by all requests of the tenant in the process and must not be modified.
+    """
+    _entries: OrderedDict[str, _ProviderConfigurationsCacheEntry] = OrderedDict()
+    _lock = Lock()
+
+    @classmethod
+    def get(cls, tenant_id: str) -> Optional['ProviderConfigurations']:
+        """
+        Get cached provider configurations of tenant.
+
+        :param tenant_id: workspace id
+        :return:
+        """
+        with cls._lock:
+            entry = cls._entries.get(tenant_id)
+            if entry:
+                cls._entries.move_to_end(tenant_id)
+
+        if not entry:
+            return None
+
+        now = time.monotonic()
+        if now - entry.cached_at > PROVIDER_CONFIGURATIONS_CACHE_TTL:
+            return None
+
+        if now - entry.checked_at >= PROVIDER_CONFIGURATIONS_CACHE_CHECK_INTERVAL:
+            if cls.get_version(tenant_id) != entry.version:
+                return None
+
+            entry.checked_at = now
+
+        return entry.provider_configurations
+
+    @classmethod
+    def set(cls, tenant_id: str, version: int, provider_configurations: 'ProviderConfigurations') -> None:
+        """
+        Cache provider configurations of tenant.
+
+        :param tenant_id: workspace id
+        :param version: version of the tenant read before the provider configurations were built
+        :param provider_configurations: provider configurations
+        :return:
+        """
+        with cls._lock:
+            cls._entries[tenant_id] = _ProviderConfigurationsCacheEntry(version, provider_configurations)
+            cls._entries.move_to_end(tenant_id)
+            while len(cls._entries) > PROVIDER_CONFIGURATIONS_CACHE_MAX_TENANTS:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def get_version(cls, tenant_id: str) -> int:
+        """
+        Get version of the provider configurations of tenant.
+
+        :param tenant_id: workspace id
+        :return:
+        """
+        version = redis_client.get(cls._version_key(tenant_id))
+        return int(version) if version else 0
+
+    @classmethod
+    def invalidate(cls, tenant_id: str) -> None:
+        """
+        Invalidate cached provider configurations of tenant in all processes.
+
+        :param tenant_id: workspace id
+        :return:
+        """
+        with cls._lock:
+            cls._entries.pop(tenant_id, None)
+
+        redis_client.incr(cls._version_key(tenant_id))
+
+    @staticmethod
+    def _version_key(tenant_id: str) -> str:
+        return f"provider_configurations_version:tenant_id:{tenant_id}"
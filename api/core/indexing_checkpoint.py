@@ -0,0 +1,87 @@
+import os
+
+from extensions.ext_redis import redis_client
+
+# seconds an indexing checkpoint is kept after its last update, an interrupted indexing resumed later starts over
+INDEXING_CHECKPOINT_TTL = int(os.environ.get('INDEXING_CHECKPOINT_TTL', 7 * 24 * 3600))
+
+
+class IndexingCheckpoint:
+    """
+    Progress of indexing a document, so an interrupted indexing resumes where it stopped.
+
+    Segments are saved in the order of the text documents they are split from, with increasing positions.
+    The checkpoint records how many text documents are split and how many segments are saved for them,
+    while upserted segments are recorded by their `completed` status and embedded texts by the embedding cache.
+    A resumed indexing skips the split text documents and the upserted segments, and only embeds and upserts
+    the remaining ones. The embedding tokens of all runs are accumulated for the document.
+    """
+
+    def __init__(self, document_id: str):
+        self._key = 'document_{}_indexing_checkpoint'.format(document_id)
+
+    def reset(self) -> None:
+        """
+        Start indexing the document from scratch
+        :return:
+        """
+        redis_client.delete(self._key)
+
+    def is_splitting(self) -> bool:
+        """
+        Whether the document is split in batches and splitting has not completed
+        :return:
+        """
+        values = self._get()
+        return 'split_text_docs' in values and not values.get('split_completed')
+
+    def get_split_progress(self) -> tuple[int, int]:
+        """
+        Get split progress
+        :return: number of split text documents, number of their saved segments
+        """
+        values = self._get()
+        return values.get('split_text_docs', 0), values.get('split_segments', 0)
+
+    def save_split_progress(self, split_text_docs: int, split_segments: int) -> None:
+        """
+        Save split progress once the segments of the split text documents are saved
+        :param split_text_docs: number of split text documents
+        :param split_segments: number of their saved segments
+        :return:
+        """
+        self._set({'split_text_docs': split_text_docs, 'split_segments': split_segments})
+
+    def complete_split(self) -> None:
+        """
+        Record that all text documents are split and their segments saved
+        :return:
+        """
+        self._set({'split_completed': 1})
+
+    def add_tokens(self, tokens: int) -> None:
+        """
+        Add embedding tokens of upserted segments
+        :param tokens: embedding tokens
+        :return:
+        """
+        pipeline = redis_client.pipeline()
+        pipeline.hincrby(self._key, 'tokens', tokens)
+        pipeline.expire(self._key, INDEXING_CHECKPOINT_TTL)
+        pipeline.execute()
+
+    def get_tokens(self) -> int:
+        """
+        Get embedding tokens of all upserted segments
+        :return:
+        """
+        return self._get().get('tokens', 0)
+
+    def _get(self) -> dict[str, int]:
+        return {key.decode('utf-8'): int(value) for key, value in redis_client.hgetall(self._key).items()}
+
+    def _set(self, values: dict[str, int]) -> None:
+        pipeline = redis_client.pipeline()
+        pipeline.hset(self._key, mapping=values)
+        pipeline.expire(self._key, INDEXING_CHECKPOINT_TTL)
+        pipeline.execute()
@@ -1,22 +1,27 @@
-import concurrent.futures
 import datetime
 import json
 import logging
+import os
+import queue
 import re
 import threading
 import time
 import uuid
-from typing import Optional, cast
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Union, cast
 
 from flask import Flask, current_app
 from flask_login import current_user
 from sqlalchemy.orm.exc import ObjectDeletedError
 
 from core.docstore.dataset_docstore import DatasetDocumentStore
+from core.embedding.embedding_scheduler import EmbeddingBatchScheduler
 from core.errors.error import ProviderTokenNotInitError
+from core.indexing_checkpoint import IndexingCheckpoint
 from core.llm_generator.llm_generator import LLMGenerator
 from core.model_manager import ModelInstance, ModelManager
-from core.model_runtime.entities.model_entities import ModelType, PriceType
+from core.model_runtime.entities.model_entities import ModelPropertyKey, ModelType, PriceType
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
 from core.rag.datasource.keyword.keyword_factory import Keyword
@@ -35,6 +40,14 @@ from models.dataset import Document as DatasetDocument
 from models.model import UploadFile
 from services.feature_service import FeatureService
 
+# `batch` runs each indexing stage over the whole document, `streaming` runs extract, clean and split
+# concurrently with saving segments, embedding and vector upsert in rolling batches
+INDEXING_PIPELINE_MODE = os.environ.get('INDEXING_PIPELINE_MODE', 'batch')
+# number of segments of a rolling batch in streaming mode
+INDEXING_STREAMING_BATCH_SIZE = int(os.environ.get('INDEXING_STREAMING_BATCH_SIZE', 100))
+# max number of split batches waiting to be loaded in streaming mode, splitting blocks when it is reached
+INDEXING_STREAMING_QUEUE_SIZE = int(os.environ.get('INDEXING_STREAMING_QUEUE_SIZE', 4))
+
 
 class IndexingRunner:
 
@@ -60,22 +73,7 @@ class IndexingRunner:
                     first()
                 index_type = dataset_document.doc_form
                 index_processor = IndexProcessorFactory(index_type).init_index_processor()
-                # extract
-                text_docs = self._extract(index_processor, dataset_document, processing_rule.to_dict())
-
-                # transform
-                documents = self._transform(index_processor, dataset, text_docs, dataset_document.doc_language,
-                                            processing_rule.to_dict())
-                # save segment
-                self._load_segments(dataset, dataset_document, documents)
-
-                # load
-                self._load(
-                    index_processor=index_processor,
-                    dataset=dataset,
-                    dataset_document=dataset_document,
-                    documents=documents
-                )
+                self._run_pipeline(index_processor, dataset, dataset_document, processing_rule)
             except DocumentIsPausedException:
                 raise DocumentIsPausedException('Document paused, document id: {}'.format(dataset_document.id))
             except ProviderTokenNotInitError as e:
@@ -119,22 +117,7 @@ class IndexingRunner:
 
             index_type = dataset_document.doc_form
             index_processor = IndexProcessorFactory(index_type).init_index_processor()
-            # extract
-            text_docs = self._extract(index_processor, dataset_document, processing_rule.to_dict())
-
-            # transform
-            documents = self._transform(index_processor, dataset, text_docs, dataset_document.doc_language,
-                                        processing_rule.to_dict())
-            # save segment
-            self._load_segments(dataset, dataset_document, documents)
-
-            # load
-            self._load(
-                index_processor=index_processor,
-                dataset=dataset,
-                dataset_document=dataset_document,
-                documents=documents
-            )
+            self._run_pipeline(index_processor, dataset, dataset_document, processing_rule)
         except DocumentIsPausedException:
             raise DocumentIsPausedException('Document paused, document id: {}'.format(dataset_document.id))
         except ProviderTokenNotInitError as e:
@@ -160,30 +143,6 @@ class IndexingRunner:
             if not dataset:
                 raise ValueError("no dataset found")
 
-            # get exist document_segment list and delete
-            document_segments = DocumentSegment.query.filter_by(
-                dataset_id=dataset.id,
-                document_id=dataset_document.id
-            ).all()
-
-            documents = []
-            if document_segments:
-                for document_segment in document_segments:
-                    # transform segment to node
-                    if document_segment.status != "completed":
-                        document = Document(
-                            page_content=document_segment.content,
-                            metadata={
-                                "doc_id": document_segment.index_node_id,
-                                "doc_hash": document_segment.index_node_hash,
-                                "document_id": document_segment.document_id,
-                                "dataset_id": document_segment.dataset_id,
-                            }
-                        )
-
-                        documents.append(document)
-
-            # build index
             # get the process rule
             processing_rule = db.session.query(DatasetProcessRule). \
                 filter(DatasetProcessRule.id == dataset_document.dataset_process_rule_id). \
@@ -191,6 +150,15 @@ class IndexingRunner:
 
             index_type = dataset_document.doc_form
             index_processor = IndexProcessorFactory(index_type).init_index_processor()
+
+            # the document was interrupted while split in batches, resume splitting after the saved segments
+            if IndexingCheckpoint(dataset_document.id).is_splitting():
+                self._run_streaming_pipeline(index_processor, dataset, dataset_document, processing_rule,
+                                             resume=True)
+                return
+
+            # build index of the segments which are not upserted yet
+            documents = self._get_pending_documents(dataset_document)
             self._load(
                 index_processor=index_processor,
                 dataset=dataset,
@@ -211,6 +179,243 @@ class IndexingRunner:
             dataset_document.stopped_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
             db.session.commit()
 
+    def _run_pipeline(self, index_processor: BaseIndexProcessor, dataset: Dataset,
+                      dataset_document: DatasetDocument, processing_rule: DatasetProcessRule) -> None:
+        """
+        Run extract, transform and load of the document in the configured pipeline mode.
+        """
+        IndexingCheckpoint(dataset_document.id).reset()
+
+        if INDEXING_PIPELINE_MODE == 'streaming':
+            self._run_streaming_pipeline(index_processor, dataset, dataset_document, processing_rule)
+            return
+
+        # extract
+        text_docs = self._extract(index_processor, dataset_document, processing_rule.to_dict())
+
+        # transform
+        documents = self._transform(index_processor, dataset, text_docs, dataset_document.doc_language,
+                                    processing_rule.to_dict())
+        # save segment
+        self._load_segments(dataset, dataset_document, documents)
+
+        # load
+        self._load(
+            index_processor=index_processor,
+            dataset=dataset,
+            dataset_document=dataset_document,
+            documents=documents
+        )
+
+    def _run_streaming_pipeline(self, index_processor: BaseIndexProcessor, dataset: Dataset,
+                                dataset_document: DatasetDocument, processing_rule: DatasetProcessRule,
+                                resume: bool = False) -> None:
+        """
+        Clean and split the extracted text documents in a producer thread, while segments are saved, embedded
+        and upserted in rolling batches in the calling thread. The bounded queue between them blocks splitting
+        when loading falls behind, so only a few batches of documents are held in memory, and the first batches
+        are searchable before the whole document is split. Keywords of each batch are extracted in a background
+        thread while it is embedded, and the keyword index of the document is written once all batches are loaded.
+        Split progress is checkpointed with each saved batch, a resumed run upserts the saved segments which
+        are not upserted yet, and splits the text documents after the checkpoint.
+        """
+        process_rule = processing_rule.to_dict()
+        checkpoint = IndexingCheckpoint(dataset_document.id)
+        if resume:
+            split_text_docs, split_segments = checkpoint.get_split_progress()
+            # segments saved after the checkpoint are split again
+            self._delete_segments_after(index_processor, dataset, dataset_document, split_segments)
+            text_docs = self._extract_text_docs(index_processor, dataset_document, process_rule)[split_text_docs:]
+        else:
+            split_text_docs, split_segments = 0, 0
+            checkpoint.save_split_progress(split_text_docs, split_segments)
+            text_docs = self._extract(index_processor, dataset_document, process_rule)
+
+        indexing_start_at = time.perf_counter()
+        document_batches = queue.Queue(maxsize=INDEXING_STREAMING_QUEUE_SIZE)
+        stop_event = threading.Event()
+        split_result = {}
+        split_thread = threading.Thread(target=self._split_in_batches, kwargs={
+            'flask_app': current_app._get_current_object(),
+            'index_processor': index_processor,
+            'text_docs': deque(text_docs),
+            'embedding_model_instance': self._get_embedding_model_instance(dataset),
+            'process_rule': process_rule,
+            'tenant_id': dataset.tenant_id,
+            'doc_language': dataset_document.doc_language,
+            'document_batches': document_batches,
+            'stop_event': stop_event,
+            'split_result': split_result
+        })
+        # the producer holds the only reference of the text documents, they are released once split
+        del text_docs
+        split_thread.start()
+
+        doc_store = DatasetDocumentStore(
+            dataset=dataset,
+            user_id=dataset_document.created_by,
+            document_id=dataset_document.id
+        )
+        # keywords of the batches are added in order in one thread, while the batches are embedded
+        keyword_executor = ThreadPoolExecutor(max_workers=1)
+        keyword_future = None
+
+        def load_batch(documents: list[Document]) -> None:
+            nonlocal keyword_future
+            if not documents:
+                return
+
+            # at most one batch waits for its keywords, so only a few batches are held in memory
+            if keyword_future:
+                keyword_future.result()
+            keyword_future = keyword_executor.submit(self._process_keyword_index, current_app._get_current_object(),
+                                                     dataset.id, dataset_document.id, documents, in_batches=True)
+            self._load_chunks(index_processor, dataset, dataset_document, documents)
+
+        first_batch = not resume
+        try:
+            if resume:
+                load_batch(self._get_pending_documents(dataset_document))
+
+            while True:
+                item = document_batches.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                documents, batch_split_text_docs, batch_split_segments = item
+                if first_batch:
+                    first_batch = False
+                    # update document status to indexing with the first batch
+                    self._update_document_index_status(
+                        document_id=dataset_document.id,
+                        after_indexing_status="indexing",
+                        extra_update_params={
+                            DatasetDocument.cleaning_completed_at:
+                                datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None),
+                        }
+                    )
+
+                # save segments of the batch, then embed and upsert them
+                doc_store.add_documents(documents)
+                document_ids = [document.metadata['doc_id'] for document in documents]
+                DocumentSegment.query.filter(
+                    DocumentSegment.document_id == dataset_document.id,
+                    DocumentSegment.index_node_id.in_(document_ids)
+                ).update({
+                    DocumentSegment.status: "indexing",
+                    DocumentSegment.indexing_at: datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+                }, synchronize_session=False)
+                db.session.commit()
+                # segments of a text document split across batches are only checkpointed with its last batch
+                checkpoint.save_split_progress(split_text_docs + batch_split_text_docs,
+                                               split_segments + batch_split_segments)
+
+                load_batch(documents)
+
+            if keyword_future:
+                keyword_future.result()
+            # the keyword index of the document is completed once, also for the segments of earlier runs
+            Keyword(dataset).complete_document(dataset_document.id)
+            checkpoint.complete_split()
+        finally:
+            stop_event.set()
+            split_thread.join()
+            keyword_executor.shutdown(cancel_futures=True)
+
+        indexing_end_at = time.perf_counter()
+
+        # update document status to completed
+        self._update_document_index_status(
+            document_id=dataset_document.id,
+            after_indexing_status="completed",
+            extra_update_params={
+                DatasetDocument.splitting_completed_at: split_result.get('completed_at'),
+                DatasetDocument.tokens: checkpoint.get_tokens(),
+                DatasetDocument.completed_at: datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None),
+                DatasetDocument.indexing_latency: indexing_end_at - indexing_start_at,
+            }
+        )
+        checkpoint.reset()
+
+    def _delete_segments_after(self, index_processor: BaseIndexProcessor, dataset: Dataset,
+                               dataset_document: DatasetDocument, position: int) -> None:
+        """
+        Delete the segments of the document after the position, from the index too as they may be upserted already.
+        """
+        document_segments = DocumentSegment.query.filter(
+            DocumentSegment.document_id == dataset_document.id,
+            DocumentSegment.position > position
+        )
+        index_node_ids = [document_segment.index_node_id for document_segment in document_segments.all()]
+        if index_node_ids:
+            index_processor.clean(dataset, index_node_ids)
+
+        document_segments.delete(synchronize_session=False)
+        db.session.commit()
+
+    def _split_in_batches(self, flask_app: Flask, index_processor: BaseIndexProcessor, text_docs: deque[Document],
+                          embedding_model_instance: Optional[ModelInstance], process_rule: dict, tenant_id: str,
+                          doc_language: str, document_batches: queue.Queue, stop_event: threading.Event,
+                          split_result: dict) -> None:
+        """
+        Clean and split text documents one by one, and put the documents to the queue in batches together with
+        the number of text documents whose documents are all put and the number of their documents,
+        followed by None when all are split, or the exception if splitting failed.
+        """
+        def put(item: Union[tuple[list[Document], int, int], Exception, None]) -> bool:
+            # wait for the consumer, unless it stopped
+            while not stop_event.is_set():
+                try:
+                    document_batches.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+
+            return False
+
+        # number of documents split so far at the end of each text document whose documents are not all put
+        text_doc_ends = deque()
+        split_count = 0
+        put_count = 0
+        put_text_docs = 0
+        put_text_doc_documents = 0
+
+        def put_batch(documents: list[Document]) -> bool:
+            nonlocal put_count, put_text_docs, put_text_doc_documents
+            put_count += len(documents)
+            while text_doc_ends and text_doc_ends[0] <= put_count:
+                put_text_doc_documents = text_doc_ends.popleft()
+                put_text_docs += 1
+
+            return put((documents, put_text_docs, put_text_doc_documents))
+
+        with flask_app.app_context():
+            try:
+                batch = []
+                while text_docs:
+                    text_doc = text_docs.popleft()
+                    documents = index_processor.transform([text_doc],
+                                                          embedding_model_instance=embedding_model_instance,
+                                                          process_rule=process_rule, tenant_id=tenant_id,
+                                                          doc_language=doc_language)
+                    batch.extend(documents)
+                    split_count += len(documents)
+                    text_doc_ends.append(split_count)
+                    while len(batch) >= INDEXING_STREAMING_BATCH_SIZE:
+                        if not put_batch(batch[:INDEXING_STREAMING_BATCH_SIZE]):
+                            return
+                        batch = batch[INDEXING_STREAMING_BATCH_SIZE:]
+
+                if batch and not put_batch(batch):
+                    return
+
+                split_result['completed_at'] = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+                put(None)
+            except Exception as e:
+                put(e)
+
     def indexing_estimate(self, tenant_id: str, extract_settings: list[ExtractSetting], tmp_processing_rule: dict,
                           doc_form: str = None, doc_language: str = 'English', dataset_id: str = None,
                           indexing_technique: str = 'economy') -> dict:
@@ -339,6 +544,24 @@ class IndexingRunner:
 
     def _extract(self, index_processor: BaseIndexProcessor, dataset_document: DatasetDocument, process_rule: dict) \
             -> list[Document]:
+        if dataset_document.data_source_type not in ["upload_file", "notion_import"]:
+            return []
+
+        text_docs = self._extract_text_docs(index_processor, dataset_document, process_rule)
+        # update document status to splitting
+        self._update_document_index_status(
+            document_id=dataset_document.id,
+            after_indexing_status="splitting",
+            extra_update_params={
+                DatasetDocument.word_count: sum([len(text_doc.page_content) for text_doc in text_docs]),
+                DatasetDocument.parsing_completed_at: datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+            }
+        )
+
+        return text_docs
+
+    def _extract_text_docs(self, index_processor: BaseIndexProcessor, dataset_document: DatasetDocument,
+                           process_rule: dict) -> list[Document]:
         # load file
         if dataset_document.data_source_type not in ["upload_file", "notion_import"]:
             return []
@@ -376,15 +599,6 @@ class IndexingRunner:
                 document_model=dataset_document.doc_form
             )
             text_docs = index_processor.extract(extract_setting, process_rule_mode=process_rule['mode'])
-        # update document status to splitting
-        self._update_document_index_status(
-            document_id=dataset_document.id,
-            after_indexing_status="splitting",
-            extra_update_params={
-                DatasetDocument.word_count: sum([len(text_doc.page_content) for text_doc in text_docs]),
-                DatasetDocument.parsing_completed_at: datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
-            }
-        )
 
         # replace doc id to document model id
         text_docs = cast(list[Document], text_docs)
@@ -640,41 +854,14 @@ class IndexingRunner:
         insert index and update document/segment status to completed
         """
 
-        embedding_model_instance = None
-        if dataset.indexing_technique == 'high_quality':
-            embedding_model_instance = self.model_manager.get_model_instance(
-                tenant_id=dataset.tenant_id,
-                provider=dataset.embedding_model_provider,
-                model_type=ModelType.TEXT_EMBEDDING,
-                model=dataset.embedding_model
-            )
-
-        # chunk nodes by chunk size
+        checkpoint = IndexingCheckpoint(dataset_document.id)
         indexing_start_at = time.perf_counter()
-        tokens = 0
-        chunk_size = 10
-
-        embedding_model_type_instance = None
-        if embedding_model_instance:
-            embedding_model_type_instance = embedding_model_instance.model_type_instance
-            embedding_model_type_instance = cast(TextEmbeddingModel, embedding_model_type_instance)
         # create keyword index
         create_keyword_thread = threading.Thread(target=self._process_keyword_index,
                                                  args=(current_app._get_current_object(),
                                                        dataset.id, dataset_document.id, documents))
         create_keyword_thread.start()
-        if dataset.indexing_technique == 'high_quality':
-            with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-                futures = []
-                for i in range(0, len(documents), chunk_size):
-                    chunk_documents = documents[i:i + chunk_size]
-                    futures.append(executor.submit(self._process_chunk, current_app._get_current_object(), index_processor,
-                                                   chunk_documents, dataset,
-                                                   dataset_document, embedding_model_instance,
-                                                   embedding_model_type_instance))
-
-                for future in futures:
-                    tokens += future.result()
+        self._load_chunks(index_processor, dataset, dataset_document, documents)
 
         create_keyword_thread.join()
         indexing_end_at = time.perf_counter()
@@ -684,19 +871,67 @@ class IndexingRunner:
             document_id=dataset_document.id,
             after_indexing_status="completed",
             extra_update_params={
-                DatasetDocument.tokens: tokens,
+                DatasetDocument.tokens: checkpoint.get_tokens(),
                 DatasetDocument.completed_at: datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None),
                 DatasetDocument.indexing_latency: indexing_end_at - indexing_start_at,
             }
         )
+        checkpoint.reset()
 
-    def _process_keyword_index(self, flask_app, dataset_id, document_id, documents):
+    def _load_chunks(self, index_processor: BaseIndexProcessor, dataset: Dataset,
+                     dataset_document: DatasetDocument, documents: list[Document]) -> None:
+        """
+        Embed and upsert documents into the vector index in batches, and mark their segments completed.
+        Batches are sized by the limits of the embedding model and run with adaptive concurrency per provider,
+        the embedding tokens of each upserted batch are added to the indexing checkpoint of the document.
+        """
+        if dataset.indexing_technique != 'high_quality':
+            return
+
+        embedding_model_instance = self.model_manager.get_model_instance(
+            tenant_id=dataset.tenant_id,
+            provider=dataset.embedding_model_provider,
+            model_type=ModelType.TEXT_EMBEDDING,
+            model=dataset.embedding_model
+        )
+        embedding_model_type_instance = cast(TextEmbeddingModel, embedding_model_instance.model_type_instance)
+
+        token_counts = embedding_model_type_instance.get_num_tokens_batch(
+            embedding_model_instance.model,
+            embedding_model_instance.credentials,
+            [document.page_content for document in documents]
+        )
+
+        model_schema = embedding_model_type_instance.get_model_schema(embedding_model_instance.model,
+                                                                      embedding_model_instance.credentials)
+        # CacheEmbedding embeds one text per request without max chunks, batches still group several requests
+        max_chunks = model_schema.model_properties.get(ModelPropertyKey.MAX_CHUNKS, 1) \
+            if model_schema and model_schema.model_properties else 1
+
+        checkpoint = IndexingCheckpoint(dataset_document.id)
+        flask_app = current_app._get_current_object()
+
+        def load_batch(batch: list[tuple[Document, int]]) -> None:
+            self._process_chunk(flask_app, index_processor, [document for document, _ in batch],
+                                dataset, dataset_document)
+            checkpoint.add_tokens(sum(tokens for _, tokens in batch))
+
+        scheduler = EmbeddingBatchScheduler(tenant_id=dataset.tenant_id, provider=embedding_model_instance.provider)
+        scheduler.run(
+            batches=scheduler.plan_batches(list(zip(documents, token_counts)), token_counts, max_chunks=max_chunks),
+            func=load_batch
+        )
+
+    def _process_keyword_index(self, flask_app, dataset_id, document_id, documents, in_batches=False):
         with flask_app.app_context():
             dataset = Dataset.query.filter_by(id=dataset_id).first()
             if not dataset:
                 raise ValueError("no dataset found")
             keyword = Keyword(dataset)
-            keyword.create(documents)
+            if in_batches:
+                keyword.add_texts_of_document(documents)
+            else:
+                keyword.create(documents)
             if dataset.indexing_technique != 'high_quality':
                 document_ids = [document.metadata['doc_id'] for document in documents]
                 db.session.query(DocumentSegment).filter(
@@ -711,23 +946,11 @@ class IndexingRunner:
 
                 db.session.commit()
 
-    def _process_chunk(self, flask_app, index_processor, chunk_documents, dataset, dataset_document,
-                       embedding_model_instance, embedding_model_type_instance):
+    def _process_chunk(self, flask_app, index_processor, chunk_documents, dataset, dataset_document):
         with flask_app.app_context():
             # check document is paused
             self._check_document_paused_status(dataset_document.id)
 
-            tokens = 0
-            if dataset.indexing_technique == 'high_quality' or embedding_model_type_instance:
-                tokens += sum(
-                    embedding_model_type_instance.get_num_tokens(
-                        embedding_model_instance.model,
-                        embedding_model_instance.credentials,
-                        [document.page_content]
-                    )
-                    for document in chunk_documents
-                )
-
             # load index
             index_processor.load(dataset, chunk_documents, with_keywords=False)
 
@@ -744,8 +967,6 @@ class IndexingRunner:
 
             db.session.commit()
 
-            return tokens
-
     def _check_document_paused_status(self, document_id: str):
         indexing_cache_key = 'document_{}_is_paused'.format(document_id)
         result = redis_client.get(indexing_cache_key)
@@ -802,9 +1023,10 @@ class IndexingRunner:
         index_processor = IndexProcessorFactory(index_type).init_index_processor()
         index_processor.load(dataset, documents)
 
-    def _transform(self, index_processor: BaseIndexProcessor, dataset: Dataset,
-                   text_docs: list[Document], doc_language: str, process_rule: dict) -> list[Document]:
-        # get embedding model instance
+    def _get_embedding_model_instance(self, dataset: Dataset) -> Optional[ModelInstance]:
+        """
+        Get the embedding model instance used to split documents of the dataset by tokens.
+        """
         embedding_model_instance = None
         if dataset.indexing_technique == 'high_quality':
             if dataset.embedding_model_provider:
@@ -820,6 +1042,35 @@ class IndexingRunner:
                     model_type=ModelType.TEXT_EMBEDDING,
                 )
 
+        return embedding_model_instance
+
+    def _get_pending_documents(self, dataset_document: DatasetDocument) -> list[Document]:
+        """
+        Get the saved segments of the document which are not completed, in the order they are split.
+        """
+        document_segments = DocumentSegment.query.filter(
+            DocumentSegment.document_id == dataset_document.id,
+            DocumentSegment.status != "completed"
+        ).order_by(DocumentSegment.position).all()
+
+        return [
+            Document(
+                page_content=document_segment.content,
+                metadata={
+                    "doc_id": document_segment.index_node_id,
+                    "doc_hash": document_segment.index_node_hash,
+                    "document_id": document_segment.document_id,
+                    "dataset_id": document_segment.dataset_id,
+                }
+            )
+            for document_segment in document_segments
+        ]
+
+    def _transform(self, index_processor: BaseIndexProcessor, dataset: Dataset,
+                   text_docs: list[Document], doc_language: str, process_rule: dict) -> list[Document]:
+        # get embedding model instance
+        embedding_model_instance = self._get_embedding_model_instance(dataset)
+
         documents = index_processor.transform(text_docs, embedding_model_instance=embedding_model_instance,
                                               process_rule=process_rule, tenant_id=dataset.tenant_id,
                                               doc_language=doc_language)
@@ -78,26 +78,47 @@ class TokenBufferMemory:
             return []
 
         # prune the chat message if it exceeds the max token limit
+        return self._prune_prompt_messages(prompt_messages, max_token_limit)
+
+    def _prune_prompt_messages(self, prompt_messages: list[PromptMessage],
+                               max_token_limit: int) -> list[PromptMessage]:
+        """
+        Prune the oldest prompt messages until the rest fits in the max token limit.
+        Messages are counted lazily from the oldest one and pruned with a running sum, until the pruned tokens cover
+        the excess, instead of counting the rest after each prune. Pruning k messages takes at most k + 2 counts.
+        :param prompt_messages: prompt messages
+        :param max_token_limit: max token limit
+        :return: the rest prompt messages
+        """
         provider_instance = model_provider_factory.get_provider_instance(self.model_instance.provider)
         model_type_instance = provider_instance.get_model_instance(ModelType.LLM)
 
-        curr_message_tokens = model_type_instance.get_num_tokens(
-            self.model_instance.model,
-            self.model_instance.credentials,
-            prompt_messages
-        )
+        def get_num_tokens(messages: list[PromptMessage]) -> int:
+            return model_type_instance.get_num_tokens(
+                self.model_instance.model,
+                self.model_instance.credentials,
+                messages
+            )
+
+        curr_message_tokens = get_num_tokens(prompt_messages)
+        if curr_message_tokens <= max_token_limit:
+            return prompt_messages
+
+        # mostly only the oldest message is pruned, count the rest at once
+        pruned_count = 1
+        rest_message_tokens = get_num_tokens(prompt_messages[1:])
+        if rest_message_tokens <= max_token_limit or pruned_count == len(prompt_messages):
+            return prompt_messages[pruned_count:]
+
+        # counting a message alone repeats the overhead of a count (e.g. reply priming tokens),
+        # measured on the oldest message whose tokens in the history are known now
+        overhead_tokens = get_num_tokens(prompt_messages[:1]) - (curr_message_tokens - rest_message_tokens)
+
+        while rest_message_tokens > max_token_limit and pruned_count < len(prompt_messages):
+            rest_message_tokens -= get_num_tokens([prompt_messages[pruned_count]]) - overhead_tokens
+            pruned_count += 1
 
-        if curr_message_tokens > max_token_limit:
-            pruned_memory = []
-            while curr_message_tokens > max_token_limit and prompt_messages:
-                pruned_memory.append(prompt_messages.pop(0))
-                curr_message_tokens = model_type_instance.get_num_tokens(
-                    self.model_instance.model,
-                    self.model_instance.credentials,
-                    prompt_messages
-                )
-
-        return prompt_messages
+        return prompt_messages[pruned_count:]
 
     def get_history_prompt_text(self, human_prefix: str = "Human",
                                 ai_prefix: str = "Assistant",
@@ -24,6 +24,7 @@ from core.model_runtime.entities.model_entities import (
     PriceType,
 )
 from core.model_runtime.model_providers.__base.ai_model import AIModel
+from core.model_runtime.utils.text_stream import iter_text_chunks
 
 logger = logging.getLogger(__name__)
 
@@ -486,10 +487,13 @@ if you are not sure about the structure.
 
         tool_calls = result.message.tool_calls
 
-        for word in result.message.content:
+        # chunks are yielded as they are paced, the last one ends the content
+        streamed_length = 0
+        for chunk in iter_text_chunks(result.message.content):
+            streamed_length += len(chunk)
             assistant_prompt_message = AssistantPromptMessage(
-                content=word,
-                tool_calls=tool_calls if index == (len(result.message.content) - 1) else []
+                content=chunk,
+                tool_calls=tool_calls if streamed_length == len(result.message.content) else []
             )
 
             yield LLMResultChunk(
@@ -503,7 +507,6 @@ if you are not sure about the structure.
             )
 
             index += 1
-            time.sleep(0.01)
 
     def get_parameter_rules(self, model: str, credentials: dict) -> list[ParameterRule]:
         """
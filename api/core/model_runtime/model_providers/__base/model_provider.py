@@ -1,11 +1,10 @@
 import os
 from abc import ABC, abstractmethod
 
-import yaml
-
 from core.model_runtime.entities.model_entities import AIModelEntity, ModelType
 from core.model_runtime.entities.provider_entities import ProviderEntity
 from core.model_runtime.model_providers.__base.ai_model import AIModel
+from core.model_runtime.model_providers.__base.model_schema_bundle import ModelSchemaBundle
 from core.utils.module_import_helper import get_subclasses_from_module, import_module_from_source
 
 
@@ -38,22 +37,8 @@ class ModelProvider(ABC):
         # get dirname of the current path
         provider_name = self.__class__.__module__.split('.')[-1]
 
-        # get the path of the model_provider classes
-        base_path = os.path.abspath(__file__)
-        current_path = os.path.join(os.path.dirname(os.path.dirname(base_path)), provider_name)
-
-        # read provider schema from yaml file
-        yaml_path = os.path.join(current_path, f'{provider_name}.yaml')
-        yaml_data = {}
-        if os.path.exists(yaml_path):
-            with open(yaml_path, encoding='utf-8') as f:
-                yaml_data = yaml.safe_load(f)
-
-        try:
-            # yaml_data to entity
-            provider_schema = ProviderEntity(**yaml_data)
-        except Exception as e:
-            raise Exception(f'Invalid provider schema for {provider_name}: {str(e)}')
+        # get provider schema from the schema bundle
+        provider_schema = ModelSchemaBundle.get_provider_schema(provider_name)
 
         # cache schema
         self.provider_schema = provider_schema
@@ -71,11 +56,9 @@ class ModelProvider(ABC):
         if model_type not in provider_schema.supported_model_types:
             return []
 
-        # get model instance of the model type
-        model_instance = self.get_model_instance(model_type)
-
-        # get predefined models (predefined_models)
-        models = model_instance.predefined_models()
+        # get predefined models from the schema bundle, the model type module is not imported
+        provider_name = self.__class__.__module__.split('.')[-1]
+        models = ModelSchemaBundle.get_model_schemas(provider_name, model_type)
 
         # return models
         return models
@@ -0,0 +1,204 @@
+import logging
+import os
+import pickle
+from threading import Lock
+
+import yaml
+
+from core.model_runtime.entities.defaults import PARAMETER_RULE_TEMPLATE
+from core.model_runtime.entities.model_entities import AIModelEntity, DefaultParameterName, FetchFrom, ModelType
+from core.model_runtime.entities.provider_entities import ProviderEntity
+from core.utils.position_helper import get_position_map, sort_by_position_map
+
+logger = logging.getLogger(__name__)
+
+
+class ModelSchemaBundle:
+    """
+    Provider schemas and predefined model schemas of all model providers.
+
+    The schemas are parsed from the yaml files at build time and pickled into one bundle file, which is loaded once
+    per process. Loaded before the workers are forked, e.g. by gunicorn with `--preload`, it is shared copy-on-write
+    by the workers. Without a bundle file, e.g. in development, each schema is parsed from its yaml files on first use.
+    """
+    _provider_schemas: dict[str, ProviderEntity] = {}
+    # (provider name, model type folder name) to predefined model schemas sorted by position
+    _model_schemas: dict[tuple[str, str], list[AIModelEntity]] = {}
+    _loaded = False
+    _lock = Lock()
+
+    model_providers_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    bundle_file_name = '_schema_bundle.pkl'
+
+    @classmethod
+    def load(cls) -> None:
+        """
+        Load the bundle file if it exists, only once per process
+        :return:
+        """
+        if cls._loaded:
+            return
+
+        with cls._lock:
+            if cls._loaded:
+                return
+
+            bundle_path = os.path.join(cls.model_providers_path, cls.bundle_file_name)
+            if os.path.exists(bundle_path):
+                try:
+                    with open(bundle_path, 'rb') as f:
+                        bundle = pickle.load(f)
+                    cls._provider_schemas.update(bundle['provider_schemas'])
+                    cls._model_schemas.update(bundle['model_schemas'])
+                except Exception:
+                    logger.exception(f'Failed to load the schema bundle {bundle_path}, parse the yaml files instead.')
+
+            cls._loaded = True
+
+    @classmethod
+    def dump(cls) -> str:
+        """
+        Parse the schemas of all providers from the yaml files and write the bundle file
+        :return: the path of the bundle file
+        """
+        provider_schemas = {}
+        model_schemas = {}
+        for provider_name in sorted(os.listdir(cls.model_providers_path)):
+            yaml_path = os.path.join(cls.model_providers_path, provider_name, f'{provider_name}.yaml')
+            if provider_name.startswith('_') or not os.path.isfile(yaml_path):
+                continue
+
+            provider_schema = cls._load_provider_schema_from_yaml(provider_name)
+            provider_schemas[provider_name] = provider_schema
+            for model_type in provider_schema.supported_model_types:
+                model_type_name = model_type.value.replace('-', '_')
+                model_schemas[(provider_name, model_type_name)] = \
+                    cls._load_model_schemas_from_yaml(provider_name, model_type_name)
+
+        bundle_path = os.path.join(cls.model_providers_path, cls.bundle_file_name)
+        with open(bundle_path, 'wb') as f:
+            pickle.dump({'provider_schemas': provider_schemas, 'model_schemas': model_schemas}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+        return bundle_path
+
+    @classmethod
+    def get_provider_schema(cls, provider_name: str) -> ProviderEntity:
+        """
+        Get provider schema
+
+        :param provider_name: provider name
+        :return: provider schema
+        """
+        cls.load()
+        provider_schema = cls._provider_schemas.get(provider_name)
+        if provider_schema is None:
+            provider_schema = cls._load_provider_schema_from_yaml(provider_name)
+            cls._provider_schemas[provider_name] = provider_schema
+
+        return provider_schema
+
+    @classmethod
+    def get_model_schemas(cls, provider_name: str, model_type: ModelType) -> list[AIModelEntity]:
+        """
+        Get predefined model schemas of model type
+
+        :param provider_name: provider name
+        :param model_type: model type
+        :return: model schemas sorted by position
+        """
+        cls.load()
+        key = (provider_name, model_type.value.replace('-', '_'))
+        model_schemas = cls._model_schemas.get(key)
+        if model_schemas is None:
+            model_schemas = cls._load_model_schemas_from_yaml(*key)
+            cls._model_schemas[key] = model_schemas
+
+        return model_schemas
+
+    @classmethod
+    def _load_provider_schema_from_yaml(cls, provider_name: str) -> ProviderEntity:
+        # read provider schema from yaml file
+        yaml_path = os.path.join(cls.model_providers_path, provider_name, f'{provider_name}.yaml')
+        yaml_data = {}
+        if os.path.exists(yaml_path):
+            with open(yaml_path, encoding='utf-8') as f:
+                yaml_data = yaml.safe_load(f)
+
+        try:
+            # yaml_data to entity
+            return ProviderEntity(**yaml_data)
+        except Exception as e:
+            raise Exception(f'Invalid provider schema for {provider_name}: {str(e)}')
+
+    @classmethod
+    def _load_model_schemas_from_yaml(cls, provider_name: str, model_type: str) -> list[AIModelEntity]:
+        model_schemas = []
+
+        provider_model_type_path = os.path.join(cls.model_providers_path, provider_name, model_type)
+
+        # get all yaml files path under provider_model_type_path that do not start with __
+        model_schema_yaml_paths = [
+            os.path.join(provider_model_type_path, model_schema_yaml)
+            for model_schema_yaml in os.listdir(provider_model_type_path)
+            if not model_schema_yaml.startswith('__')
+               and not model_schema_yaml.startswith('_')
+               and os.path.isfile(os.path.join(provider_model_type_path, model_schema_yaml))
+               and model_schema_yaml.endswith('.yaml')
+        ]
+
+        # get _position.yaml file path
+        position_map = get_position_map(provider_model_type_path)
+
+        # traverse all model_schema_yaml_paths
+        for model_schema_yaml_path in model_schema_yaml_paths:
+            # read yaml data from yaml file
+            with open(model_schema_yaml_path, encoding='utf-8') as f:
+                yaml_data = yaml.safe_load(f)
+
+            new_parameter_rules = []
+            for parameter_rule in yaml_data.get('parameter_rules', []):
+                if 'use_template' in parameter_rule:
+                    try:
+                        default_parameter_name = DefaultParameterName.value_of(parameter_rule['use_template'])
+                        default_parameter_rule = PARAMETER_RULE_TEMPLATE.get(default_parameter_name)
+                        if not default_parameter_rule:
+                            raise Exception(f'Invalid model parameter rule name {default_parameter_name}')
+
+                        copy_default_parameter_rule = default_parameter_rule.copy()
+                        copy_default_parameter_rule.update(parameter_rule)
+                        parameter_rule = copy_default_parameter_rule
+                    except ValueError:
+                        pass
+
+                if 'label' not in parameter_rule:
+                    parameter_rule['label'] = {
+                        'zh_Hans': parameter_rule['name'],
+                        'en_US': parameter_rule['name']
+                    }
+
+                new_parameter_rules.append(parameter_rule)
+
+            yaml_data['parameter_rules'] = new_parameter_rules
+
+            if 'label' not in yaml_data:
+                yaml_data['label'] = {
+                    'zh_Hans': yaml_data['model'],
+                    'en_US': yaml_data['model']
+                }
+
+            yaml_data['fetch_from'] = FetchFrom.PREDEFINED_MODEL.value
+
+            try:
+                # yaml_data to entity
+                model_schema = AIModelEntity(**yaml_data)
+            except Exception as e:
+                model_schema_yaml_file_name = os.path.basename(model_schema_yaml_path).rstrip(".yaml")
+                raise Exception(f'Invalid model schema for {provider_name}.{model_type}.{model_schema_yaml_file_name}:'
+                                f' {str(e)}')
+
+            # cache model schema
+            model_schemas.append(model_schema)
+
+        # resort model schemas by position
+        return sort_by_position_map(position_map, model_schemas, lambda x: x.model)
@@ -59,6 +59,17 @@ class TextEmbeddingModel(AIModel):
         """
         raise NotImplementedError
 
+    def get_num_tokens_batch(self, model: str, credentials: dict, texts: list[str]) -> list[int]:
+        """
+        Get number of tokens of each text, models with a local tokenizer count them in one batch
+
+        :param model: model name
+        :param credentials: model credentials
+        :param texts: texts to embed
+        :return:
+        """
+        return [self.get_num_tokens(model, credentials, [text]) for text in texts]
+
     def _get_context_size(self, model: str, credentials: dict) -> int:
         """
         Get context size for given embedding model
@@ -0,0 +1,97 @@
+from os.path import abspath, dirname, join
+from threading import Lock
+from typing import Optional
+
+import tiktoken
+from tokenizers import Tokenizer
+from transformers import GPT2TokenizerFast
+
+
+class TokenizerRegistry:
+    """
+    Process-wide registry of tokenizers.
+
+    Encoders are loaded once per model or encoding and shared by all threads. Looking up a loaded encoder takes
+    no lock, only loading an encoder does. Both the tiktoken encodings and the gpt2 tokenizer encode batches of
+    texts natively, so counting the tokens of many texts is a single call.
+    """
+    _tiktoken_encodings: dict[str, Optional[tiktoken.Encoding]] = {}
+    _gpt2_tokenizer: Optional[Tokenizer] = None
+    _lock = Lock()
+
+    @classmethod
+    def encoding_for_model(cls, model: str) -> tiktoken.Encoding:
+        """
+        Get tiktoken encoding of model
+        :param model: model name
+        :return: encoding, raise KeyError if the model has no known encoding like `tiktoken.encoding_for_model`
+        """
+        if model not in cls._tiktoken_encodings:
+            with cls._lock:
+                if model not in cls._tiktoken_encodings:
+                    try:
+                        cls._tiktoken_encodings[model] = tiktoken.encoding_for_model(model)
+                    except KeyError:
+                        cls._tiktoken_encodings[model] = None
+
+        encoding = cls._tiktoken_encodings[model]
+        if encoding is None:
+            raise KeyError(f'Could not automatically map {model} to a tokeniser.')
+
+        return encoding
+
+    @classmethod
+    def get_encoding(cls, model: str, default_encoding: str = 'cl100k_base') -> tiktoken.Encoding:
+        """
+        Get tiktoken encoding of model, or the default encoding if the model has no known encoding
+        :param model: model name
+        :param default_encoding: default encoding name
+        :return: encoding
+        """
+        try:
+            return cls.encoding_for_model(model)
+        except KeyError:
+            # loaded encodings are cached by tiktoken
+            return tiktoken.get_encoding(default_encoding)
+
+    @classmethod
+    def get_gpt2_tokenizer(cls) -> Tokenizer:
+        """
+        Get gpt2 tokenizer, which is cached in the project
+        :return: tokenizer
+        """
+        if cls._gpt2_tokenizer is None:
+            with cls._lock:
+                if cls._gpt2_tokenizer is None:
+                    gpt2_tokenizer_path = join(dirname(abspath(__file__)), 'gpt2')
+                    cls._gpt2_tokenizer = GPT2TokenizerFast.from_pretrained(gpt2_tokenizer_path).backend_tokenizer
+
+        return cls._gpt2_tokenizer
+
+    @classmethod
+    def count_tokens(cls, text: str, model: Optional[str] = None) -> int:
+        """
+        Count tokens of text
+        :param text: text
+        :param model: model name of the tiktoken encoding, gpt2 tokenizer if not given
+        :return: number of tokens
+        """
+        return cls.count_tokens_batch([text], model)[0]
+
+    @classmethod
+    def count_tokens_batch(cls, texts: list[str], model: Optional[str] = None) -> list[int]:
+        """
+        Count tokens of each text in one batch
+        :param texts: texts
+        :param model: model name of the tiktoken encoding, gpt2 tokenizer if not given
+        :return: number of tokens of each text
+        """
+        if not texts:
+            return []
+
+        if model:
+            # special tokens are counted as plain text
+            return [len(tokens) for tokens in cls.get_encoding(model).encode_ordinary_batch(texts)]
+
+        encodings = cls.get_gpt2_tokenizer().encode_batch(texts, add_special_tokens=False)
+        return [len(encoding.ids) for encoding in encodings]
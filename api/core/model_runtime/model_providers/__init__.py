@@ -1,3 +1,7 @@
+from core.model_runtime.model_providers.__base.model_schema_bundle import ModelSchemaBundle
 from core.model_runtime.model_providers.model_provider_factory import ModelProviderFactory
 
+# load the schema bundle at import, before the workers are forked, so they share it
+ModelSchemaBundle.load()
+
 model_provider_factory = ModelProviderFactory()
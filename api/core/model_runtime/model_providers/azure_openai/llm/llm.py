@@ -25,6 +25,7 @@ from core.model_runtime.entities.message_entities import (
 from core.model_runtime.entities.model_entities import AIModelEntity, ModelPropertyKey
 from core.model_runtime.errors.validate import CredentialsValidateFailedError
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
+from core.model_runtime.model_providers.__base.tokenizers.tokenizer_registry import TokenizerRegistry
 from core.model_runtime.model_providers.azure_openai._common import _CommonAzureOpenAI
 from core.model_runtime.model_providers.azure_openai._constant import LLM_BASE_MODELS, AzureBaseModel
 
@@ -531,7 +532,7 @@ class AzureOpenAILargeLanguageModel(_CommonAzureOpenAI, LargeLanguageModel):
     def _num_tokens_from_string(self, credentials: dict, text: str,
                                 tools: Optional[list[PromptMessageTool]] = None) -> int:
         try:
-            encoding = tiktoken.encoding_for_model(credentials['base_model_name'])
+            encoding = TokenizerRegistry.encoding_for_model(credentials['base_model_name'])
         except KeyError:
             encoding = tiktoken.get_encoding("cl100k_base")
 
@@ -550,7 +551,7 @@ class AzureOpenAILargeLanguageModel(_CommonAzureOpenAI, LargeLanguageModel):
         main/examples/How_to_format_inputs_to_ChatGPT_models.ipynb"""
         model = credentials['base_model_name']
         try:
-            encoding = tiktoken.encoding_for_model(model)
+            encoding = TokenizerRegistry.encoding_for_model(model)
         except KeyError:
             logger.warning("Warning: model not found. Using cl100k_base encoding.")
             model = "cl100k_base"
@@ -4,13 +4,13 @@ import time
 from typing import Optional, Union
 
 import numpy as np
-import tiktoken
 from openai import AzureOpenAI
 
 from core.model_runtime.entities.model_entities import AIModelEntity, PriceType
 from core.model_runtime.entities.text_embedding_entities import EmbeddingUsage, TextEmbeddingResult
 from core.model_runtime.errors.validate import CredentialsValidateFailedError
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
+from core.model_runtime.model_providers.__base.tokenizers.tokenizer_registry import TokenizerRegistry
 from core.model_runtime.model_providers.azure_openai._common import _CommonAzureOpenAI
 from core.model_runtime.model_providers.azure_openai._constant import EMBEDDING_BASE_MODELS, AzureBaseModel
 
@@ -38,10 +38,7 @@ class AzureOpenAITextEmbeddingModel(_CommonAzureOpenAI, TextEmbeddingModel):
         indices = []
         used_tokens = 0
 
-        try:
-            enc = tiktoken.encoding_for_model(base_model_name)
-        except KeyError:
-            enc = tiktoken.get_encoding("cl100k_base")
+        enc = TokenizerRegistry.get_encoding(base_model_name)
 
         for i, text in enumerate(texts):
             token = enc.encode(
@@ -104,18 +101,10 @@ class AzureOpenAITextEmbeddingModel(_CommonAzureOpenAI, TextEmbeddingModel):
         if len(texts) == 0:
             return 0
 
-        try:
-            enc = tiktoken.encoding_for_model(credentials['base_model_name'])
-        except KeyError:
-            enc = tiktoken.get_encoding("cl100k_base")
-
-        total_num_tokens = 0
-        for text in texts:
-            # calculate the number of tokens in the encoded text
-            tokenized_text = enc.encode(text)
-            total_num_tokens += len(tokenized_text)
+        return sum(self.get_num_tokens_batch(model, credentials, texts))
 
-        return total_num_tokens
+    def get_num_tokens_batch(self, model: str, credentials: dict, texts: list[str]) -> list[int]:
+        return TokenizerRegistry.count_tokens_batch(texts, credentials['base_model_name'])
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
         if 'openai_api_base' not in credentials:
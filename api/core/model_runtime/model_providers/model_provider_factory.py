@@ -1,5 +1,7 @@
 import logging
 import os
+from collections import OrderedDict
+from threading import Lock
 from typing import Optional
 
 from pydantic import BaseModel
@@ -9,8 +11,9 @@ from core.model_runtime.entities.provider_entities import ProviderConfig, Provid
 from core.model_runtime.model_providers.__base.model_provider import ModelProvider
 from core.model_runtime.schema_validators.model_credential_schema_validator import ModelCredentialSchemaValidator
 from core.model_runtime.schema_validators.provider_credential_schema_validator import ProviderCredentialSchemaValidator
+from core.utils.manifest_helper import get_manifest
 from core.utils.module_import_helper import load_single_subclass_from_source
-from core.utils.position_helper import get_position_map, sort_to_dict_by_position_map
+from core.utils.position_helper import get_position_map, sort_by_position_map
 
 logger = logging.getLogger(__name__)
 
@@ -27,11 +30,15 @@ class ModelProviderExtension(BaseModel):
 
 
 class ModelProviderFactory:
-    model_provider_extensions: dict[str, ModelProviderExtension] = None
+    """
+    Registry of model providers.
 
-    def __init__(self) -> None:
-        # for cache in memory
-        self.get_providers()
+    Provider names and positions come from the manifest, so provider modules are imported on first use of
+    each provider only. Loaded providers are shared by all factories in the process.
+    """
+    _manifest_providers: Optional[dict[str, dict]] = None
+    _model_provider_extensions: dict[str, ModelProviderExtension] = {}
+    _lock = Lock()
 
     def get_providers(self) -> list[ProviderEntity]:
         """
@@ -50,13 +57,13 @@ class ModelProviderFactory:
             # get provider schema
             provider_schema = model_provider_instance.get_provider_schema()
 
+            # the provider schema is shared, add the predefined models to a copy
+            models = list(provider_schema.models)
             for model_type in provider_schema.supported_model_types:
                 # get predefined models for given model type
-                models = model_provider_instance.models(model_type)
-                if models:
-                    provider_schema.models.extend(models)
+                models.extend(model_provider_instance.models(model_type))
 
-            providers.append(provider_schema)
+            providers.append(provider_schema.copy(update={'models': models}))
 
         # return providers
         return providers
@@ -182,11 +189,8 @@ class ModelProviderFactory:
         :param provider: provider name
         :return: provider instance
         """
-        # scan all providers
-        model_provider_extensions = self._get_model_provider_map()
-
-        # get the provider extension
-        model_provider_extension = model_provider_extensions.get(provider)
+        # load the provider only
+        model_provider_extension = self._get_model_provider_extension(provider)
         if not model_provider_extension:
             raise Exception(f'Invalid provider: {provider}')
 
@@ -195,61 +199,97 @@ class ModelProviderFactory:
 
         return model_provider_instance
 
-    def _get_model_provider_map(self) -> dict[str, ModelProviderExtension]:
-        if self.model_provider_extensions:
-            return self.model_provider_extensions
-
-
+    @staticmethod
+    def build_manifest() -> dict:
+        """
+        Build the manifest of model providers from the provider folders
+        :return: manifest
+        """
         # get the path of current classes
         current_path = os.path.abspath(__file__)
         model_providers_path = os.path.dirname(current_path)
 
-        # get all folders path under model_providers_path that do not start with __
-        model_provider_dir_paths = [
-            os.path.join(model_providers_path, model_provider_dir)
+        # get all folders under model_providers_path that do not start with __
+        model_provider_names = sorted(
+            model_provider_dir
             for model_provider_dir in os.listdir(model_providers_path)
             if not model_provider_dir.startswith('__')
                and os.path.isdir(os.path.join(model_providers_path, model_provider_dir))
-        ]
+        )
 
         # get _position.yaml file path
         position_map = get_position_map(model_providers_path)
 
-        # traverse all model_provider_dir_paths
-        model_providers: list[ModelProviderExtension] = []
-        for model_provider_dir_path in model_provider_dir_paths:
-            # get model_provider dir name
-            model_provider_name = os.path.basename(model_provider_dir_path)
-
+        providers = []
+        for model_provider_name in model_provider_names:
+            model_provider_dir_path = os.path.join(model_providers_path, model_provider_name)
             file_names = os.listdir(model_provider_dir_path)
 
             if (model_provider_name + '.py') not in file_names:
                 logger.warning(f"Missing {model_provider_name}.py file in {model_provider_dir_path}, Skip.")
                 continue
 
-            # Dynamic loading {model_provider_name}.py file and find the subclass of ModelProvider
-            py_path = os.path.join(model_provider_dir_path, model_provider_name + '.py')
-            model_provider_class = load_single_subclass_from_source(
-                module_name=f'core.model_runtime.model_providers.{model_provider_name}.{model_provider_name}',
-                script_path=py_path,
-                parent_type=ModelProvider)
-
-            if not model_provider_class:
-                logger.warning(f"Missing Model Provider Class that extends ModelProvider in {py_path}, Skip.")
-                continue
-
             if f'{model_provider_name}.yaml' not in file_names:
                 logger.warning(f"Missing {model_provider_name}.yaml file in {model_provider_dir_path}, Skip.")
                 continue
 
-            model_providers.append(ModelProviderExtension(
-                name=model_provider_name,
-                provider_instance=model_provider_class(),
-                position=position_map.get(model_provider_name)
-            ))
+            providers.append({'name': model_provider_name, 'position': position_map.get(model_provider_name)})
 
-        sorted_extensions = sort_to_dict_by_position_map(position_map, model_providers, lambda x: x.name)
+        sorted_providers = sort_by_position_map(position_map, providers, lambda x: x['name'])
 
-        self.model_provider_extensions = sorted_extensions
+        return {'providers': sorted_providers}
+
+    @classmethod
+    def _get_manifest_providers(cls) -> dict[str, dict]:
+        if cls._manifest_providers is None:
+            manifest = get_manifest(os.path.dirname(os.path.abspath(__file__)), cls.build_manifest)
+            cls._manifest_providers = OrderedDict((x['name'], x) for x in manifest['providers'])
+
+        return cls._manifest_providers
+
+    def _get_model_provider_map(self) -> dict[str, ModelProviderExtension]:
+        """
+        Get all providers, loading the providers not used yet
+        :return: provider extensions in the order of positions
+        """
+        model_provider_extensions = OrderedDict()
+        for provider in self._get_manifest_providers():
+            model_provider_extensions[provider] = self._get_model_provider_extension(provider)
+
+        return model_provider_extensions
+
+    def _get_model_provider_extension(self, provider: str) -> Optional[ModelProviderExtension]:
+        """
+        Get provider extension, import the provider module on first use
+        :param provider: provider name
+        :return: provider extension, None if the provider does not exist
+        """
+        model_provider_extension = self._model_provider_extensions.get(provider)
+        if model_provider_extension:
+            return model_provider_extension
+
+        manifest_provider = self._get_manifest_providers().get(provider)
+        if not manifest_provider:
+            return None
+
+        with self._lock:
+            model_provider_extension = self._model_provider_extensions.get(provider)
+            if model_provider_extension:
+                return model_provider_extension
+
+            # Dynamic loading {provider}.py file and find the subclass of ModelProvider
+            model_providers_path = os.path.dirname(os.path.abspath(__file__))
+            py_path = os.path.join(model_providers_path, provider, provider + '.py')
+            model_provider_class = load_single_subclass_from_source(
+                module_name=f'core.model_runtime.model_providers.{provider}.{provider}',
+                script_path=py_path,
+                parent_type=ModelProvider)
+
+            model_provider_extension = ModelProviderExtension(
+                name=provider,
+                provider_instance=model_provider_class(),
+                position=manifest_provider['position']
+            )
+            self._model_provider_extensions[provider] = model_provider_extension
 
-        return sorted_extensions
+        return model_provider_extension
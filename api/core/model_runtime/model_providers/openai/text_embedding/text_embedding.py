@@ -3,13 +3,13 @@ import time
 from typing import Optional, Union
 
 import numpy as np
-import tiktoken
 from openai import OpenAI
 
 from core.model_runtime.entities.model_entities import PriceType
 from core.model_runtime.entities.text_embedding_entities import EmbeddingUsage, TextEmbeddingResult
 from core.model_runtime.errors.validate import CredentialsValidateFailedError
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
+from core.model_runtime.model_providers.__base.tokenizers.tokenizer_registry import TokenizerRegistry
 from core.model_runtime.model_providers.openai._common import _CommonOpenAI
 
 
@@ -50,10 +50,7 @@ class OpenAITextEmbeddingModel(_CommonOpenAI, TextEmbeddingModel):
         indices = []
         used_tokens = 0
 
-        try:
-            enc = tiktoken.encoding_for_model(model)
-        except KeyError:
-            enc = tiktoken.get_encoding("cl100k_base")
+        enc = TokenizerRegistry.get_encoding(model)
 
         for i, text in enumerate(texts):
             token = enc.encode(
@@ -125,18 +122,18 @@ class OpenAITextEmbeddingModel(_CommonOpenAI, TextEmbeddingModel):
         if len(texts) == 0:
             return 0
 
-        try:
-            enc = tiktoken.encoding_for_model(model)
-        except KeyError:
-            enc = tiktoken.get_encoding("cl100k_base")
+        return sum(self.get_num_tokens_batch(model, credentials, texts))
 
-        total_num_tokens = 0
-        for text in texts:
-            # calculate the number of tokens in the encoded text
-            tokenized_text = enc.encode(text)
-            total_num_tokens += len(tokenized_text)
+    def get_num_tokens_batch(self, model: str, credentials: dict, texts: list[str]) -> list[int]:
+        """
+        Get number of tokens of each text in one batch
 
-        return total_num_tokens
+        :param model: model name
+        :param credentials: model credentials
+        :param texts: texts to embed
+        :return:
+        """
+        return TokenizerRegistry.count_tokens_batch(texts, model)
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
         """
@@ -0,0 +1,44 @@
+import os
+import time
+from collections.abc import Generator
+from typing import Optional
+
+# max number of characters of a chunk when streaming text which is already complete
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 20))
+# min seconds between two chunks, 0 to stream without delay
+STREAM_FLUSH_INTERVAL = float(os.environ.get('STREAM_FLUSH_INTERVAL', 0))
+
+
+def iter_text_chunks(text: str,
+                     chunk_size: Optional[int] = None,
+                     flush_interval: Optional[float] = None) -> Generator[str, None, None]:
+    """
+    Split complete text into size-bounded chunks for streaming.
+    Chunks end after a whitespace where possible so words are not split between chunks,
+    and are paced by the flush interval instead of a delay per character.
+
+    :param text: text to stream
+    :param chunk_size: max number of characters of a chunk, defaults to STREAM_CHUNK_SIZE
+    :param flush_interval: min seconds between two chunks, defaults to STREAM_FLUSH_INTERVAL
+    :return: chunks
+    """
+    chunk_size = max(chunk_size or STREAM_CHUNK_SIZE, 1)
+    flush_interval = STREAM_FLUSH_INTERVAL if flush_interval is None else flush_interval
+
+    flushed_at = None
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        if end < len(text):
+            boundary = max(text.rfind(' ', start, end), text.rfind('\n', start, end))
+            if boundary > start:
+                end = boundary + 1
+
+        if flush_interval > 0 and flushed_at is not None:
+            delay = flushed_at + flush_interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        flushed_at = time.monotonic()
+        yield text[start:end]
+        start = end
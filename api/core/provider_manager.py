@@ -15,7 +15,11 @@ from core.entities.provider_entities import (
     SystemConfiguration,
 )
 from core.helper import encrypter
-from core.helper.model_provider_cache import ProviderCredentialsCache, ProviderCredentialsCacheType
+from core.helper.model_provider_cache import (
+    ProviderConfigurationsCache,
+    ProviderCredentialsCache,
+    ProviderCredentialsCacheType,
+)
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.entities.provider_entities import (
     CredentialFormSchema,
@@ -39,10 +43,6 @@ class ProviderManager:
     """
     ProviderManager is a class that manages the model providers includes Hosting and Customize Model Providers.
     """
-    def __init__(self) -> None:
-        self.decoding_rsa_key = None
-        self.decoding_cipher_rsa = None
-
     def get_configurations(self, tenant_id: str) -> ProviderConfigurations:
         """
         Get model provider configurations.
@@ -77,9 +77,30 @@ class ProviderManager:
         - Get provider instance
         - Switch selection priority
 
+        The configurations are cached in process until the provider records of the workspace are changed,
+        they are shared by all requests of the workspace and must not be modified.
+
         :param tenant_id:
         :return:
         """
+        provider_configurations = ProviderConfigurationsCache.get(tenant_id)
+        if provider_configurations is not None:
+            return provider_configurations
+
+        # read the version before the records, so changes committed meanwhile invalidate the built configurations
+        version = ProviderConfigurationsCache.get_version(tenant_id)
+        provider_configurations = self._build_configurations(tenant_id)
+        ProviderConfigurationsCache.set(tenant_id, version, provider_configurations)
+
+        return provider_configurations
+
+    def _build_configurations(self, tenant_id: str) -> ProviderConfigurations:
+        """
+        Build model provider configurations from the provider records of the workspace.
+
+        :param tenant_id: workspace id
+        :return:
+        """
         # Get all provider records of the workspace
         provider_name_to_provider_records_dict = self._get_all_providers(tenant_id)
 
@@ -504,17 +525,12 @@ class ProviderManager:
                 except JSONDecodeError:
                     provider_credentials = {}
 
-                # Get decoding rsa key and cipher for decrypting credentials
-                if self.decoding_rsa_key is None or self.decoding_cipher_rsa is None:
-                    self.decoding_rsa_key, self.decoding_cipher_rsa = encrypter.get_decrypt_decoding(tenant_id)
-
                 for variable in provider_credential_secret_variables:
                     if variable in provider_credentials:
                         try:
-                            provider_credentials[variable] = encrypter.decrypt_token_with_decoding(
-                                provider_credentials.get(variable),
-                                self.decoding_rsa_key,
-                                self.decoding_cipher_rsa
+                            provider_credentials[variable] = encrypter.decrypt_token(
+                                tenant_id,
+                                provider_credentials.get(variable)
                             )
                         except ValueError:
                             pass
@@ -557,17 +573,12 @@ class ProviderManager:
                 except JSONDecodeError:
                     continue
 
-                # Get decoding rsa key and cipher for decrypting credentials
-                if self.decoding_rsa_key is None or self.decoding_cipher_rsa is None:
-                    self.decoding_rsa_key, self.decoding_cipher_rsa = encrypter.get_decrypt_decoding(tenant_id)
-
                 for variable in model_credential_secret_variables:
                     if variable in provider_model_credentials:
                         try:
-                            provider_model_credentials[variable] = encrypter.decrypt_token_with_decoding(
-                                provider_model_credentials.get(variable),
-                                self.decoding_rsa_key,
-                                self.decoding_cipher_rsa
+                            provider_model_credentials[variable] = encrypter.decrypt_token(
+                                tenant_id,
+                                provider_model_credentials.get(variable)
                             )
                         except ValueError:
                             pass
@@ -685,17 +696,12 @@ class ProviderManager:
                         if provider_entity.provider_credential_schema else []
                     )
 
-                    # Get decoding rsa key and cipher for decrypting credentials
-                    if self.decoding_rsa_key is None or self.decoding_cipher_rsa is None:
-                        self.decoding_rsa_key, self.decoding_cipher_rsa = encrypter.get_decrypt_decoding(tenant_id)
-
                     for variable in provider_credential_secret_variables:
                         if variable in provider_credentials:
                             try:
-                                provider_credentials[variable] = encrypter.decrypt_token_with_decoding(
-                                    provider_credentials.get(variable),
-                                    self.decoding_rsa_key,
-                                    self.decoding_cipher_rsa
+                                provider_credentials[variable] = encrypter.decrypt_token(
+                                    tenant_id,
+                                    provider_credentials.get(variable)
                                 )
                             except ValueError:
                                 pass
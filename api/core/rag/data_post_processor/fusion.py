@@ -0,0 +1,114 @@
+from enum import Enum
+from typing import Optional
+
+from core.rag.models.document import Document
+
+
+class FusionMethod(Enum):
+    """
+    Method to merge result lists of hybrid search.
+    """
+    RERANK = 'rerank'
+    RECIPROCAL_RANK_FUSION = 'reciprocal_rank_fusion'
+    WEIGHTED_SCORE = 'weighted_score'
+
+    @classmethod
+    def value_of(cls, value: str) -> 'FusionMethod':
+        """
+        Get value of given fusion method.
+
+        :param value: fusion method value
+        :return: fusion method
+        """
+        for method in cls:
+            if method.value == value:
+                return method
+        raise ValueError(f'invalid fusion method value {value}')
+
+
+class FusionRunner:
+    """
+    Merge ranked result lists locally, without a rerank model.
+
+    Documents are deduplicated by `doc_id`, the fused score is written to `score` of document metadata.
+    """
+    # rank constant of reciprocal rank fusion, dampens the weight of top ranks
+    RRF_K = 60
+
+    def __init__(self, fusion_method: FusionMethod, weights: Optional[dict[str, float]] = None):
+        if fusion_method == FusionMethod.RERANK:
+            raise ValueError('rerank is not a local fusion method')
+
+        self.fusion_method = fusion_method
+        self.weights = weights or {}
+
+    def run(self, ranked_lists: dict[str, list[Document]], score_threshold: Optional[float] = None,
+            top_n: Optional[int] = None) -> list[Document]:
+        """
+        Fuse ranked result lists
+        :param ranked_lists: source name to documents ranked by the source
+        :param score_threshold: min fused score, only applied to weighted score whose scores are in [0, 1]
+        :param top_n: max number of documents returned
+        :return: documents sorted by fused score desc
+        """
+        documents: dict[str, Document] = {}
+        fused_scores: dict[str, float] = {}
+        total_weight = 0.0
+        for source, ranked_documents in ranked_lists.items():
+            weight = self.weights.get(source, 1.0)
+            total_weight += weight
+            if not ranked_documents or weight <= 0:
+                continue
+
+            if self.fusion_method == FusionMethod.RECIPROCAL_RANK_FUSION:
+                scores = [1 / (self.RRF_K + rank) for rank in range(1, len(ranked_documents) + 1)]
+            else:
+                scores = self._normalize_scores(ranked_documents)
+
+            seen_doc_ids = set()
+            for document, score in zip(ranked_documents, scores):
+                doc_id = document.metadata['doc_id']
+                # a source may return chunks of the same doc more than once, only the best rank counts
+                if doc_id in seen_doc_ids:
+                    continue
+
+                seen_doc_ids.add(doc_id)
+                documents.setdefault(doc_id, document)
+                fused_scores[doc_id] = fused_scores.get(doc_id, 0.0) + weight * score
+
+        if self.fusion_method == FusionMethod.WEIGHTED_SCORE and total_weight > 0:
+            fused_scores = {doc_id: score / total_weight for doc_id, score in fused_scores.items()}
+
+        sorted_doc_ids = sorted(fused_scores.keys(), key=lambda doc_id: fused_scores[doc_id], reverse=True)
+
+        fused_documents = []
+        for doc_id in sorted_doc_ids:
+            score = fused_scores[doc_id]
+            if self.fusion_method == FusionMethod.WEIGHTED_SCORE and score_threshold and score < score_threshold:
+                continue
+
+            document = documents[doc_id]
+            document.metadata['score'] = score
+            fused_documents.append(document)
+
+        return fused_documents[:top_n] if top_n else fused_documents
+
+    @staticmethod
+    def _normalize_scores(ranked_documents: list[Document]) -> list[float]:
+        """
+        Min-max normalize scores of a ranked list to [0, 1],
+        lists without scores are normalized by rank
+        :param ranked_documents: ranked documents
+        :return: normalized scores
+        """
+        scores = [document.metadata.get('score') for document in ranked_documents]
+        if any(not isinstance(score, int | float) for score in scores):
+            count = len(ranked_documents)
+            return [(count - rank) / count for rank in range(count)]
+
+        min_score = min(scores)
+        max_score = max(scores)
+        if max_score == min_score:
+            return [1.0] * len(scores)
+
+        return [(score - min_score) / (max_score - min_score) for score in scores]
@@ -0,0 +1,65 @@
+import math
+from collections import defaultdict
+from collections.abc import Mapping
+
+import numpy as np
+
+
+class BM25Scorer:
+    """
+    Okapi BM25 scorer over keyword postings.
+
+    Keywords are extracted once per segment, so a matched keyword always has a term frequency of 1
+    and the score of a segment is its length normalization times the sum of idf of matched keywords.
+    """
+
+    def __init__(self, document_count: int, average_length: float, k1: float = 1.2, b: float = 0.75):
+        self._document_count = document_count
+        self._average_length = average_length or 1.0
+        self._k1 = k1
+        self._b = b
+
+    def idf(self, document_frequency: int) -> float:
+        """
+        Get inverse document frequency of keyword
+        :param document_frequency: number of segments containing the keyword
+        :return:
+        """
+        return math.log(1 + (self._document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def score(self, postings: Mapping[str, Mapping[str, int]], top_k: int) -> list[tuple[str, float]]:
+        """
+        Score segments matching any of the keywords
+        :param postings: keyword to mapping of segment index node id to segment length
+        :param top_k: max number of segments returned
+        :return: (index node id, score) sorted by score desc
+        """
+        idf_sums: dict[str, float] = defaultdict(float)
+        lengths: dict[str, int] = {}
+        for node_lengths in postings.values():
+            if not node_lengths:
+                continue
+
+            # document frequency is the size of postings of the keyword
+            idf = self.idf(len(node_lengths))
+            for node_id in node_lengths:
+                idf_sums[node_id] += idf
+            lengths.update(node_lengths)
+
+        if not idf_sums or top_k <= 0:
+            return []
+
+        node_ids = list(idf_sums.keys())
+        scores = np.fromiter(idf_sums.values(), dtype=np.float64, count=len(node_ids))
+        segment_lengths = np.fromiter(map(lengths.__getitem__, node_ids), dtype=np.float64, count=len(node_ids))
+        scores *= (self._k1 + 1) / (
+            1 + self._k1 * (1 - self._b + self._b * segment_lengths / self._average_length)
+        )
+
+        if top_k < len(node_ids):
+            top_indices = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top_indices = np.arange(len(node_ids))
+        top_indices = top_indices[np.argsort(-scores[top_indices], kind='stable')]
+
+        return [(node_ids[i], float(scores[i])) for i in top_indices]
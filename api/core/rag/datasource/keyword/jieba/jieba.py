@@ -19,6 +19,9 @@ class KeywordTableConfig(BaseModel):
 
 
 class Jieba(BaseKeyword):
+    # max ids per IN (...) clause
+    _BULK_BATCH_SIZE = 500
+
     def __init__(self, dataset: Dataset):
         super().__init__(dataset)
         self._config = KeywordTableConfig()
@@ -58,6 +61,38 @@ class Jieba(BaseKeyword):
 
             self._save_dataset_keyword_table(keyword_table)
 
+    def add_texts_of_document(self, texts: list[Document], **kwargs):
+        # keywords are only kept on the segments, the keyword table is rewritten once the document is completed
+        keyword_table_handler = JiebaKeywordTableHandler()
+        node_keywords = {
+            text.metadata['doc_id']: list(keyword_table_handler.extract_keywords(
+                text.page_content, self._config.max_keywords_per_chunk
+            ))
+            for text in texts
+        }
+        self._update_segments_keywords(node_keywords)
+
+    def complete_document(self, document_id: str) -> None:
+        lock_name = 'keyword_indexing_lock_{}'.format(self.dataset.id)
+        with redis_client.lock(lock_name, timeout=600):
+            keyword_table_handler = JiebaKeywordTableHandler()
+            keyword_table = self._get_dataset_keyword_table()
+            segments = db.session.query(DocumentSegment).filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.document_id == document_id
+            ).all()
+            for segment in segments:
+                # the batch of the segment was interrupted before its keywords were saved
+                if segment.keywords is None:
+                    segment.keywords = list(keyword_table_handler.extract_keywords(
+                        segment.content, self._config.max_keywords_per_chunk
+                    ))
+                keyword_table = self._add_text_to_keyword_table(keyword_table, segment.index_node_id,
+                                                                segment.keywords)
+
+            self._save_dataset_keyword_table(keyword_table)
+            db.session.commit()
+
     def text_exists(self, id: str) -> bool:
         keyword_table = self._get_dataset_keyword_table()
         return id in set.union(*keyword_table.values())
@@ -95,14 +130,18 @@ class Jieba(BaseKeyword):
         k = kwargs.get('top_k', 4)
 
         sorted_chunk_indices = self._retrieve_ids_by_query(keyword_table, query, k)
+        if not sorted_chunk_indices:
+            return []
+
+        segments = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.index_node_id.in_(sorted_chunk_indices)
+        ).all()
+        segment_map = {segment.index_node_id: segment for segment in segments}
 
         documents = []
         for chunk_index in sorted_chunk_indices:
-            segment = db.session.query(DocumentSegment).filter(
-                DocumentSegment.dataset_id == self.dataset.id,
-                DocumentSegment.index_node_id == chunk_index
-            ).first()
-
+            segment = segment_map.get(chunk_index)
             if segment:
                 documents.append(Document(
                     page_content=segment.content,
@@ -206,7 +245,7 @@ class Jieba(BaseKeyword):
 
         # go through text chunks in order of most matching keywords
         chunk_indices_count: dict[str, int] = defaultdict(int)
-        keywords = [keyword for keyword in keywords if keyword in set(keyword_table.keys())]
+        keywords = [keyword for keyword in keywords if keyword in keyword_table]
         for keyword in keywords:
             for node_id in keyword_table[keyword]:
                 chunk_indices_count[node_id] += 1
@@ -229,6 +268,18 @@ class Jieba(BaseKeyword):
             db.session.add(document_segment)
             db.session.commit()
 
+    def _update_segments_keywords(self, node_keywords: dict[str, list[str]]) -> None:
+        node_ids = list(node_keywords.keys())
+        for i in range(0, len(node_ids), self._BULK_BATCH_SIZE):
+            document_segments = db.session.query(DocumentSegment).filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.index_node_id.in_(node_ids[i:i + self._BULK_BATCH_SIZE])
+            ).all()
+            for document_segment in document_segments:
+                document_segment.keywords = node_keywords[document_segment.index_node_id]
+
+        db.session.commit()
+
     def create_segment_keywords(self, node_id: str, keywords: list[str]):
         keyword_table = self._get_dataset_keyword_table()
         self._update_segment_keywords(self.dataset.id, node_id, keywords)
@@ -0,0 +1,438 @@
+import os
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from collections.abc import Mapping
+from threading import Lock
+from typing import Any, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from core.rag.datasource.keyword.bm25_scorer import BM25Scorer
+from core.rag.datasource.keyword.jieba.jieba import KeywordTableConfig
+from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
+from core.rag.datasource.keyword.keyword_base import BaseKeyword
+from core.rag.models.document import Document
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.dataset import Dataset, DatasetKeywordPosting, DocumentSegment
+
+# max number of node ids held by the in-process postings cache, across all datasets
+KEYWORD_POSTINGS_CACHE_MAX_SIZE = int(os.environ.get('KEYWORD_POSTINGS_CACHE_MAX_SIZE', '1000000'))
+
+
+class KeywordPostingsCache:
+    """
+    Process-wide LRU cache of decoded keyword postings, keyed by dataset id and keyword.
+    Postings of a keyword map index node ids to segment lengths and must not be mutated.
+
+    Every write to the postings of a dataset replaces the version stamp of the dataset in redis,
+    so postings cached under an older version are never served.
+
+    Segment count and average segment length of datasets, used by BM25 scoring, barely move
+    between writes and are cached for a fixed time instead.
+    """
+    _lock = Lock()
+    _postings: OrderedDict[tuple[str, str], tuple[str, Mapping[str, int]]] = OrderedDict()
+    _size = 0
+
+    _stats_ttl = 600
+    _stats: dict[str, tuple[float, int, float]] = {}
+
+    @classmethod
+    def get_version(cls, dataset_id: str) -> Optional[str]:
+        """
+        Get current postings version of dataset, create one if missing
+        :param dataset_id: dataset id
+        :return:
+        """
+        version_key = cls._version_key(dataset_id)
+        version = redis_client.get(version_key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not redis_client.set(version_key, version, nx=True):
+                version = redis_client.get(version_key)
+
+        return version.decode('utf-8') if isinstance(version, bytes) else version
+
+    @classmethod
+    def refresh_version(cls, dataset_id: str) -> None:
+        """
+        Replace postings version of dataset after its postings changed
+        :param dataset_id: dataset id
+        :return:
+        """
+        redis_client.set(cls._version_key(dataset_id), uuid.uuid4().hex)
+
+    @classmethod
+    def delete_version(cls, dataset_id: str) -> None:
+        redis_client.delete(cls._version_key(dataset_id))
+
+    @classmethod
+    def get(cls, dataset_id: str, version: str, keywords: list[str]) -> dict[str, Mapping[str, int]]:
+        """
+        Get cached postings of keywords, keywords missing or cached under another version are omitted
+        :param dataset_id: dataset id
+        :param version: current postings version of dataset
+        :param keywords: keywords
+        :return: keyword to postings mapping
+        """
+        postings = {}
+        with cls._lock:
+            for keyword in keywords:
+                key = (dataset_id, keyword)
+                cached = cls._postings.get(key)
+                if cached is None:
+                    continue
+
+                if cached[0] != version:
+                    del cls._postings[key]
+                    cls._size -= len(cached[1]) + 1
+                    continue
+
+                cls._postings.move_to_end(key)
+                postings[keyword] = cached[1]
+
+        return postings
+
+    @classmethod
+    def set(cls, dataset_id: str, version: str, postings: dict[str, Mapping[str, int]]) -> None:
+        """
+        Cache postings of keywords under version
+        :param dataset_id: dataset id
+        :param version: postings version the postings were loaded at
+        :param postings: keyword to postings mapping
+        :return:
+        """
+        with cls._lock:
+            for keyword, node_ids in postings.items():
+                # empty postings are cached too, they cost one slot
+                size = len(node_ids) + 1
+                if size > KEYWORD_POSTINGS_CACHE_MAX_SIZE:
+                    continue
+
+                key = (dataset_id, keyword)
+                cached = cls._postings.pop(key, None)
+                if cached is not None:
+                    cls._size -= len(cached[1]) + 1
+
+                cls._postings[key] = (version, node_ids)
+                cls._size += size
+                while cls._size > KEYWORD_POSTINGS_CACHE_MAX_SIZE:
+                    _, (_, evicted_node_ids) = cls._postings.popitem(last=False)
+                    cls._size -= len(evicted_node_ids) + 1
+
+    @classmethod
+    def get_stats(cls, dataset_id: str) -> Optional[tuple[int, float]]:
+        """
+        Get cached segment count and average segment length of dataset
+        :param dataset_id: dataset id
+        :return:
+        """
+        with cls._lock:
+            stats = cls._stats.get(dataset_id)
+            if stats is None or stats[0] < time.monotonic():
+                return None
+
+            return stats[1], stats[2]
+
+    @classmethod
+    def set_stats(cls, dataset_id: str, segment_count: int, average_length: float) -> None:
+        with cls._lock:
+            now = time.monotonic()
+            # drop expired stats of other datasets
+            if len(cls._stats) > 1000:
+                cls._stats = {key: value for key, value in cls._stats.items() if value[0] >= now}
+
+            cls._stats[dataset_id] = (now + cls._stats_ttl, segment_count, average_length)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._postings.clear()
+            cls._size = 0
+            cls._stats.clear()
+
+    @staticmethod
+    def _version_key(dataset_id: str) -> str:
+        return 'keyword_postings_version:{}'.format(dataset_id)
+
+
+class JiebaPostings(BaseKeyword):
+    """
+    Jieba keyword index stored as one posting row per (keyword, index node).
+
+    Unlike `Jieba`, which rewrites the whole keyword table on every change, adding or deleting
+    texts only inserts or deletes the affected postings, and search only loads the postings of
+    the query keywords, served from `KeywordPostingsCache` when unchanged.
+
+    Matched segments are ranked by BM25, each posting keeps the length of its segment so that
+    scoring needs no extra lookups, the score is returned in `score` of document metadata.
+    """
+    # max rows per bulk insert and max ids per IN (...) clause
+    _BULK_BATCH_SIZE = 500
+
+    def __init__(self, dataset: Dataset):
+        super().__init__(dataset)
+        self._config = KeywordTableConfig()
+
+    def create(self, texts: list[Document], **kwargs) -> BaseKeyword:
+        self.add_texts(texts, **kwargs)
+        return self
+
+    def add_texts(self, texts: list[Document], **kwargs):
+        keyword_table_handler = JiebaKeywordTableHandler()
+        keywords_list = kwargs.get('keywords_list', None)
+
+        node_keywords = {}
+        node_lengths = {}
+        for i, text in enumerate(texts):
+            keywords = keywords_list[i] if keywords_list else None
+            if not keywords:
+                keywords = keyword_table_handler.extract_keywords(text.page_content,
+                                                                  self._config.max_keywords_per_chunk)
+            node_keywords[text.metadata['doc_id']] = list(keywords)
+            node_lengths[text.metadata['doc_id']] = len(text.page_content)
+
+        self._update_segments_keywords(node_keywords)
+        self._add_postings(node_keywords, node_lengths)
+
+    def complete_document(self, document_id: str) -> None:
+        # segments upserted before the keywords of their batch were added, when indexing was interrupted
+        segments = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.document_id == document_id,
+            DocumentSegment.keywords.is_(None)
+        ).all()
+        if segments:
+            self.add_texts([
+                Document(page_content=segment.content, metadata={'doc_id': segment.index_node_id})
+                for segment in segments
+            ])
+
+    def text_exists(self, id: str) -> bool:
+        posting = db.session.query(DatasetKeywordPosting.id).filter(
+            DatasetKeywordPosting.dataset_id == self.dataset.id,
+            DatasetKeywordPosting.index_node_id == id
+        ).first()
+
+        return posting is not None
+
+    def delete_by_ids(self, ids: list[str]) -> None:
+        if not ids:
+            return
+
+        for i in range(0, len(ids), self._BULK_BATCH_SIZE):
+            db.session.query(DatasetKeywordPosting).filter(
+                DatasetKeywordPosting.dataset_id == self.dataset.id,
+                DatasetKeywordPosting.index_node_id.in_(ids[i:i + self._BULK_BATCH_SIZE])
+            ).delete(synchronize_session=False)
+
+        db.session.commit()
+        KeywordPostingsCache.refresh_version(self.dataset.id)
+
+    def delete_by_document_id(self, document_id: str):
+        segments = db.session.query(DocumentSegment.index_node_id).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.document_id == document_id
+        ).all()
+
+        self.delete_by_ids([segment.index_node_id for segment in segments])
+
+    def search(
+            self, query: str,
+            **kwargs: Any
+    ) -> list[Document]:
+        k = kwargs.get('top_k', 4)
+
+        scored_chunk_indices = self._retrieve_ids_by_query(query, k)
+        if not scored_chunk_indices:
+            return []
+
+        segments = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.index_node_id.in_([chunk_index for chunk_index, _ in scored_chunk_indices])
+        ).all()
+        segment_map = {segment.index_node_id: segment for segment in segments}
+
+        documents = []
+        for chunk_index, score in scored_chunk_indices:
+            segment = segment_map.get(chunk_index)
+            if segment:
+                documents.append(Document(
+                    page_content=segment.content,
+                    metadata={
+                        "doc_id": chunk_index,
+                        "doc_hash": segment.index_node_hash,
+                        "document_id": segment.document_id,
+                        "dataset_id": segment.dataset_id,
+                        "score": score,
+                    }
+                ))
+
+        return documents
+
+    def delete(self) -> None:
+        db.session.query(DatasetKeywordPosting).filter(
+            DatasetKeywordPosting.dataset_id == self.dataset.id
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        KeywordPostingsCache.delete_version(self.dataset.id)
+
+    def create_segment_keywords(self, node_id: str, keywords: list[str]):
+        self._update_segments_keywords({node_id: keywords})
+        self._add_postings({node_id: keywords})
+
+    def multi_create_segment_keywords(self, pre_segment_data_list: list):
+        keyword_table_handler = JiebaKeywordTableHandler()
+        node_keywords = {}
+        node_lengths = {}
+        for pre_segment_data in pre_segment_data_list:
+            segment = pre_segment_data['segment']
+            if pre_segment_data['keywords']:
+                segment.keywords = pre_segment_data['keywords']
+            else:
+                keywords = keyword_table_handler.extract_keywords(segment.content,
+                                                                  self._config.max_keywords_per_chunk)
+                segment.keywords = list(keywords)
+            node_keywords[segment.index_node_id] = segment.keywords
+            node_lengths[segment.index_node_id] = len(segment.content)
+        self._add_postings(node_keywords, node_lengths)
+
+    def update_segment_keywords_index(self, node_id: str, keywords: list[str]):
+        self._add_postings({node_id: keywords})
+
+    def import_keyword_table(self, keyword_table: dict[str, set[str]]) -> None:
+        """
+        Import postings from a keyword table of `Jieba` keyword store
+        :param keyword_table: keyword to node ids mapping
+        :return:
+        """
+        node_keywords = defaultdict(list)
+        for keyword, node_ids in keyword_table.items():
+            for node_id in node_ids:
+                node_keywords[node_id].append(keyword)
+
+        self._add_postings(node_keywords)
+
+    def _retrieve_ids_by_query(self, query: str, k: int = 4) -> list[tuple[str, float]]:
+        keyword_table_handler = JiebaKeywordTableHandler()
+        keywords = keyword_table_handler.extract_keywords(query)
+        postings = self._get_postings(list(keywords))
+        if not postings:
+            return []
+
+        return self._get_scorer().score(postings, k)
+
+    def _get_scorer(self) -> BM25Scorer:
+        stats = KeywordPostingsCache.get_stats(self.dataset.id)
+        if stats is None:
+            segment_count, average_length = db.session.query(
+                func.count(DocumentSegment.id),
+                func.avg(DocumentSegment.word_count)
+            ).filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.status == 'completed'
+            ).first()
+            stats = (segment_count or 0, float(average_length or 0))
+            KeywordPostingsCache.set_stats(self.dataset.id, *stats)
+
+        return BM25Scorer(document_count=stats[0], average_length=stats[1])
+
+    def _get_postings(self, keywords: list[str]) -> dict[str, Mapping[str, int]]:
+        """
+        Get postings of keywords, from cache if the postings of dataset are unchanged
+        :param keywords: keywords
+        :return: keyword to mapping of index node id to segment length
+        """
+        keywords = [keyword for keyword in keywords if self._is_valid_keyword(keyword)]
+        if not keywords:
+            return {}
+
+        version = KeywordPostingsCache.get_version(self.dataset.id)
+        postings = KeywordPostingsCache.get(self.dataset.id, version, keywords) if version else {}
+
+        missing_keywords = [keyword for keyword in keywords if keyword not in postings]
+        if missing_keywords:
+            loaded_postings = {keyword: {} for keyword in missing_keywords}
+            rows = db.session.query(
+                DatasetKeywordPosting.keyword,
+                DatasetKeywordPosting.index_node_id,
+                DatasetKeywordPosting.segment_length
+            ).filter(
+                DatasetKeywordPosting.dataset_id == self.dataset.id,
+                DatasetKeywordPosting.keyword.in_(missing_keywords)
+            ).all()
+            for keyword, index_node_id, segment_length in rows:
+                loaded_postings[keyword][index_node_id] = segment_length
+
+            if version:
+                KeywordPostingsCache.set(self.dataset.id, version, loaded_postings)
+
+            postings.update(loaded_postings)
+
+        return {keyword: node_lengths for keyword, node_lengths in postings.items() if node_lengths}
+
+    def _add_postings(self, node_keywords: dict[str, list[str]],
+                      node_lengths: Optional[dict[str, int]] = None) -> None:
+        """
+        Insert postings of index nodes, existing postings are kept
+        :param node_keywords: index node id to keywords mapping
+        :param node_lengths: index node id to segment length mapping, loaded from segments if not given
+        :return:
+        """
+        if node_lengths is None:
+            node_lengths = self._get_segment_lengths(list(node_keywords.keys()))
+
+        rows = [
+            {
+                'dataset_id': self.dataset.id,
+                'keyword': keyword,
+                'index_node_id': node_id,
+                'segment_length': node_lengths.get(node_id, 0),
+            }
+            for node_id, keywords in node_keywords.items()
+            for keyword in set(keywords)
+            if self._is_valid_keyword(keyword)
+        ]
+        if not rows:
+            return
+
+        for i in range(0, len(rows), self._BULK_BATCH_SIZE):
+            db.session.execute(
+                insert(DatasetKeywordPosting)
+                .values(rows[i:i + self._BULK_BATCH_SIZE])
+                .on_conflict_do_nothing(index_elements=['dataset_id', 'keyword', 'index_node_id'])
+            )
+
+        db.session.commit()
+        KeywordPostingsCache.refresh_version(self.dataset.id)
+
+    def _update_segments_keywords(self, node_keywords: dict[str, list[str]]) -> None:
+        node_ids = list(node_keywords.keys())
+        for i in range(0, len(node_ids), self._BULK_BATCH_SIZE):
+            document_segments = db.session.query(DocumentSegment).filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.index_node_id.in_(node_ids[i:i + self._BULK_BATCH_SIZE])
+            ).all()
+            for document_segment in document_segments:
+                document_segment.keywords = list(node_keywords[document_segment.index_node_id])
+
+        db.session.commit()
+
+    def _get_segment_lengths(self, node_ids: list[str]) -> dict[str, int]:
+        node_lengths = {}
+        for i in range(0, len(node_ids), self._BULK_BATCH_SIZE):
+            rows = db.session.query(DocumentSegment.index_node_id, DocumentSegment.word_count).filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.index_node_id.in_(node_ids[i:i + self._BULK_BATCH_SIZE])
+            ).all()
+            for index_node_id, word_count in rows:
+                node_lengths[index_node_id] = word_count or 0
+
+        return node_lengths
+
+    @staticmethod
+    def _is_valid_keyword(keyword: str) -> bool:
+        return bool(keyword) and len(keyword) <= 255
@@ -32,6 +32,22 @@ class BaseKeyword(ABC):
     def delete_by_document_id(self, document_id: str) -> None:
         raise NotImplementedError
 
+    def add_texts_of_document(self, texts: list[Document], **kwargs):
+        """
+        Add texts of a document which is indexed in batches, `complete_document` is called once all are added.
+        :param texts: texts of a batch
+        :return:
+        """
+        self.add_texts(texts, **kwargs)
+
+    def complete_document(self, document_id: str) -> None:
+        """
+        Complete the index of a document whose texts are added in batches.
+        :param document_id: document id
+        :return:
+        """
+        pass
+
     def delete(self) -> None:
         raise NotImplementedError
 
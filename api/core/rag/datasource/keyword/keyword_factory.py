@@ -3,6 +3,7 @@ from typing import Any
 from flask import current_app
 
 from core.rag.datasource.keyword.jieba.jieba import Jieba
+from core.rag.datasource.keyword.jieba.jieba_postings import JiebaPostings
 from core.rag.datasource.keyword.keyword_base import BaseKeyword
 from core.rag.models.document import Document
 from models.dataset import Dataset
@@ -24,6 +25,10 @@ class Keyword:
             return Jieba(
                 dataset=self._dataset
             )
+        elif keyword_type == "jieba_postings":
+            return JiebaPostings(
+                dataset=self._dataset
+            )
         else:
             raise ValueError(f"Keyword store {keyword_type} is not supported.")
 
@@ -33,6 +38,12 @@ class Keyword:
     def add_texts(self, texts: list[Document], **kwargs):
         self._keyword_processor.add_texts(texts, **kwargs)
 
+    def add_texts_of_document(self, texts: list[Document], **kwargs):
+        self._keyword_processor.add_texts_of_document(texts, **kwargs)
+
+    def complete_document(self, document_id: str) -> None:
+        self._keyword_processor.complete_document(document_id)
+
     def text_exists(self, id: str) -> bool:
         return self._keyword_processor.text_exists(id)
 
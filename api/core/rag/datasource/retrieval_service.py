@@ -1,14 +1,29 @@
-import threading
+import logging
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError, wait
+from threading import Lock
 from typing import Optional
 
 from flask import Flask, current_app
 
 from core.rag.data_post_processor.data_post_processor import DataPostProcessor
+from core.rag.data_post_processor.fusion import FusionMethod, FusionRunner
 from core.rag.datasource.keyword.keyword_factory import Keyword
 from core.rag.datasource.vdb.vector_factory import Vector
+from core.rag.models.document import Document
 from extensions.ext_database import db
 from models.dataset import Dataset
 
+logger = logging.getLogger(__name__)
+
+# max number of retrieval stages running concurrently in the process
+RETRIEVAL_MAX_WORKERS = int(os.environ.get('RETRIEVAL_MAX_WORKERS', '32'))
+# max seconds a retrieval waits for its search stages
+RETRIEVAL_TIMEOUT = float(os.environ.get('RETRIEVAL_TIMEOUT', '30'))
+# seconds between info logs of the latency stats of retrieval stages in a process, 0 disables them
+RETRIEVAL_STATS_LOG_INTERVAL = float(os.environ.get('RETRIEVAL_STATS_LOG_INTERVAL', '300'))
+
 default_retrieval_model = {
     'search_method': 'semantic_search',
     'reranking_enable': False,
@@ -21,150 +36,427 @@ default_retrieval_model = {
 }
 
 
+class RetrievalTask:
+    """
+    Retrieval of a dataset, whose search stages are running in the retrieval executor.
+    """
+
+    def __init__(self, flask_app: Flask, dataset_id: str, tenant_id: str, retrival_method: str, query: str,
+                 top_k: int, score_threshold: Optional[float], reranking_model: Optional[dict],
+                 fusion_method: FusionMethod, fusion_weights: Optional[dict], deadline: float):
+        self.flask_app = flask_app
+        self.dataset_id = dataset_id
+        self.tenant_id = tenant_id
+        self.retrival_method = retrival_method
+        self.query = query
+        self.top_k = top_k
+        self.score_threshold = score_threshold
+        self.reranking_model = reranking_model
+        self.fusion_method = fusion_method
+        self.fusion_weights = fusion_weights
+        self.deadline = deadline
+        self.futures: dict[str, Future] = {}
+
+
 class RetrievalService:
+    # search stages of all retrievals share one bounded executor,
+    # stages never wait for other stages so the executor can not deadlock.
+    # a stage still running at the deadline of its retrieval is abandoned, not cancelled: it keeps its worker
+    # until its current backend call returns, then skips its remaining steps
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = Lock()
+
+    # latency counters, keyed by stage
+    _STAGE_STATS_COUNTERS = ('count', 'error', 'timeout', 'total_latency', 'max_latency')
+    _stage_stats_lock = Lock()
+    _stage_stats: dict[str, dict[str, float]] = {}
+    _stage_stats_logged_at = time.monotonic()
 
     @classmethod
     def retrieve(cls, retrival_method: str, dataset_id: str, query: str,
-                 top_k: int, score_threshold: Optional[float] = .0, reranking_model: Optional[dict] = None):
+                 top_k: int, score_threshold: Optional[float] = .0, reranking_model: Optional[dict] = None,
+                 fusion_method: Optional[str] = None, fusion_weights: Optional[dict] = None):
         dataset = db.session.query(Dataset).filter(
             Dataset.id == dataset_id
         ).first()
-        if not dataset or dataset.available_document_count == 0 or dataset.available_segment_count == 0:
+        if not dataset:
             return []
-        all_documents = []
-        threads = []
+
+        retrieval = cls.submit(
+            dataset=dataset,
+            retrival_method=retrival_method,
+            query=query,
+            top_k=top_k,
+            score_threshold=score_threshold,
+            reranking_model=reranking_model,
+            fusion_method=fusion_method,
+            fusion_weights=fusion_weights
+        )
+        return cls.collect(retrieval)
+
+    @classmethod
+    def submit(cls, dataset: Dataset, retrival_method: str, query: str,
+               top_k: int, score_threshold: Optional[float] = .0, reranking_model: Optional[dict] = None,
+               fusion_method: Optional[str] = None, fusion_weights: Optional[dict] = None,
+               deadline: Optional[float] = None) -> Optional[RetrievalTask]:
+        """
+        Resolve keyword and vector index of dataset and submit search stages to the retrieval executor
+        :param dataset: dataset
+        :param retrival_method: retrieval method
+        :param query: query
+        :param top_k: top k
+        :param score_threshold: score threshold
+        :param reranking_model: reranking model
+        :param fusion_method: how hybrid search merges semantic and full text results, default rerank
+        :param fusion_weights: weights of semantic_search and full_text_search for local fusion methods
+        :param deadline: time.monotonic() deadline of the retrieval, default RETRIEVAL_TIMEOUT from now
+        :return: retrieval task, None if dataset has nothing to retrieve
+        """
+        if dataset.available_document_count == 0 or dataset.available_segment_count == 0:
+            return None
+
+        flask_app = current_app._get_current_object()
+        retrieval = RetrievalTask(
+            flask_app=flask_app,
+            dataset_id=dataset.id,
+            tenant_id=str(dataset.tenant_id),
+            retrival_method=retrival_method,
+            query=query,
+            top_k=top_k,
+            score_threshold=score_threshold,
+            reranking_model=reranking_model,
+            fusion_method=FusionMethod.value_of(fusion_method) if fusion_method else FusionMethod.RERANK,
+            fusion_weights=fusion_weights,
+            deadline=deadline or time.monotonic() + RETRIEVAL_TIMEOUT
+        )
+
         # retrieval_model source with keyword
         if retrival_method == 'keyword_search':
-            keyword_thread = threading.Thread(target=RetrievalService.keyword_search, kwargs={
-                'flask_app': current_app._get_current_object(),
-                'dataset_id': dataset_id,
-                'query': query,
-                'top_k': top_k,
-                'all_documents': all_documents
-            })
-            threads.append(keyword_thread)
-            keyword_thread.start()
-        # retrieval_model source with semantic
-        if retrival_method == 'semantic_search' or retrival_method == 'hybrid_search':
-            embedding_thread = threading.Thread(target=RetrievalService.embedding_search, kwargs={
-                'flask_app': current_app._get_current_object(),
-                'dataset_id': dataset_id,
-                'query': query,
-                'top_k': top_k,
-                'score_threshold': score_threshold,
-                'reranking_model': reranking_model,
-                'all_documents': all_documents,
-                'retrival_method': retrival_method
-            })
-            threads.append(embedding_thread)
-            embedding_thread.start()
-
-        # retrieval source with full text
-        if retrival_method == 'full_text_search' or retrival_method == 'hybrid_search':
-            full_text_index_thread = threading.Thread(target=RetrievalService.full_text_index_search, kwargs={
-                'flask_app': current_app._get_current_object(),
-                'dataset_id': dataset_id,
-                'query': query,
-                'retrival_method': retrival_method,
-                'score_threshold': score_threshold,
-                'top_k': top_k,
-                'reranking_model': reranking_model,
-                'all_documents': all_documents
-            })
-            threads.append(full_text_index_thread)
-            full_text_index_thread.start()
-
-        for thread in threads:
-            thread.join()
-
-        if retrival_method == 'hybrid_search':
-            data_post_processor = DataPostProcessor(str(dataset.tenant_id), reranking_model, False)
-            all_documents = data_post_processor.invoke(
+            retrieval.futures['keyword_search'] = cls._submit_stage(
+                flask_app=flask_app,
+                stage='keyword_search',
+                deadline=retrieval.deadline,
+                func=cls.keyword_search,
+                keyword=Keyword(dataset=cls._detach_dataset(dataset)),
                 query=query,
-                documents=all_documents,
-                score_threshold=score_threshold,
-                top_n=top_k
+                top_k=top_k
             )
-        return all_documents
+
+        if retrival_method in ['semantic_search', 'full_text_search', 'hybrid_search']:
+            # shared by embedding and full text search, reads dataset only when initialized
+            vector = Vector(dataset=dataset)
+
+            # retrieval_model source with semantic
+            if retrival_method == 'semantic_search' or retrival_method == 'hybrid_search':
+                retrieval.futures['embedding_search'] = cls._submit_stage(
+                    flask_app=flask_app,
+                    stage='embedding_search',
+                    deadline=retrieval.deadline,
+                    func=cls.embedding_search,
+                    vector=vector,
+                    dataset_id=retrieval.dataset_id,
+                    tenant_id=retrieval.tenant_id,
+                    query=query,
+                    top_k=top_k,
+                    score_threshold=score_threshold,
+                    reranking_model=reranking_model,
+                    retrival_method=retrival_method,
+                    rerank_deadline=retrieval.deadline
+                )
+
+            # retrieval source with full text
+            if retrival_method == 'full_text_search' or retrival_method == 'hybrid_search':
+                retrieval.futures['full_text_search'] = cls._submit_stage(
+                    flask_app=flask_app,
+                    stage='full_text_search',
+                    deadline=retrieval.deadline,
+                    func=cls.full_text_index_search,
+                    vector=vector,
+                    tenant_id=retrieval.tenant_id,
+                    query=query,
+                    top_k=top_k,
+                    score_threshold=score_threshold,
+                    reranking_model=reranking_model,
+                    retrival_method=retrival_method,
+                    rerank_deadline=retrieval.deadline
+                )
+
+        return retrieval
 
     @classmethod
-    def keyword_search(cls, flask_app: Flask, dataset_id: str, query: str,
-                       top_k: int, all_documents: list):
-        with flask_app.app_context():
-            dataset = db.session.query(Dataset).filter(
-                Dataset.id == dataset_id
-            ).first()
+    def collect(cls, retrieval: Optional[RetrievalTask]) -> list[Document]:
+        """
+        Wait for search stages of retrieval until its deadline, stages not started in time are cancelled,
+        and running ones are abandoned
+        :param retrieval: retrieval task
+        :return: retrieved documents
+        """
+        return cls.collect_all([retrieval])[0]
 
-            keyword = Keyword(
-                dataset=dataset
-            )
+    @classmethod
+    def collect_all(cls, retrievals: list[Optional[RetrievalTask]]) -> list[list[Document]]:
+        """
+        Wait for search stages of retrievals until their deadlines, then merge hybrid search results,
+        either locally or by rerank models concurrently
+        :param retrievals: retrieval tasks
+        :return: retrieved documents of each retrieval
+        """
+        results = []
+        rerank_futures = {}
+        for i, retrieval in enumerate(retrievals):
+            if not retrieval:
+                results.append([])
+                continue
 
-            documents = keyword.search(
-                query,
-                top_k=top_k
-            )
-            all_documents.extend(documents)
+            stage_documents = cls._wait_search_stages(retrieval)
+            if retrieval.retrival_method == 'hybrid_search' and retrieval.fusion_method != FusionMethod.RERANK:
+                results.append(cls.hybrid_fuse(retrieval, stage_documents))
+                continue
+
+            results.append([document for documents in stage_documents.values() for document in documents])
+
+            # rerank stages only start after search stages of their retrieval are finished
+            if retrieval.retrival_method == 'hybrid_search':
+                rerank_futures[i] = cls._submit_stage(
+                    flask_app=retrieval.flask_app,
+                    stage='rerank',
+                    deadline=retrieval.deadline,
+                    func=cls.hybrid_rerank,
+                    tenant_id=retrieval.tenant_id,
+                    query=retrieval.query,
+                    documents=results[i],
+                    top_k=retrieval.top_k,
+                    score_threshold=retrieval.score_threshold,
+                    reranking_model=retrieval.reranking_model
+                )
+
+        for i, future in rerank_futures.items():
+            retrieval = retrievals[i]
+            try:
+                documents = future.result(timeout=max(retrieval.deadline - time.monotonic(), 0))
+            except TimeoutError:
+                future.cancel()
+                cls._record_stage_stats('rerank', timeout=1)
+                documents = None
+
+            if documents is None:
+                logger.warning('Rerank of dataset %s timed out, results are not reranked.', retrieval.dataset_id)
+                documents = results[i][:retrieval.top_k]
+
+            results[i] = documents
+
+        return results
 
     @classmethod
-    def embedding_search(cls, flask_app: Flask, dataset_id: str, query: str,
+    def hybrid_fuse(cls, retrieval: RetrievalTask, stage_documents: dict[str, list[Document]]) -> list[Document]:
+        start_at = time.perf_counter()
+        fusion_runner = FusionRunner(retrieval.fusion_method, retrieval.fusion_weights)
+        documents = fusion_runner.run(
+            ranked_lists={
+                'semantic_search': stage_documents.get('embedding_search', []),
+                'full_text_search': stage_documents.get('full_text_search', []),
+            },
+            score_threshold=retrieval.score_threshold,
+            top_n=retrieval.top_k
+        )
+        cls._record_stage_stats('fusion', count=1, latency=time.perf_counter() - start_at)
+        return documents
+
+    @classmethod
+    def hybrid_rerank(cls, tenant_id: str, query: str, documents: list[Document], top_k: int,
+                      score_threshold: Optional[float], reranking_model: Optional[dict]) -> list[Document]:
+        data_post_processor = DataPostProcessor(tenant_id, reranking_model, False)
+        return data_post_processor.invoke(
+            query=query,
+            documents=documents,
+            score_threshold=score_threshold,
+            top_n=top_k
+        )
+
+    @classmethod
+    def keyword_search(cls, keyword: Keyword, query: str, top_k: int) -> list[Document]:
+        return keyword.search(
+            query,
+            top_k=top_k
+        )
+
+    @classmethod
+    def embedding_search(cls, vector: Vector, dataset_id: str, tenant_id: str, query: str,
                          top_k: int, score_threshold: Optional[float], reranking_model: Optional[dict],
-                         all_documents: list, retrival_method: str):
-        with flask_app.app_context():
-            dataset = db.session.query(Dataset).filter(
-                Dataset.id == dataset_id
-            ).first()
-
-            vector = Vector(
-                dataset=dataset
-            )
+                         retrival_method: str, rerank_deadline: Optional[float] = None) -> Optional[list[Document]]:
+        documents = vector.search_by_vector(
+            query,
+            search_type='similarity_score_threshold',
+            top_k=top_k,
+            score_threshold=score_threshold,
+            filter={
+                'group_id': [dataset_id]
+            }
+        )
+
+        if documents and reranking_model and retrival_method == 'semantic_search':
+            if cls._is_abandoned('embedding_search', rerank_deadline):
+                return None
 
-            documents = vector.search_by_vector(
-                query,
-                search_type='similarity_score_threshold',
-                top_k=top_k,
+            data_post_processor = DataPostProcessor(tenant_id, reranking_model, False)
+            return data_post_processor.invoke(
+                query=query,
+                documents=documents,
                 score_threshold=score_threshold,
-                filter={
-                    'group_id': [dataset.id]
-                }
+                top_n=len(documents)
             )
 
-            if documents:
-                if reranking_model and retrival_method == 'semantic_search':
-                    data_post_processor = DataPostProcessor(str(dataset.tenant_id), reranking_model, False)
-                    all_documents.extend(data_post_processor.invoke(
-                        query=query,
-                        documents=documents,
-                        score_threshold=score_threshold,
-                        top_n=len(documents)
-                    ))
-                else:
-                    all_documents.extend(documents)
+        return documents
 
     @classmethod
-    def full_text_index_search(cls, flask_app: Flask, dataset_id: str, query: str,
+    def full_text_index_search(cls, vector: Vector, tenant_id: str, query: str,
                                top_k: int, score_threshold: Optional[float], reranking_model: Optional[dict],
-                               all_documents: list, retrival_method: str):
-        with flask_app.app_context():
-            dataset = db.session.query(Dataset).filter(
-                Dataset.id == dataset_id
-            ).first()
-
-            vector_processor = Vector(
-                dataset=dataset,
-            )
+                               retrival_method: str, rerank_deadline: Optional[float] = None) \
+            -> Optional[list[Document]]:
+        documents = vector.search_by_full_text(
+            query,
+            top_k=top_k
+        )
 
-            documents = vector_processor.search_by_full_text(
-                query,
-                top_k=top_k
+        if documents and reranking_model and retrival_method == 'full_text_search':
+            if cls._is_abandoned('full_text_search', rerank_deadline):
+                return None
+
+            data_post_processor = DataPostProcessor(tenant_id, reranking_model, False)
+            return data_post_processor.invoke(
+                query=query,
+                documents=documents,
+                score_threshold=score_threshold,
+                top_n=len(documents)
             )
-            if documents:
-                if reranking_model and retrival_method == 'full_text_search':
-                    data_post_processor = DataPostProcessor(str(dataset.tenant_id), reranking_model, False)
-                    all_documents.extend(data_post_processor.invoke(
-                        query=query,
-                        documents=documents,
-                        score_threshold=score_threshold,
-                        top_n=len(documents)
-                    ))
-                else:
-                    all_documents.extend(documents)
+
+        return documents
+
+    @classmethod
+    def get_stage_stats(cls) -> dict[str, dict[str, float]]:
+        """
+        Get latency stats of retrieval stages since process start
+        :return: stage to counters mapping, latencies in seconds
+        """
+        with cls._stage_stats_lock:
+            stats = {stage: dict(counters) for stage, counters in cls._stage_stats.items()}
+
+        for counters in stats.values():
+            counters['avg_latency'] = counters['total_latency'] / counters['count'] if counters['count'] else 0
+
+        return stats
+
+    @classmethod
+    def _log_stage_stats(cls) -> None:
+        stats = cls.get_stage_stats()
+        logger.info('Retrieval stage stats of process %s: %s', os.getpid(), '; '.join(
+            f"{stage} count={counters['count']} error={counters['error']} timeout={counters['timeout']} "
+            f"avg_latency={counters['avg_latency']:.3f}s max_latency={counters['max_latency']:.3f}s"
+            for stage, counters in sorted(stats.items())
+        ))
+
+    @staticmethod
+    def _is_abandoned(stage: str, deadline: Optional[float]) -> bool:
+        # a running stage can not be cancelled, it checks the deadline between its backend calls instead
+        if deadline is None or time.monotonic() < deadline:
+            return False
+
+        logger.debug('Retrieval stage %s passed its deadline, remaining steps are skipped.', stage)
+        return True
+
+    @classmethod
+    def _wait_search_stages(cls, retrieval: RetrievalTask) -> dict[str, list[Document]]:
+        _, not_done = wait(retrieval.futures.values(), timeout=max(retrieval.deadline - time.monotonic(), 0))
+        if not_done:
+            # stages which are running are abandoned, they skip their remaining steps after the deadline
+            for future in not_done:
+                future.cancel()
+
+            timed_out_stages = [stage for stage, future in retrieval.futures.items() if future in not_done]
+            for stage in timed_out_stages:
+                cls._record_stage_stats(stage, timeout=1)
+
+            logger.warning('Retrieval of dataset %s timed out, stages %s are skipped.',
+                           retrieval.dataset_id, ', '.join(timed_out_stages))
+
+        stage_documents = {}
+        for stage, future in retrieval.futures.items():
+            if future in not_done:
+                continue
+
+            try:
+                stage_documents[stage] = future.result() or []
+            except Exception:
+                logger.exception('Retrieval stage %s of dataset %s failed.', stage, retrieval.dataset_id)
+
+        return stage_documents
+
+    @classmethod
+    def _submit_stage(cls, flask_app: Flask, stage: str, deadline: float, func, **kwargs) -> Future:
+        return cls._get_executor().submit(
+            cls._run_stage,
+            flask_app=flask_app,
+            stage=stage,
+            deadline=deadline,
+            func=func,
+            **kwargs
+        )
+
+    @classmethod
+    def _run_stage(cls, flask_app: Flask, stage: str, deadline: float, func, **kwargs) -> Optional[list[Document]]:
+        # skip stages which waited in queue past the deadline of their retrieval
+        if time.monotonic() >= deadline:
+            cls._record_stage_stats(stage, timeout=1)
+            return None
+
+        start_at = time.perf_counter()
+        error = 0
+        try:
+            with flask_app.app_context():
+                return func(**kwargs)
+        except Exception:
+            error = 1
+            raise
+        finally:
+            cls._record_stage_stats(stage, count=1, error=error, latency=time.perf_counter() - start_at)
+
+    @classmethod
+    def _record_stage_stats(cls, stage: str, count: int = 0, error: int = 0,
+                            timeout: int = 0, latency: float = 0) -> None:
+        now = time.monotonic()
+        with cls._stage_stats_lock:
+            counters = cls._stage_stats.setdefault(stage, dict.fromkeys(cls._STAGE_STATS_COUNTERS, 0))
+            counters['count'] += count
+            counters['error'] += error
+            counters['timeout'] += timeout
+            counters['total_latency'] += latency
+            counters['max_latency'] = max(counters['max_latency'], latency)
+
+            should_log = 0 < RETRIEVAL_STATS_LOG_INTERVAL <= now - cls._stage_stats_logged_at
+            if should_log:
+                cls._stage_stats_logged_at = now
+
+        if should_log:
+            cls._log_stage_stats()
+
+    @staticmethod
+    def _detach_dataset(dataset: Dataset) -> Dataset:
+        """
+        Copy dataset to a transient instance, so that reading it in a stage never goes through
+        the session of the submitting thread, which may expire it on commit
+        :param dataset: dataset
+        :return:
+        """
+        return Dataset(**{column.name: getattr(dataset, column.name) for column in Dataset.__table__.columns})
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=RETRIEVAL_MAX_WORKERS,
+                        thread_name_prefix='retrieval'
+                    )
+
+        return cls._executor
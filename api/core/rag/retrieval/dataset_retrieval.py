@@ -1,8 +1,6 @@
-import threading
+import time
 from typing import Optional, cast
 
-from flask import Flask, current_app
-
 from core.app.app_config.entities import DatasetEntity, DatasetRetrieveConfigEntity
 from core.app.entities.app_invoke_entities import InvokeFrom, ModelConfigWithCredentialsEntity
 from core.callback_handler.index_tool_callback_handler import DatasetIndexToolCallbackHandler
@@ -12,7 +10,7 @@ from core.model_manager import ModelInstance, ModelManager
 from core.model_runtime.entities.message_entities import PromptMessageTool
 from core.model_runtime.entities.model_entities import ModelFeature, ModelType
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
-from core.rag.datasource.retrieval_service import RetrievalService
+from core.rag.datasource.retrieval_service import RETRIEVAL_TIMEOUT, RetrievalService, RetrievalTask
 from core.rag.models.document import Document
 from core.rag.retrieval.router.multi_dataset_function_call_router import FunctionCallMultiDatasetRouter
 from core.rag.retrieval.router.multi_dataset_react_route import ReactMultiDatasetRouter
@@ -253,7 +251,9 @@ class DatasetRetrieval:
                 results = RetrievalService.retrieve(retrival_method=retrival_method, dataset_id=dataset.id,
                                                     query=query,
                                                     top_k=top_k, score_threshold=score_threshold,
-                                                    reranking_model=reranking_model)
+                                                    reranking_model=reranking_model,
+                                                    fusion_method=retrieval_model_config.get('fusion_method'),
+                                                    fusion_weights=retrieval_model_config.get('fusion_weights'))
                 self._on_query(query, [dataset_id], app_id, user_from, user_id)
                 if results:
                     self._on_retrival_end(results)
@@ -271,21 +271,13 @@ class DatasetRetrieval:
                           score_threshold: float,
                           reranking_provider_name: str,
                           reranking_model_name: str):
-        threads = []
         all_documents = []
         dataset_ids = [dataset.id for dataset in available_datasets]
-        for dataset in available_datasets:
-            retrieval_thread = threading.Thread(target=self._retriever, kwargs={
-                'flask_app': current_app._get_current_object(),
-                'dataset_id': dataset.id,
-                'query': query,
-                'top_k': top_k,
-                'all_documents': all_documents,
-            })
-            threads.append(retrieval_thread)
-            retrieval_thread.start()
-        for thread in threads:
-            thread.join()
+        # search stages of all datasets run concurrently in the retrieval executor
+        deadline = time.monotonic() + RETRIEVAL_TIMEOUT
+        retrievals = [self._submit_retrieval(dataset, query, top_k, deadline) for dataset in available_datasets]
+        for documents in RetrievalService.collect_all(retrievals):
+            all_documents.extend(documents)
         # do rerank for searched documents
         model_manager = ModelManager()
         rerank_model_instance = model_manager.get_model_instance(
@@ -341,41 +333,35 @@ class DatasetRetrieval:
             db.session.add(dataset_query)
         db.session.commit()
 
-    def _retriever(self, flask_app: Flask, dataset_id: str, query: str, top_k: int, all_documents: list):
-        with flask_app.app_context():
-            dataset = db.session.query(Dataset).filter(
-                Dataset.id == dataset_id
-            ).first()
-
-            if not dataset:
-                return []
-
-            # get retrieval model , if the model is not setting , using default
-            retrieval_model = dataset.retrieval_model if dataset.retrieval_model else default_retrieval_model
-
-            if dataset.indexing_technique == "economy":
-                # use keyword table query
-                documents = RetrievalService.retrieve(retrival_method='keyword_search',
-                                                      dataset_id=dataset.id,
-                                                      query=query,
-                                                      top_k=top_k
-                                                      )
-                if documents:
-                    all_documents.extend(documents)
-            else:
-                if top_k > 0:
-                    # retrieval source
-                    documents = RetrievalService.retrieve(retrival_method=retrieval_model['search_method'],
-                                                          dataset_id=dataset.id,
-                                                          query=query,
-                                                          top_k=top_k,
-                                                          score_threshold=retrieval_model['score_threshold']
-                                                          if retrieval_model['score_threshold_enabled'] else None,
-                                                          reranking_model=retrieval_model['reranking_model']
-                                                          if retrieval_model['reranking_enable'] else None
-                                                          )
-
-                    all_documents.extend(documents)
+    def _submit_retrieval(self, dataset: Dataset, query: str, top_k: int,
+                          deadline: float) -> Optional[RetrievalTask]:
+        # get retrieval model , if the model is not setting , using default
+        retrieval_model = dataset.retrieval_model if dataset.retrieval_model else default_retrieval_model
+
+        if dataset.indexing_technique == "economy":
+            # use keyword table query
+            return RetrievalService.submit(dataset=dataset,
+                                           retrival_method='keyword_search',
+                                           query=query,
+                                           top_k=top_k,
+                                           deadline=deadline
+                                           )
+        elif top_k > 0:
+            # retrieval source
+            return RetrievalService.submit(dataset=dataset,
+                                           retrival_method=retrieval_model['search_method'],
+                                           query=query,
+                                           top_k=top_k,
+                                           score_threshold=retrieval_model['score_threshold']
+                                           if retrieval_model['score_threshold_enabled'] else None,
+                                           reranking_model=retrieval_model['reranking_model']
+                                           if retrieval_model['reranking_enable'] else None,
+                                           fusion_method=retrieval_model.get('fusion_method'),
+                                           fusion_weights=retrieval_model.get('fusion_weights'),
+                                           deadline=deadline
+                                           )
+
+        return None
 
     def to_dataset_retriever_tool(self, tenant_id: str,
                                   dataset_ids: list[str],
@@ -1,6 +1,7 @@
 """Functionality for splitting text."""
 from __future__ import annotations
 
+from collections.abc import Callable
 from typing import Any, Optional, cast
 
 from core.model_manager import ModelInstance
@@ -20,8 +21,60 @@ from core.splitter.text_splitter import (
 class EnhanceRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
     """
         This class is used to implement from_gpt2_encoder, to prevent using of tiktoken
+
+        Lengths are memoized for the duration of one `split_text` call, so fragments and separators
+        that are measured again while recursing and merging are only tokenized once.
     """
 
+    def __init__(self, batch_length_function: Optional[Callable[[list[str]], list[int]]] = None, **kwargs: Any):
+        """Create a new TextSplitter."""
+        super().__init__(**kwargs)
+        self._token_length_function = self._length_function
+        self._batch_length_function = batch_length_function
+        self._length_function = self._cached_length
+        self._length_cache: Optional[dict[str, int]] = None
+
+    def split_text(self, text: str) -> list[str]:
+        """Split incoming text and return chunks."""
+        return self._with_length_cache(super().split_text, text)
+
+    def _with_length_cache(self, split: Callable[[str], list[str]], text: str) -> list[str]:
+        """
+        Run split with a length cache which lives until the split is done
+        :param split: split function
+        :param text: text to split
+        :return: chunks
+        """
+        if self._length_cache is not None:
+            return split(text)
+
+        self._length_cache = {}
+        try:
+            return split(text)
+        finally:
+            self._length_cache = None
+
+    def _cached_length(self, text: str) -> int:
+        if self._length_cache is None:
+            return self._token_length_function(text)
+
+        length = self._length_cache.get(text)
+        if length is None:
+            length = self._token_length_function(text)
+            self._length_cache[text] = length
+
+        return length
+
+    def _prefetch_lengths(self, texts: list[str]) -> None:
+        if self._length_cache is None or self._batch_length_function is None:
+            return
+
+        missing_texts = list({text: None for text in texts if text not in self._length_cache})
+        if not missing_texts:
+            return
+
+        self._length_cache.update(zip(missing_texts, self._batch_length_function(missing_texts)))
+
     @classmethod
     def from_encoder(
             cls: type[TS],
@@ -45,6 +98,20 @@ class EnhanceRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
             else:
                 return GPT2Tokenizer.get_num_tokens(text)
 
+        def _batch_token_encoder(texts: list[str]) -> list[int]:
+            if embedding_model_instance:
+                embedding_model_type_instance = embedding_model_instance.model_type_instance
+                embedding_model_type_instance = cast(TextEmbeddingModel, embedding_model_type_instance)
+                non_empty_texts = [text for text in texts if text]
+                counts = iter(embedding_model_type_instance.get_num_tokens_batch(
+                    model=embedding_model_instance.model,
+                    credentials=embedding_model_instance.credentials,
+                    texts=non_empty_texts
+                ) if non_empty_texts else [])
+                return [next(counts) if text else 0 for text in texts]
+            else:
+                return GPT2Tokenizer.get_num_tokens_batch(texts)
+
         if issubclass(cls, TokenTextSplitter):
             extra_kwargs = {
                 "model_name": embedding_model_instance.model if embedding_model_instance else 'gpt2',
@@ -53,7 +120,7 @@ class EnhanceRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
             }
             kwargs = {**kwargs, **extra_kwargs}
 
-        return cls(length_function=_token_encoder, **kwargs)
+        return cls(length_function=_token_encoder, batch_length_function=_batch_token_encoder, **kwargs)
 
 
 class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter):
@@ -65,10 +132,14 @@ class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter)
 
     def split_text(self, text: str) -> list[str]:
         """Split incoming text and return chunks."""
+        return self._with_length_cache(self._split_fixed_text, text)
+
+    def _split_fixed_text(self, text: str) -> list[str]:
         if self._fixed_separator:
             chunks = text.split(self._fixed_separator)
         else:
             chunks = list(text)
+        self._prefetch_lengths(chunks)
 
         final_chunks = []
         for chunk in chunks:
@@ -96,6 +167,7 @@ class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter)
             splits = text.split(separator)
         else:
             splits = list(text)
+        self._prefetch_lengths(splits)
         # Now go merging things, recursively splitting longer texts.
         _good_splits = []
         for s in splits:
@@ -102,6 +102,9 @@ class TextSplitter(BaseDocumentTransformer, ABC):
             metadatas.append(doc.metadata)
         return self.create_documents(texts, metadatas=metadatas)
 
+    def _prefetch_lengths(self, texts: list[str]) -> None:
+        """Measure lengths of texts in advance, e.g. in one batched tokenizer call."""
+
     def _join_docs(self, docs: list[str], separator: str) -> Optional[str]:
         text = separator.join(docs)
         text = text.strip()
@@ -531,6 +534,7 @@ class RecursiveCharacterTextSplitter(TextSplitter):
                 break
 
         splits = _split_text_with_regex(text, separator, self._keep_separator)
+        self._prefetch_lengths(splits)
         # Now go merging things, recursively splitting longer texts.
         _good_splits = []
         _separator = "" if self._keep_separator else separator
@@ -1,12 +1,12 @@
-import threading
+import time
+from typing import Optional
 
-from flask import Flask, current_app
 from pydantic import BaseModel, Field
 
 from core.callback_handler.index_tool_callback_handler import DatasetIndexToolCallbackHandler
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
-from core.rag.datasource.retrieval_service import RetrievalService
+from core.rag.datasource.retrieval_service import RETRIEVAL_TIMEOUT, RetrievalService, RetrievalTask
 from core.rerank.rerank import RerankRunner
 from core.tools.tool.dataset_retriever.dataset_retriever_base_tool import DatasetRetrieverBaseTool
 from extensions.ext_database import db
@@ -48,20 +48,15 @@ class DatasetMultiRetrieverTool(DatasetRetrieverBaseTool):
         )
 
     def _run(self, query: str) -> str:
-        threads = []
         all_documents = []
-        for dataset_id in self.dataset_ids:
-            retrieval_thread = threading.Thread(target=self._retriever, kwargs={
-                'flask_app': current_app._get_current_object(),
-                'dataset_id': dataset_id,
-                'query': query,
-                'all_documents': all_documents,
-                'hit_callbacks': self.hit_callbacks
-            })
-            threads.append(retrieval_thread)
-            retrieval_thread.start()
-        for thread in threads:
-            thread.join()
+        # search stages of all datasets run concurrently in the retrieval executor
+        deadline = time.monotonic() + RETRIEVAL_TIMEOUT
+        retrievals = [
+            self._submit_retrieval(dataset_id, query, self.hit_callbacks, deadline)
+            for dataset_id in self.dataset_ids
+        ]
+        for documents in RetrievalService.collect_all(retrievals):
+            all_documents.extend(documents)
         # do rerank for searched documents
         model_manager = ModelManager()
         rerank_model_instance = model_manager.get_model_instance(
@@ -143,43 +138,44 @@ class DatasetMultiRetrieverTool(DatasetRetrieverBaseTool):
 
             return str("\n".join(document_context_list))
 
-    def _retriever(self, flask_app: Flask, dataset_id: str, query: str, all_documents: list,
-                   hit_callbacks: list[DatasetIndexToolCallbackHandler]):
-        with flask_app.app_context():
-            dataset = db.session.query(Dataset).filter(
-                Dataset.tenant_id == self.tenant_id,
-                Dataset.id == dataset_id
-            ).first()
-
-            if not dataset:
-                return []
-
-            for hit_callback in hit_callbacks:
-                hit_callback.on_query(query, dataset.id)
-
-            # get retrieval model , if the model is not setting , using default
-            retrieval_model = dataset.retrieval_model if dataset.retrieval_model else default_retrieval_model
-
-            if dataset.indexing_technique == "economy":
-                # use keyword table query
-                documents = RetrievalService.retrieve(retrival_method='keyword_search',
-                                                      dataset_id=dataset.id,
-                                                      query=query,
-                                                      top_k=self.top_k
-                                                      )
-                if documents:
-                    all_documents.extend(documents)
-            else:
-                if self.top_k > 0:
-                    # retrieval source
-                    documents = RetrievalService.retrieve(retrival_method=retrieval_model['search_method'],
-                                                          dataset_id=dataset.id,
-                                                          query=query,
-                                                          top_k=self.top_k,
-                                                          score_threshold=retrieval_model['score_threshold']
-                                                          if retrieval_model['score_threshold_enabled'] else None,
-                                                          reranking_model=retrieval_model['reranking_model']
-                                                          if retrieval_model['reranking_enable'] else None
-                                                          )
-
-                    all_documents.extend(documents)
\ No newline at end of file
+    def _submit_retrieval(self, dataset_id: str, query: str,
+                          hit_callbacks: list[DatasetIndexToolCallbackHandler],
+                          deadline: float) -> Optional[RetrievalTask]:
+        dataset = db.session.query(Dataset).filter(
+            Dataset.tenant_id == self.tenant_id,
+            Dataset.id == dataset_id
+        ).first()
+
+        if not dataset:
+            return None
+
+        for hit_callback in hit_callbacks:
+            hit_callback.on_query(query, dataset.id)
+
+        # get retrieval model , if the model is not setting , using default
+        retrieval_model = dataset.retrieval_model if dataset.retrieval_model else default_retrieval_model
+
+        if dataset.indexing_technique == "economy":
+            # use keyword table query
+            return RetrievalService.submit(dataset=dataset,
+                                           retrival_method='keyword_search',
+                                           query=query,
+                                           top_k=self.top_k,
+                                           deadline=deadline
+                                           )
+        elif self.top_k > 0:
+            # retrieval source
+            return RetrievalService.submit(dataset=dataset,
+                                           retrival_method=retrieval_model['search_method'],
+                                           query=query,
+                                           top_k=self.top_k,
+                                           score_threshold=retrieval_model['score_threshold']
+                                           if retrieval_model['score_threshold_enabled'] else None,
+                                           reranking_model=retrieval_model['reranking_model']
+                                           if retrieval_model['reranking_enable'] else None,
+                                           fusion_method=retrieval_model.get('fusion_method'),
+                                           fusion_weights=retrieval_model.get('fusion_weights'),
+                                           deadline=deadline
+                                           )
+
+        return None
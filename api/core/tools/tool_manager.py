@@ -6,6 +6,7 @@ from os import listdir, path
 from threading import Lock
 from typing import Any, Union
 
+import yaml
 from flask import current_app
 
 from core.agent.entities import AgentToolEntity
@@ -30,6 +31,7 @@ from core.tools.utils.configuration import (
     ToolConfigurationManager,
     ToolParameterConfigurationManager,
 )
+from core.utils.manifest_helper import get_manifest
 from core.utils.module_import_helper import load_single_subclass_from_source
 from core.workflow.nodes.tool.entities import ToolEntity
 from extensions.ext_database import db
@@ -42,19 +44,19 @@ class ToolManager:
     _builtin_provider_lock = Lock()
     _builtin_providers = {}
     _builtin_providers_loaded = False
+    _builtin_providers_manifest = None
     _builtin_tools_labels = {}
 
     @classmethod
     def get_builtin_provider(cls, provider: str) -> BuiltinToolProviderController:
         """
-            get the builtin provider
+            get the builtin provider, the provider module is imported on first use
 
             :param provider: the name of the provider
             :return: the provider
         """
-        if len(cls._builtin_providers) == 0:
-            # init the builtin providers
-            cls.load_builtin_providers_cache()
+        if provider not in cls._builtin_providers:
+            cls._load_builtin_provider(provider)
 
         if provider not in cls._builtin_providers:
             raise ToolProviderNotFoundError(f'builtin provider {provider} not found')
@@ -312,48 +314,79 @@ class ToolManager:
     @classmethod
     def list_builtin_providers(cls) -> Generator[BuiltinToolProviderController, None, None]:
         # use cache first
-        if cls._builtin_providers_loaded:
-            yield from list(cls._builtin_providers.values())
+        if not cls._builtin_providers_loaded:
+            for provider in cls._get_builtin_providers_manifest():
+                if provider not in cls._builtin_providers:
+                    cls._load_builtin_provider(provider)
+
+            # set builtin providers loaded
+            cls._builtin_providers_loaded = True
+
+        yield from list(cls._builtin_providers.values())
+
+    @classmethod
+    def _load_builtin_provider(cls, provider: str) -> None:
+        """
+            import the module of the builtin provider and init the provider
+        """
+        if provider not in cls._get_builtin_providers_manifest():
             return
-        
+
         with cls._builtin_provider_lock:
-            if cls._builtin_providers_loaded:
-                yield from list(cls._builtin_providers.values())
+            if provider in cls._builtin_providers:
                 return
-            
-            yield from cls._list_builtin_providers()
-    
+
+            # init provider
+            try:
+                provider_class = load_single_subclass_from_source(
+                    module_name=f'core.tools.provider.builtin.{provider}.{provider}',
+                    script_path=path.join(path.dirname(path.realpath(__file__)),
+                                          'provider', 'builtin', provider, f'{provider}.py'),
+                    parent_type=BuiltinToolProviderController)
+                provider_controller: BuiltinToolProviderController = provider_class()
+                cls._builtin_providers[provider_controller.identity.name] = provider_controller
+            except Exception as e:
+                logger.error(f'load builtin provider {provider} error: {e}')
+
     @classmethod
-    def _list_builtin_providers(cls) -> Generator[BuiltinToolProviderController, None, None]:
+    def _get_builtin_providers_manifest(cls) -> dict[str, dict]:
         """
-            list all the builtin providers
+            get the manifest of the builtin providers, in the form of {provider: {tool: label}}
         """
-        for provider in listdir(path.join(path.dirname(path.realpath(__file__)), 'provider', 'builtin')):
-            if provider.startswith('__'):
+        if cls._builtin_providers_manifest is None:
+            manifest = get_manifest(path.join(path.dirname(path.realpath(__file__)), 'provider', 'builtin'),
+                                    cls.build_builtin_providers_manifest)
+            cls._builtin_providers_manifest = manifest['providers']
+
+        return cls._builtin_providers_manifest
+
+    @classmethod
+    def build_builtin_providers_manifest(cls) -> dict:
+        """
+            build the manifest of the builtin providers from the provider and tool yaml files
+
+            :return: the manifest
+        """
+        builtin_path = path.join(path.dirname(path.realpath(__file__)), 'provider', 'builtin')
+        providers = {}
+        for provider in sorted(listdir(builtin_path)):
+            if provider.startswith('__') or not path.isdir(path.join(builtin_path, provider)):
                 continue
 
-            if path.isdir(path.join(path.dirname(path.realpath(__file__)), 'provider', 'builtin', provider)):
-                if provider.startswith('__'):
-                    continue
-
-                # init provider
-                try:
-                    provider_class = load_single_subclass_from_source(
-                        module_name=f'core.tools.provider.builtin.{provider}.{provider}',
-                        script_path=path.join(path.dirname(path.realpath(__file__)),
-                                            'provider', 'builtin', provider, f'{provider}.py'),
-                        parent_type=BuiltinToolProviderController)
-                    provider: BuiltinToolProviderController = provider_class()
-                    cls._builtin_providers[provider.identity.name] = provider
-                    for tool in provider.get_tools():
-                        cls._builtin_tools_labels[tool.identity.name] = tool.identity.label
-                    yield provider
-
-                except Exception as e:
-                    logger.error(f'load builtin provider {provider} error: {e}')
-                    continue
-        # set builtin providers loaded
-        cls._builtin_providers_loaded = True
+            tools = {}
+            tool_path = path.join(builtin_path, provider, 'tools')
+            if path.isdir(tool_path):
+                for tool_file in sorted(listdir(tool_path)):
+                    if not tool_file.endswith('.yaml') or tool_file.startswith('__'):
+                        continue
+
+                    with open(path.join(tool_path, tool_file), encoding='utf-8') as f:
+                        tool = yaml.safe_load(f)
+                    tools[tool['identity']['name']] = tool['identity']['label']
+
+            providers[provider] = tools
+
+        return {'providers': providers}
 
     @classmethod
     def load_builtin_providers_cache(cls):
@@ -417,10 +450,13 @@ class ToolManager:
 
             :return: the label of the tool
         """
-        cls._builtin_tools_labels
         if len(cls._builtin_tools_labels) == 0:
-            # init the builtin providers
-            cls.load_builtin_providers_cache()
+            # labels come from the manifest, no provider needs to be loaded
+            cls._builtin_tools_labels = {
+                name: I18nObject(**label)
+                for tools in cls._get_builtin_providers_manifest().values()
+                for name, label in tools.items()
+            }
 
         if tool_name not in cls._builtin_tools_labels:
             return None
@@ -586,5 +622,3 @@ class ToolManager:
                 }
         else:
             raise ValueError(f"provider type {provider_type} not found")
-
-ToolManager.load_builtin_providers_cache()
\ No newline at end of file
@@ -0,0 +1,48 @@
+import json
+import logging
+import os
+from collections.abc import Callable
+from typing import Any, AnyStr
+
+
+def get_manifest(
+        folder_path: AnyStr,
+        build_func: Callable[[], dict[str, Any]],
+        file_name: str = '_manifest.json',
+) -> dict[str, Any]:
+    """
+    Get the manifest of the extensions in a folder, from the JSON file generated at build time.
+    If the file does not exist, e.g. in development, the manifest is built from the source files.
+    :param folder_path: the folder of the extensions
+    :param build_func: the function building the manifest from the source files
+    :param file_name: the JSON file name, default to '_manifest.json'
+    :return: the manifest
+    """
+    manifest_file_name = os.path.join(folder_path, file_name)
+    if os.path.exists(manifest_file_name):
+        try:
+            with open(manifest_file_name, encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            logging.warning(f'Failed to load the manifest file {manifest_file_name}, build it from the source files.')
+
+    return build_func()
+
+
+def dump_manifest(
+        folder_path: AnyStr,
+        manifest: dict[str, Any],
+        file_name: str = '_manifest.json',
+) -> str:
+    """
+    Write the manifest of the extensions in a folder to the JSON file
+    :param folder_path: the folder of the extensions
+    :param manifest: the manifest
+    :param file_name: the JSON file name, default to '_manifest.json'
+    :return: the path of the JSON file
+    """
+    manifest_file_name = os.path.join(folder_path, file_name)
+    with open(manifest_file_name, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+    return manifest_file_name
@@ -0,0 +1,182 @@
+from collections import OrderedDict
+from threading import Lock
+from types import MappingProxyType
+from typing import Optional
+
+from core.workflow.entities.node_entities import NodeType
+from core.workflow.nodes.base_node import BaseNode
+from models.workflow import Workflow
+
+
+class WorkflowGraph:
+    """
+    Compiled, read-only view of a workflow graph.
+
+    Nodes and edges are indexed once so that the engine can resolve node configs,
+    outgoing edges, upstream edge counts and node classes with dict lookups
+    instead of scanning the graph lists.
+    """
+    start_node_id: Optional[str]
+
+    def __init__(self, graph: dict, node_classes: dict[NodeType, type[BaseNode]]):
+        if not graph:
+            raise ValueError('workflow graph not found')
+
+        if 'nodes' not in graph or 'edges' not in graph:
+            raise ValueError('nodes or edges not found in workflow graph')
+
+        if not isinstance(graph.get('nodes'), list):
+            raise ValueError('nodes in workflow graph must be a list')
+
+        if not isinstance(graph.get('edges'), list):
+            raise ValueError('edges in workflow graph must be a list')
+
+        node_configs = {}
+        node_types = {}
+        resolved_node_classes = {}
+        start_node_id = None
+        for node_config in graph['nodes']:
+            node_id = node_config.get('id')
+            if not node_id:
+                continue
+
+            node_configs[node_id] = node_config
+
+            try:
+                node_type = NodeType.value_of(node_config.get('data', {}).get('type'))
+            except ValueError:
+                continue
+
+            node_types[node_id] = node_type
+            resolved_node_classes[node_id] = node_classes.get(node_type)
+            if node_type == NodeType.START and start_node_id is None:
+                start_node_id = node_id
+
+        outgoing_edges = {}
+        incoming_edges = {}
+        for edge in graph['edges']:
+            source_node_id = edge.get('source')
+            target_node_id = edge.get('target')
+            outgoing_edges.setdefault(source_node_id, []).append(edge)
+            incoming_edges.setdefault(target_node_id, []).append(edge)
+
+        # count upstream edges of nodes reachable from start node,
+        # edges from unreachable nodes would never be resolved while running
+        reachable_node_ids = set()
+        stack = [start_node_id] if start_node_id else []
+        while stack:
+            node_id = stack.pop()
+            if node_id in reachable_node_ids or node_id not in node_configs:
+                continue
+
+            reachable_node_ids.add(node_id)
+            stack.extend(edge.get('target') for edge in outgoing_edges.get(node_id, []))
+
+        upstream_edge_counts = {
+            node_id: len([edge for edge in incoming_edges.get(node_id, [])
+                          if edge.get('source') in reachable_node_ids])
+            for node_id in reachable_node_ids
+        }
+
+        self.start_node_id = start_node_id
+        self._node_configs = MappingProxyType(node_configs)
+        self._node_types = MappingProxyType(node_types)
+        self._node_classes = MappingProxyType(resolved_node_classes)
+        self._outgoing_edges = MappingProxyType({k: tuple(v) for k, v in outgoing_edges.items()})
+        self._incoming_edges = MappingProxyType({k: tuple(v) for k, v in incoming_edges.items()})
+        self._upstream_edge_counts = MappingProxyType(upstream_edge_counts)
+
+    @property
+    def node_ids(self) -> tuple[str, ...]:
+        return tuple(self._node_configs.keys())
+
+    def get_node_config(self, node_id: str) -> Optional[dict]:
+        """
+        Get node config by node id
+        :param node_id: node id
+        :return:
+        """
+        return self._node_configs.get(node_id)
+
+    def get_node_type(self, node_id: str) -> Optional[NodeType]:
+        """
+        Get node type by node id
+        :param node_id: node id
+        :return:
+        """
+        return self._node_types.get(node_id)
+
+    def get_node_class(self, node_id: str) -> Optional[type[BaseNode]]:
+        """
+        Get resolved node class by node id
+        :param node_id: node id
+        :return:
+        """
+        return self._node_classes.get(node_id)
+
+    def get_outgoing_edges(self, source_node_id: str) -> tuple[dict, ...]:
+        """
+        Get outgoing edges of source node
+        :param source_node_id: source node id
+        :return:
+        """
+        return self._outgoing_edges.get(source_node_id, ())
+
+    def get_incoming_edges(self, target_node_id: str) -> tuple[dict, ...]:
+        """
+        Get incoming edges of target node
+        :param target_node_id: target node id
+        :return:
+        """
+        return self._incoming_edges.get(target_node_id, ())
+
+    def get_upstream_edge_count(self, node_id: str) -> int:
+        """
+        Get count of incoming edges whose source node is reachable from start node
+        :param node_id: node id
+        :return:
+        """
+        return self._upstream_edge_counts.get(node_id, 0)
+
+
+class WorkflowGraphCache:
+    """
+    Process-wide LRU cache of compiled workflow graphs, keyed by workflow id and version.
+
+    The draft version is edited in place, so every entry also keeps the raw graph text it was
+    compiled from and is recompiled when the text changes.
+    """
+    _max_size = 512
+    _lock = Lock()
+    _graphs: OrderedDict[tuple[str, str], tuple[str, WorkflowGraph]] = OrderedDict()
+
+    @classmethod
+    def get(cls, workflow: Workflow, node_classes: dict[NodeType, type[BaseNode]]) -> WorkflowGraph:
+        """
+        Get compiled graph of workflow, compile and cache it if missing or stale
+        :param workflow: Workflow instance
+        :param node_classes: node type to node class mapping
+        :return:
+        """
+        key = (workflow.id, workflow.version)
+        graph_text = workflow.graph
+        with cls._lock:
+            cached = cls._graphs.get(key)
+            if cached and cached[0] == graph_text:
+                cls._graphs.move_to_end(key)
+                return cached[1]
+
+        compiled_graph = WorkflowGraph(graph=workflow.graph_dict, node_classes=node_classes)
+
+        with cls._lock:
+            cls._graphs[key] = (graph_text, compiled_graph)
+            cls._graphs.move_to_end(key)
+            while len(cls._graphs) > cls._max_size:
+                cls._graphs.popitem(last=False)
+
+        return compiled_graph
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._graphs.clear()
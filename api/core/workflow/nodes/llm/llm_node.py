@@ -1,12 +1,15 @@
 from collections.abc import Generator
 from typing import Optional, cast
 
+from sqlalchemy import update
+
 from core.app.entities.app_invoke_entities import ModelConfigWithCredentialsEntity
 from core.app.entities.queue_entities import QueueRetrieverResourcesEvent
 from core.entities.model_entities import ModelStatus
 from core.entities.provider_entities import QuotaUnit
 from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
 from core.file.file_obj import FileVar
+from core.helper.model_provider_cache import ProviderConfigurationsCache
 from core.memory.token_buffer_memory import TokenBufferMemory
 from core.model_manager import ModelInstance, ModelManager
 from core.model_runtime.entities.llm_entities import LLMUsage
@@ -505,15 +508,23 @@ class LLMNode(BaseNode):
                 used_quota = 1
 
         if used_quota is not None:
-            db.session.query(Provider).filter(
-                Provider.tenant_id == tenant_id,
-                Provider.provider_name == model_instance.provider,
-                Provider.provider_type == ProviderType.SYSTEM.value,
-                Provider.quota_type == system_configuration.current_quota_type.value,
-                Provider.quota_limit > Provider.quota_used
-            ).update({'quota_used': Provider.quota_used + used_quota})
+            quota = db.session.execute(
+                update(Provider).where(
+                    Provider.tenant_id == tenant_id,
+                    Provider.provider_name == model_instance.provider,
+                    Provider.provider_type == ProviderType.SYSTEM.value,
+                    Provider.quota_type == system_configuration.current_quota_type.value,
+                    Provider.quota_limit > Provider.quota_used
+                ).values(quota_used=Provider.quota_used + used_quota)
+                .returning(Provider.quota_used, Provider.quota_limit)
+            ).first()
             db.session.commit()
 
+            # refresh the cached quota status of the provider configurations once the quota is exhausted,
+            # by this deduction or before it
+            if not quota or quota.quota_used >= quota.quota_limit:
+                ProviderConfigurationsCache.invalidate(tenant_id)
+
     @classmethod
     def _extract_variable_selector_to_variable_mapping(cls, node_data: BaseNodeData) -> dict[str, list[str]]:
         """
@@ -1,7 +1,12 @@
 import logging
+import os
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Optional, cast
 
+from flask import Flask, current_app, has_app_context
+
 from core.app.app_config.entities import FileExtraConfig
 from core.app.apps.base_app_queue_manager import GenerateTaskStoppedException
 from core.file.file_obj import FileTransferMethod, FileType, FileVar
@@ -9,6 +14,7 @@ from core.workflow.callbacks.base_workflow_callback import BaseWorkflowCallback
 from core.workflow.entities.node_entities import NodeRunMetadataKey, NodeRunResult, NodeType
 from core.workflow.entities.variable_pool import VariablePool, VariableValue
 from core.workflow.entities.workflow_entities import WorkflowNodeAndResult, WorkflowRunState
+from core.workflow.entities.workflow_graph import WorkflowGraph, WorkflowGraphCache
 from core.workflow.errors import WorkflowNodeRunFailedError
 from core.workflow.nodes.answer.answer_node import AnswerNode
 from core.workflow.nodes.base_node import BaseNode, UserFrom
@@ -45,6 +51,8 @@ node_classes = {
     NodeType.VARIABLE_ASSIGNER: VariableAssignerNode,
 }
 
+WORKFLOW_MAX_PARALLELISM = int(os.environ.get('WORKFLOW_MAX_PARALLELISM', '4'))
+
 logger = logging.getLogger(__name__)
 
 
@@ -94,19 +102,8 @@ class WorkflowEngineManager:
         :param callbacks: workflow callbacks
         :return:
         """
-        # fetch workflow graph
-        graph = workflow.graph_dict
-        if not graph:
-            raise ValueError('workflow graph not found')
-
-        if 'nodes' not in graph or 'edges' not in graph:
-            raise ValueError('nodes or edges not found in workflow graph')
-
-        if not isinstance(graph.get('nodes'), list):
-            raise ValueError('nodes in workflow graph must be a list')
-
-        if not isinstance(graph.get('edges'), list):
-            raise ValueError('edges in workflow graph must be a list')
+        # fetch compiled workflow graph
+        workflow_graph = self._get_workflow_graph(workflow)
 
         # init workflow run
         if callbacks:
@@ -125,56 +122,19 @@ class WorkflowEngineManager:
             user_from=user_from
         )
 
-        try:
-            predecessor_node = None
-            has_entry_node = False
-            while True:
-                # get next node, multiple target nodes in the future
-                next_node = self._get_next_node(
-                    workflow_run_state=workflow_run_state,
-                    graph=graph,
-                    predecessor_node=predecessor_node,
-                    callbacks=callbacks
-                )
-
-                if not next_node:
-                    break
-
-                # check is already ran
-                if next_node.node_id in [node_and_result.node.node_id
-                                         for node_and_result in workflow_run_state.workflow_nodes_and_results]:
-                    predecessor_node = next_node
-                    continue
-
-                has_entry_node = True
-
-                # max steps 30 reached
-                if len(workflow_run_state.workflow_nodes_and_results) > 30:
-                    raise ValueError('Max steps 30 reached.')
-
-                # or max execution time 10min reached
-                if self._is_timed_out(start_at=workflow_run_state.start_at, max_execution_time=600):
-                    raise ValueError('Max execution time 10min reached.')
-
-                # run workflow, run multiple target nodes in the future
-                self._run_workflow_node(
-                    workflow_run_state=workflow_run_state,
-                    node=next_node,
-                    predecessor_node=predecessor_node,
-                    callbacks=callbacks
-                )
-
-                if next_node.node_type in [NodeType.END]:
-                    break
-
-                predecessor_node = next_node
+        if not workflow_graph.start_node_id:
+            self._workflow_run_failed(
+                error='Start node not found in workflow graph.',
+                callbacks=callbacks
+            )
+            return
 
-            if not has_entry_node:
-                self._workflow_run_failed(
-                    error='Start node not found in workflow graph.',
-                    callbacks=callbacks
-                )
-                return
+        try:
+            self._run_workflow_graph(
+                workflow_run_state=workflow_run_state,
+                workflow_graph=workflow_graph,
+                callbacks=callbacks
+            )
         except GenerateTaskStoppedException as e:
             return
         except Exception as e:
@@ -211,18 +171,14 @@ class WorkflowEngineManager:
             raise ValueError('nodes not found in workflow graph')
 
         # fetch node config from node id
-        node_config = None
-        for node in nodes:
-            if node.get('id') == node_id:
-                node_config = node
-                break
-
+        workflow_graph = self._get_workflow_graph(workflow)
+        node_config = workflow_graph.get_node_config(node_id)
         if not node_config:
             raise ValueError('node id not found in workflow graph')
 
         # Get node class
         node_type = NodeType.value_of(node_config.get('data', {}).get('type'))
-        node_cls = node_classes.get(node_type)
+        node_cls = workflow_graph.get_node_class(node_id)
 
         # init workflow run state
         node_instance = node_cls(
@@ -332,82 +288,167 @@ class WorkflowEngineManager:
                     error=error
                 )
 
-    def _get_next_node(self, workflow_run_state: WorkflowRunState,
-                       graph: dict,
-                       predecessor_node: Optional[BaseNode] = None,
-                       callbacks: list[BaseWorkflowCallback] = None) -> Optional[BaseNode]:
+    def _get_workflow_graph(self, workflow: Workflow) -> WorkflowGraph:
+        """
+        Get compiled workflow graph
+        :param workflow: Workflow instance
+        :return:
+        """
+        return WorkflowGraphCache.get(
+            workflow=workflow,
+            node_classes=node_classes
+        )
+
+    def _run_workflow_graph(self, workflow_run_state: WorkflowRunState,
+                            workflow_graph: WorkflowGraph,
+                            callbacks: list[BaseWorkflowCallback] = None) -> None:
         """
-        Get next node
-        multiple target nodes in the future.
-        :param graph: workflow graph
-        :param predecessor_node: predecessor node
+        Run workflow graph as a DAG, nodes whose upstream edges are all resolved
+        are submitted to a bounded thread pool and run concurrently.
+        :param workflow_run_state: workflow run state
+        :param workflow_graph: compiled workflow graph
         :param callbacks: workflow callbacks
         :return:
         """
-        nodes = graph.get('nodes')
-        if not nodes:
-            return None
+        flask_app = current_app._get_current_object() if has_app_context() else None
+
+        # unresolved upstream edges and whether any upstream edge was taken, per node
+        pending_edge_counts = {}
+        activated_node_ids = set()
+        predecessor_node_ids = {}
+
+        ready_node_ids = deque([workflow_graph.start_node_id])
+        running_futures = {}
+        error = None
+        finished = False
+
+        def resolve_edge(edge: dict, taken: bool, source_node_id: str) -> None:
+            target_node_id = edge.get('target')
+            if not workflow_graph.get_node_config(target_node_id):
+                return
 
-        if not predecessor_node:
-            for node_config in nodes:
-                if node_config.get('data', {}).get('type', '') == NodeType.START.value:
-                    return StartNode(
-                        tenant_id=workflow_run_state.tenant_id,
-                        app_id=workflow_run_state.app_id,
-                        workflow_id=workflow_run_state.workflow_id,
-                        user_id=workflow_run_state.user_id,
-                        user_from=workflow_run_state.user_from,
-                        config=node_config,
+            if target_node_id not in pending_edge_counts:
+                pending_edge_counts[target_node_id] = workflow_graph.get_upstream_edge_count(target_node_id)
+
+            pending_edge_counts[target_node_id] -= 1
+            if taken and target_node_id not in activated_node_ids:
+                activated_node_ids.add(target_node_id)
+                predecessor_node_ids[target_node_id] = source_node_id
+
+            if pending_edge_counts[target_node_id] > 0:
+                return
+
+            if target_node_id in activated_node_ids:
+                # all branches joined at this node
+                ready_node_ids.append(target_node_id)
+            else:
+                # none of upstream branches was taken, skip this node and its downstream edges
+                for outgoing_edge in workflow_graph.get_outgoing_edges(target_node_id):
+                    resolve_edge(outgoing_edge, False, target_node_id)
+
+        with ThreadPoolExecutor(max_workers=WORKFLOW_MAX_PARALLELISM,
+                                thread_name_prefix='workflow_node') as executor:
+            while ready_node_ids or running_futures:
+                while ready_node_ids and not finished and not error:
+                    node_id = ready_node_ids.popleft()
+
+                    # max steps 30 reached
+                    if len(workflow_run_state.workflow_nodes_and_results) > 30:
+                        error = ValueError('Max steps 30 reached.')
+                        break
+
+                    # or max execution time 10min reached
+                    if self._is_timed_out(start_at=workflow_run_state.start_at, max_execution_time=600):
+                        error = ValueError('Max execution time 10min reached.')
+                        break
+
+                    node = self._get_node_instance(
+                        workflow_run_state=workflow_run_state,
+                        workflow_graph=workflow_graph,
+                        node_id=node_id,
                         callbacks=callbacks
                     )
-        else:
-            edges = graph.get('edges')
-            source_node_id = predecessor_node.node_id
-
-            # fetch all outgoing edges from source node
-            outgoing_edges = [edge for edge in edges if edge.get('source') == source_node_id]
-            if not outgoing_edges:
-                return None
-
-            # fetch target node id from outgoing edges
-            outgoing_edge = None
-            source_handle = predecessor_node.node_run_result.edge_source_handle \
-                if predecessor_node.node_run_result else None
-            if source_handle:
-                for edge in outgoing_edges:
-                    if edge.get('sourceHandle') and edge.get('sourceHandle') == source_handle:
-                        outgoing_edge = edge
-                        break
-            else:
-                outgoing_edge = outgoing_edges[0]
 
-            if not outgoing_edge:
-                return None
+                    workflow_nodes_and_result = WorkflowNodeAndResult(
+                        node=node,
+                        result=None
+                    )
+
+                    # add to workflow_nodes_and_results, run index is allocated in scheduling order
+                    workflow_run_state.workflow_nodes_and_results.append(workflow_nodes_and_result)
 
-            target_node_id = outgoing_edge.get('target')
+                    future = executor.submit(
+                        self._run_workflow_node_in_context,
+                        flask_app=flask_app,
+                        workflow_run_state=workflow_run_state,
+                        workflow_nodes_and_result=workflow_nodes_and_result,
+                        node_run_index=len(workflow_run_state.workflow_nodes_and_results),
+                        predecessor_node_id=predecessor_node_ids.get(node_id),
+                        callbacks=callbacks
+                    )
+                    running_futures[future] = node
 
-            # fetch target node from target node id
-            target_node_config = None
-            for node in nodes:
-                if node.get('id') == target_node_id:
-                    target_node_config = node
+                if not running_futures:
                     break
 
-            if not target_node_config:
-                return None
+                done_futures, _ = wait(running_futures, return_when=FIRST_COMPLETED)
+                for future in done_futures:
+                    node = running_futures.pop(future)
+                    try:
+                        node_run_result = future.result()
+                    except Exception as e:
+                        # keep the first error, in-flight nodes are waited for before raising
+                        if not error:
+                            error = e
+                        continue
+
+                    self._handle_node_run_result(
+                        workflow_run_state=workflow_run_state,
+                        node=node,
+                        node_run_result=node_run_result
+                    )
 
-            # get next node
-            target_node = node_classes.get(NodeType.value_of(target_node_config.get('data', {}).get('type')))
+                    if node.node_type == NodeType.END:
+                        finished = True
 
-            return target_node(
-                tenant_id=workflow_run_state.tenant_id,
-                app_id=workflow_run_state.app_id,
-                workflow_id=workflow_run_state.workflow_id,
-                user_id=workflow_run_state.user_id,
-                user_from=workflow_run_state.user_from,
-                config=target_node_config,
-                callbacks=callbacks
-            )
+                    if finished or error:
+                        continue
+
+                    # take edges matching the selected source handle, skip the others
+                    source_handle = node_run_result.edge_source_handle
+                    for edge in workflow_graph.get_outgoing_edges(node.node_id):
+                        taken = not source_handle or edge.get('sourceHandle') == source_handle
+                        resolve_edge(edge, taken, node.node_id)
+
+        if error:
+            raise error
+
+    def _get_node_instance(self, workflow_run_state: WorkflowRunState,
+                           workflow_graph: WorkflowGraph,
+                           node_id: str,
+                           callbacks: list[BaseWorkflowCallback] = None) -> BaseNode:
+        """
+        Get node instance
+        :param workflow_run_state: workflow run state
+        :param workflow_graph: compiled workflow graph
+        :param node_id: node id
+        :param callbacks: workflow callbacks
+        :return:
+        """
+        node_config = workflow_graph.get_node_config(node_id)
+        node_cls = workflow_graph.get_node_class(node_id)
+        if not node_cls:
+            raise ValueError(f'invalid node type value {node_config.get("data", {}).get("type")}')
+
+        return node_cls(
+            tenant_id=workflow_run_state.tenant_id,
+            app_id=workflow_run_state.app_id,
+            workflow_id=workflow_run_state.workflow_id,
+            user_id=workflow_run_state.user_id,
+            user_from=workflow_run_state.user_from,
+            config=node_config,
+            callbacks=callbacks
+        )
 
     def _is_timed_out(self, start_at: float, max_execution_time: int) -> bool:
         """
@@ -418,30 +459,37 @@ class WorkflowEngineManager:
         """
         return time.perf_counter() - start_at > max_execution_time
 
+    def _run_workflow_node_in_context(self, flask_app: Optional[Flask],
+                                      **kwargs) -> NodeRunResult:
+        """
+        Run workflow node in a worker thread with flask app context
+        :param flask_app: Flask app, None if not running in app context
+        :return:
+        """
+        if not flask_app:
+            return self._run_workflow_node(**kwargs)
+
+        with flask_app.app_context():
+            return self._run_workflow_node(**kwargs)
+
     def _run_workflow_node(self, workflow_run_state: WorkflowRunState,
-                           node: BaseNode,
-                           predecessor_node: Optional[BaseNode] = None,
-                           callbacks: list[BaseWorkflowCallback] = None) -> None:
+                           workflow_nodes_and_result: WorkflowNodeAndResult,
+                           node_run_index: int = 1,
+                           predecessor_node_id: Optional[str] = None,
+                           callbacks: list[BaseWorkflowCallback] = None) -> NodeRunResult:
+        node = workflow_nodes_and_result.node
         if callbacks:
             for callback in callbacks:
                 callback.on_workflow_node_execute_started(
                     node_id=node.node_id,
                     node_type=node.node_type,
                     node_data=node.node_data,
-                    node_run_index=len(workflow_run_state.workflow_nodes_and_results) + 1,
-                    predecessor_node_id=predecessor_node.node_id if predecessor_node else None
+                    node_run_index=node_run_index,
+                    predecessor_node_id=predecessor_node_id
                 )
 
         db.session.close()
 
-        workflow_nodes_and_result = WorkflowNodeAndResult(
-            node=node,
-            result=None
-        )
-
-        # add to workflow_nodes_and_results
-        workflow_run_state.workflow_nodes_and_results.append(workflow_nodes_and_result)
-
         try:
             # run node, result must have inputs, process_data, outputs, execution_metadata
             node_run_result = node.run(
@@ -490,6 +538,20 @@ class WorkflowEngineManager:
                     execution_metadata=node_run_result.metadata
                 )
 
+        db.session.close()
+
+        return node_run_result
+
+    def _handle_node_run_result(self, workflow_run_state: WorkflowRunState,
+                                node: BaseNode,
+                                node_run_result: NodeRunResult) -> None:
+        """
+        Handle succeeded node run result, called in scheduler thread only
+        :param workflow_run_state: workflow run state
+        :param node: node
+        :param node_run_result: node run result
+        :return:
+        """
         if node_run_result.outputs:
             for variable_key, variable_value in node_run_result.outputs.items():
                 # append variables to variable pool recursively
@@ -503,8 +565,6 @@ class WorkflowEngineManager:
         if node_run_result.metadata and node_run_result.metadata.get(NodeRunMetadataKey.TOTAL_TOKENS):
             workflow_run_state.total_tokens += int(node_run_result.metadata.get(NodeRunMetadataKey.TOTAL_TOKENS))
 
-        db.session.close()
-
     def _append_variables_recursively(self, variable_pool: VariablePool,
                                       node_id: str,
                                       variable_key_list: list[str],
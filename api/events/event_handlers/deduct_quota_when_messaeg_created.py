@@ -1,5 +1,8 @@
+from sqlalchemy import update
+
 from core.app.entities.app_invoke_entities import AgentChatAppGenerateEntity, ChatAppGenerateEntity
 from core.entities.provider_entities import QuotaUnit
+from core.helper.model_provider_cache import ProviderConfigurationsCache
 from events.message_event import message_was_created
 from extensions.ext_database import db
 from models.provider import Provider, ProviderType
@@ -45,11 +48,19 @@ def handle(sender, **kwargs):
             used_quota = 1
 
     if used_quota is not None:
-        db.session.query(Provider).filter(
-            Provider.tenant_id == application_generate_entity.app_config.tenant_id,
-            Provider.provider_name == model_config.provider,
-            Provider.provider_type == ProviderType.SYSTEM.value,
-            Provider.quota_type == system_configuration.current_quota_type.value,
-            Provider.quota_limit > Provider.quota_used
-        ).update({'quota_used': Provider.quota_used + used_quota})
+        quota = db.session.execute(
+            update(Provider).where(
+                Provider.tenant_id == application_generate_entity.app_config.tenant_id,
+                Provider.provider_name == model_config.provider,
+                Provider.provider_type == ProviderType.SYSTEM.value,
+                Provider.quota_type == system_configuration.current_quota_type.value,
+                Provider.quota_limit > Provider.quota_used
+            ).values(quota_used=Provider.quota_used + used_quota)
+            .returning(Provider.quota_used, Provider.quota_limit)
+        ).first()
         db.session.commit()
+
+        # refresh the cached quota status of the provider configurations once the quota is exhausted,
+        # by this deduction or before it
+        if not quota or quota.quota_used >= quota.quota_limit:
+            ProviderConfigurationsCache.invalidate(application_generate_entity.app_config.tenant_id)
@@ -42,6 +42,7 @@ def init_app(app: Flask) -> Celery:
     imports = [
         "schedule.clean_embedding_cache_task",
         "schedule.clean_unused_datasets_task",
+        "schedule.update_api_token_last_used_at_task",
     ]
 
     beat_schedule = {
@@ -52,6 +53,10 @@ def init_app(app: Flask) -> Celery:
         'clean_unused_datasets_task': {
             'task': 'schedule.clean_unused_datasets_task.clean_unused_datasets_task',
             'schedule': timedelta(days=1),
+        },
+        'update_api_token_last_used_at_task': {
+            'task': 'schedule.update_api_token_last_used_at_task.update_api_token_last_used_at_task',
+            'schedule': timedelta(minutes=1),
         }
     }
     celery_app.conf.update(
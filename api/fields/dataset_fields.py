@@ -18,10 +18,17 @@ reranking_model_fields = {
     'reranking_model_name': fields.String
 }
 
+fusion_weights_fields = {
+    'semantic_search': fields.Float,
+    'full_text_search': fields.Float
+}
+
 dataset_retrieval_model_fields = {
     'search_method': fields.String,
     'reranking_enable': fields.Boolean,
     'reranking_model': fields.Nested(reranking_model_fields),
+    'fusion_method': fields.String,
+    'fusion_weights': fields.Nested(fusion_weights_fields, allow_null=True),
     'top_k': fields.Integer,
     'score_threshold_enabled': fields.Boolean,
     'score_threshold': fields.Float
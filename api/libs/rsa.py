@@ -1,5 +1,8 @@
 import hashlib
+import os
+from threading import Lock
 
+from cachetools import TTLCache
 from Crypto.Cipher import AES
 from Crypto.PublicKey import RSA
 from Crypto.Random import get_random_bytes
@@ -8,6 +11,14 @@ import libs.gmpy2_pkcs10aep_cipher as gmpy2_pkcs10aep_cipher
 from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
 
+# seconds a parsed private key of tenant is cached in process, and max number of tenants cached
+TENANT_PRIVATE_KEY_CACHE_TTL = int(os.environ.get('TENANT_PRIVATE_KEY_CACHE_TTL', 60))
+TENANT_PRIVATE_KEY_CACHE_MAX_SIZE = int(os.environ.get('TENANT_PRIVATE_KEY_CACHE_MAX_SIZE', 1000))
+
+# tenant id to private key pem, rsa key and cipher
+_decoding_cache = TTLCache(maxsize=TENANT_PRIVATE_KEY_CACHE_MAX_SIZE, ttl=TENANT_PRIVATE_KEY_CACHE_TTL)
+_decoding_cache_lock = Lock()
+
 
 def generate_key_pair(tenant_id):
     private_key = RSA.generate(2048)
@@ -20,6 +31,8 @@ def generate_key_pair(tenant_id):
 
     storage.save(filepath, pem_private)
 
+    invalidate_decrypt_decoding(tenant_id)
+
     return pem_public.decode()
 
 
@@ -46,9 +59,37 @@ def encrypt(text, public_key):
 
 
 def get_decrypt_decoding(tenant_id):
+    with _decoding_cache_lock:
+        decoding = _decoding_cache.get(tenant_id)
+
+    if decoding:
+        _, rsa_key, cipher_rsa = decoding
+        return rsa_key, cipher_rsa
+
+    return _cache_decoding(tenant_id, _load_private_key(tenant_id))
+
+
+def invalidate_decrypt_decoding(tenant_id):
+    with _decoding_cache_lock:
+        _decoding_cache.pop(tenant_id, None)
+
+    redis_client.delete(_get_private_key_cache_key(tenant_id))
+
+
+def _cache_decoding(tenant_id, private_key):
+    rsa_key = RSA.import_key(private_key)
+    cipher_rsa = gmpy2_pkcs10aep_cipher.new(rsa_key)
+
+    with _decoding_cache_lock:
+        _decoding_cache[tenant_id] = (private_key, rsa_key, cipher_rsa)
+
+    return rsa_key, cipher_rsa
+
+
+def _load_private_key(tenant_id):
     filepath = "privkeys/{tenant_id}".format(tenant_id=tenant_id) + "/private.pem"
 
-    cache_key = 'tenant_privkey:{hash}'.format(hash=hashlib.sha3_256(filepath.encode()).hexdigest())
+    cache_key = _get_private_key_cache_key(tenant_id)
     private_key = redis_client.get(cache_key)
     if not private_key:
         try:
@@ -58,10 +99,13 @@ def get_decrypt_decoding(tenant_id):
 
         redis_client.setex(cache_key, 120, private_key)
 
-    rsa_key = RSA.import_key(private_key)
-    cipher_rsa = gmpy2_pkcs10aep_cipher.new(rsa_key)
+    return private_key
 
-    return rsa_key, cipher_rsa
+
+def _get_private_key_cache_key(tenant_id):
+    filepath = "privkeys/{tenant_id}".format(tenant_id=tenant_id) + "/private.pem"
+
+    return 'tenant_privkey:{hash}'.format(hash=hashlib.sha3_256(filepath.encode()).hexdigest())
 
 
 def decrypt_token_with_decoding(encrypted_text, rsa_key, cipher_rsa):
@@ -86,7 +130,22 @@ def decrypt_token_with_decoding(encrypted_text, rsa_key, cipher_rsa):
 def decrypt(encrypted_text, tenant_id):
     rsa_key, cipher_rsa = get_decrypt_decoding(tenant_id)
 
-    return decrypt_token_with_decoding(encrypted_text, rsa_key, cipher_rsa)
+    try:
+        return decrypt_token_with_decoding(encrypted_text, rsa_key, cipher_rsa)
+    except ValueError:
+        # the key pair may be reset by another process since the private key was cached, retry with the new key
+        with _decoding_cache_lock:
+            decoding = _decoding_cache.get(tenant_id)
+        if not decoding:
+            raise
+
+        private_key = _load_private_key(tenant_id)
+        if private_key == decoding[0]:
+            raise
+
+        rsa_key, cipher_rsa = _cache_decoding(tenant_id, private_key)
+
+        return decrypt_token_with_decoding(encrypted_text, rsa_key, cipher_rsa)
 
 
 class PrivkeyNotFoundError(Exception):
@@ -6,6 +6,7 @@ from json import JSONDecodeError
 from sqlalchemy import func
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 
+from core.embedding.embedding_codec import decode_embedding, encode_embedding, is_encoded_embedding
 from extensions.ext_database import db
 from extensions.ext_storage import storage
 from models.account import Account
@@ -480,6 +481,22 @@ class DatasetKeywordTable(db.Model):
                 return None
 
 
+class DatasetKeywordPosting(db.Model):
+    __tablename__ = 'dataset_keyword_postings'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', name='dataset_keyword_posting_pkey'),
+        db.UniqueConstraint('dataset_id', 'keyword', 'index_node_id', name='dataset_keyword_posting_unique'),
+        db.Index('dataset_keyword_posting_node_idx', 'dataset_id', 'index_node_id'),
+    )
+
+    id = db.Column(UUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
+    dataset_id = db.Column(UUID, nullable=False)
+    keyword = db.Column(db.String(255), nullable=False)
+    index_node_id = db.Column(db.String(255), nullable=False)
+    segment_length = db.Column(db.Integer, nullable=False, server_default=db.text('0'))
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
+
+
 class Embedding(db.Model):
     __tablename__ = 'embeddings'
     __table_args__ = (
@@ -497,11 +514,19 @@ class Embedding(db.Model):
                               server_default=db.text("''::character varying"))
 
     def set_embedding(self, embedding_data: list[float]):
-        self.embedding = pickle.dumps(embedding_data, protocol=pickle.HIGHEST_PROTOCOL)
+        self.embedding = encode_embedding(embedding_data)
 
     def get_embedding(self) -> list[float]:
+        if is_encoded_embedding(self.embedding):
+            return decode_embedding(self.embedding).tolist()
+
+        # rows written before the binary codec are pickled lists
         return pickle.loads(self.embedding)
 
+    @property
+    def is_legacy_format(self) -> bool:
+        return not is_encoded_embedding(self.embedding)
+
 
 class DatasetCollectionBinding(db.Model):
     __tablename__ = 'dataset_collection_bindings'
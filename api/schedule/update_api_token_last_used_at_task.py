@@ -0,0 +1,31 @@
+import time
+
+import click
+from sqlalchemy import bindparam, update
+
+import app
+from core.helper.api_token_cache import ApiTokenLastUsedAtBuffer
+from extensions.ext_database import db
+from models.model import ApiToken
+
+
+@app.celery.task(queue='dataset')
+def update_api_token_last_used_at_task():
+    click.echo(click.style('Start update api token last used at.', fg='green'))
+    start_at = time.perf_counter()
+    last_used_at = ApiTokenLastUsedAtBuffer.begin_flush()
+    if last_used_at:
+        # one executemany, rows of deleted api tokens are skipped
+        api_tokens = ApiToken.__table__
+        db.session.execute(
+            update(api_tokens).where(api_tokens.c.id == bindparam('api_token_id'))
+            .values(last_used_at=bindparam('api_token_last_used_at')),
+            [{'api_token_id': api_token_id, 'api_token_last_used_at': used_at}
+             for api_token_id, used_at in last_used_at.items()]
+        )
+        db.session.commit()
+
+    ApiTokenLastUsedAtBuffer.complete_flush()
+    end_at = time.perf_counter()
+    click.echo(click.style('Updated last used at of {} api tokens latency: {}'.format(len(last_used_at),
+                                                                                      end_at - start_at), fg='green'))
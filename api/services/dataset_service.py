@@ -14,6 +14,7 @@ from core.errors.error import LLMBadRequestError, ProviderTokenNotInitError
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
+from core.rag.data_post_processor.fusion import FusionMethod
 from core.rag.datasource.keyword.keyword_factory import Keyword
 from core.rag.models.document import Document as RAGDocument
 from events.dataset_event import dataset_was_deleted
@@ -187,6 +188,9 @@ class DatasetService:
         filtered_data['updated_at'] = datetime.datetime.now()
 
         # update Retrieval model
+        if data['retrieval_model'] and data['retrieval_model'].get('fusion_method'):
+            # raise ValueError on unknown fusion method
+            FusionMethod.value_of(data['retrieval_model']['fusion_method'])
         filtered_data['retrieval_model'] = data['retrieval_model']
 
         dataset.query.filter_by(id=dataset_id).update(filtered_data)
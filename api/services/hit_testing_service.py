@@ -62,7 +62,9 @@ class HitTestingService:
                                                   score_threshold=retrieval_model['score_threshold']
                                                   if retrieval_model['score_threshold_enabled'] else None,
                                                   reranking_model=retrieval_model['reranking_model']
-                                                  if retrieval_model['reranking_enable'] else None
+                                                  if retrieval_model['reranking_enable'] else None,
+                                                  fusion_method=retrieval_model.get('fusion_method'),
+                                                  fusion_weights=retrieval_model.get('fusion_weights')
                                                   )
 
         end = time.perf_counter()
@@ -7,6 +7,7 @@ import requests
 from flask import current_app
 
 from core.entities.model_entities import ModelStatus
+from core.helper.model_provider_cache import ProviderConfigurationsCache
 from core.model_runtime.entities.model_entities import ModelType, ParameterRule
 from core.model_runtime.model_providers import model_provider_factory
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
@@ -506,6 +507,8 @@ class ModelProviderService:
             )
 
         rst = response.json()
+        # the quota may be granted to the provider records of the workspace
+        ProviderConfigurationsCache.invalidate(tenant_id)
 
         if rst['type'] == 'redirect':
             return {
@@ -544,6 +547,7 @@ class ModelProviderService:
 
         data = rst['data']
         if data['qualified'] is True:
+            ProviderConfigurationsCache.invalidate(tenant_id)
             return {
                 'result': 'success',
                 'provider_name': provider,
@@ -10,7 +10,7 @@ class VectorService:
 
     @classmethod
     def create_segments_vector(cls, keywords_list: Optional[list[list[str]]],
-                               segments: list[DocumentSegment], dataset: Dataset):
+                               segments: list[DocumentSegment], dataset: Dataset, duplicate_check: bool = True):
         documents = []
         for segment in segments:
             document = Document(
@@ -28,7 +28,7 @@ class VectorService:
             vector = Vector(
                 dataset=dataset
             )
-            vector.add_texts(documents, duplicate_check=True)
+            vector.add_texts(documents, duplicate_check=duplicate_check)
 
         # save keyword index
         keyword = Keyword(dataset)
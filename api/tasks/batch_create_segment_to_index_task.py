@@ -1,21 +1,26 @@
 import datetime
 import logging
+import os
 import time
 import uuid
-from typing import cast
+from typing import Optional, cast
 
 import click
 from celery import shared_task
 from sqlalchemy import func
 
-from core.indexing_runner import IndexingRunner
-from core.model_manager import ModelManager
+from core.model_manager import ModelInstance, ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
+from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
 from libs import helper
 from models.dataset import Dataset, Document, DocumentSegment
+from services.vector_service import VectorService
+
+# number of segments inserted and indexed together when batch importing segments
+SEGMENT_BATCH_IMPORT_BATCH_SIZE = int(os.environ.get('SEGMENT_BATCH_IMPORT_BATCH_SIZE', 1000))
 
 
 @shared_task(queue='dataset')
@@ -37,6 +42,9 @@ def batch_create_segment_to_index_task(job_id: str, content: list, dataset_id: s
 
     indexing_cache_key = 'segment_batch_import_{}'.format(job_id)
 
+    # batches are committed one by one, the ones created before a failure are deleted so a job is all or nothing
+    created_segment_ids = []
+    indexed_node_ids = []
     try:
         dataset = db.session.query(Dataset).filter(Dataset.id == dataset_id).first()
         if not dataset:
@@ -48,7 +56,6 @@ def batch_create_segment_to_index_task(job_id: str, content: list, dataset_id: s
 
         if not dataset_document.enabled or dataset_document.archived or dataset_document.indexing_status != 'completed':
             raise ValueError('Document is not available.')
-        document_segments = []
         embedding_model = None
         if dataset.indexing_technique == 'high_quality':
             model_manager = ModelManager()
@@ -59,47 +66,97 @@ def batch_create_segment_to_index_task(job_id: str, content: list, dataset_id: s
                 model=dataset.embedding_model
             )
 
-        model_type_instance = embedding_model.model_type_instance
-        model_type_instance = cast(TextEmbeddingModel, model_type_instance)
-        for segment in content:
-            content = segment['content']
-            doc_id = str(uuid.uuid4())
-            segment_hash = helper.generate_text_hash(content)
-            # calc embedding use tokens
-            tokens = model_type_instance.get_num_tokens(
-                model=embedding_model.model,
-                credentials=embedding_model.credentials,
-                texts=[content]
-            ) if embedding_model else 0
-            max_position = db.session.query(func.max(DocumentSegment.position)).filter(
-                DocumentSegment.document_id == dataset_document.id
-            ).scalar()
-            segment_document = DocumentSegment(
-                tenant_id=tenant_id,
-                dataset_id=dataset_id,
-                document_id=document_id,
-                index_node_id=doc_id,
-                index_node_hash=segment_hash,
-                position=max_position + 1 if max_position else 1,
-                content=content,
-                word_count=len(content),
-                tokens=tokens,
-                created_by=user_id,
-                indexing_at=datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None),
-                status='completed',
-                completed_at=datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        # allocate positions of all segments at once
+        max_position = db.session.query(func.max(DocumentSegment.position)).filter(
+            DocumentSegment.document_id == dataset_document.id
+        ).scalar() or 0
+
+        for i in range(0, len(content), SEGMENT_BATCH_IMPORT_BATCH_SIZE):
+            batch = content[i:i + SEGMENT_BATCH_IMPORT_BATCH_SIZE]
+            tokens_list = _count_tokens(embedding_model, [segment['content'] for segment in batch])
+            now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+            segment_mappings = []
+            for position, (segment, tokens) in enumerate(zip(batch, tokens_list), start=max_position + i + 1):
+                segment_mappings.append({
+                    'id': str(uuid.uuid4()),
+                    'tenant_id': tenant_id,
+                    'dataset_id': dataset_id,
+                    'document_id': document_id,
+                    'index_node_id': str(uuid.uuid4()),
+                    'index_node_hash': helper.generate_text_hash(segment['content']),
+                    'position': position,
+                    'content': segment['content'],
+                    'answer': segment['answer'] if dataset_document.doc_form == 'qa_model' else None,
+                    'word_count': len(segment['content']),
+                    'tokens': tokens,
+                    'created_by': user_id,
+                    'indexing_at': now,
+                    'status': 'completed',
+                    'completed_at': now
+                })
+
+            db.session.bulk_insert_mappings(DocumentSegment, segment_mappings)
+            indexed_node_ids.extend(segment_mapping['index_node_id'] for segment_mapping in segment_mappings)
+            # add index of the batch, segment ids are new so the vector store is not checked for duplicates
+            VectorService.create_segments_vector(
+                None,
+                [DocumentSegment(**segment_mapping) for segment_mapping in segment_mappings],
+                dataset,
+                duplicate_check=False
             )
-            if dataset_document.doc_form == 'qa_model':
-                segment_document.answer = segment['answer']
-            db.session.add(segment_document)
-            document_segments.append(segment_document)
-        # add index to db
-        indexing_runner = IndexingRunner()
-        indexing_runner.batch_add_segments(document_segments, dataset)
-        db.session.commit()
+            db.session.commit()
+            created_segment_ids.extend(segment_mapping['id'] for segment_mapping in segment_mappings)
+            redis_client.setex(indexing_cache_key, 600, 'processing:{}/{}'.format(i + len(batch), len(content)))
+
         redis_client.setex(indexing_cache_key, 600, 'completed')
         end_at = time.perf_counter()
         logging.info(click.style('Segment batch created job: {} latency: {}'.format(job_id, end_at - start_at), fg='green'))
     except Exception as e:
         logging.exception("Segments batch created index failed:{}".format(str(e)))
+        db.session.rollback()
+        if indexed_node_ids:
+            _delete_created_segments(dataset, dataset_document, created_segment_ids, indexed_node_ids)
         redis_client.setex(indexing_cache_key, 600, 'error')
+
+
+def _delete_created_segments(dataset: Dataset, dataset_document: Document, segment_ids: list[str],
+                             index_node_ids: list[str]) -> None:
+    """
+    Delete the segments created by a failed batch import and their index
+    :param dataset: dataset
+    :param dataset_document: document
+    :param segment_ids: ids of the committed segments
+    :param index_node_ids: index node ids of the segments which may be indexed, including the failed batch
+    :return:
+    """
+    try:
+        index_processor = IndexProcessorFactory(dataset_document.doc_form).init_index_processor()
+        index_processor.clean(dataset, index_node_ids)
+
+        for i in range(0, len(segment_ids), SEGMENT_BATCH_IMPORT_BATCH_SIZE):
+            db.session.query(DocumentSegment).filter(
+                DocumentSegment.id.in_(segment_ids[i:i + SEGMENT_BATCH_IMPORT_BATCH_SIZE])
+            ).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        logging.exception('Failed to delete segments of failed batch import, {} segments are left.'.format(
+            len(segment_ids)))
+        db.session.rollback()
+
+
+def _count_tokens(embedding_model: Optional[ModelInstance], texts: list[str]) -> list[int]:
+    """
+    Count embedding tokens of each text
+    :param embedding_model: embedding model instance, None if the dataset is not indexed by embeddings
+    :param texts: texts
+    :return: tokens of each text
+    """
+    if not embedding_model:
+        return [0] * len(texts)
+
+    model_type_instance = cast(TextEmbeddingModel, embedding_model.model_type_instance)
+    return model_type_instance.get_num_tokens_batch(
+        model=embedding_model.model,
+        credentials=embedding_model.credentials,
+        texts=texts
+    )
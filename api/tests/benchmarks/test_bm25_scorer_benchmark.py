@@ -0,0 +1,82 @@
+import itertools
+import random
+import statistics
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.rag.datasource.keyword.bm25_scorer import BM25Scorer
+from core.rag.datasource.keyword.jieba.jieba import Jieba
+
+ROUNDS = 20
+TOP_K = 10
+
+
+def _build_corpus(segment_count: int, relevant_count: int, rare_keywords: list[str]) \
+        -> tuple[dict[str, set[str]], dict[str, dict[str, int]], set[str]]:
+    """
+    Build a synthetic corpus with a zipf-like keyword distribution.
+    The relevant segments match the rare keywords of the query, the others match its common keywords by chance.
+    """
+    rng = random.Random(42)
+    vocabulary = [f'word{i}' for i in range(20_000)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    relevant_node_ids = {f'node-{i}' for i in rng.sample(range(segment_count), relevant_count)}
+
+    keyword_table: dict[str, set[str]] = {}
+    postings: dict[str, dict[str, int]] = {}
+    for i in range(segment_count):
+        node_id = f'node-{i}'
+        length = rng.randint(100, 1000)
+        keywords = set(rng.choices(vocabulary, cum_weights=cum_weights, k=10))
+        if node_id in relevant_node_ids:
+            keywords.update(rare_keywords)
+        for keyword in keywords:
+            keyword_table.setdefault(keyword, set()).add(node_id)
+            postings.setdefault(keyword, {})[node_id] = length
+
+    return keyword_table, postings, relevant_node_ids
+
+
+def _measure(func) -> tuple[list[str], float]:
+    elapsed = []
+    for _ in range(ROUNDS):
+        start_at = time.perf_counter()
+        node_ids = func()
+        elapsed.append(time.perf_counter() - start_at)
+
+    return node_ids, statistics.median(elapsed)
+
+
+@pytest.mark.parametrize('segment_count', [100_000])
+def test_bm25_scorer_benchmark(segment_count: int):
+    """
+    Compare latency and precision of BM25 scoring over postings with the keyword count ranking of
+    the jieba keyword table, both start from decoded in-memory postings.
+    """
+    rare_keywords = ['word15000', 'word19000']
+    query_keywords = ['word0', 'word3', *rare_keywords]
+    keyword_table, postings, relevant_node_ids = _build_corpus(segment_count, TOP_K, rare_keywords)
+    query_postings = {keyword: postings[keyword] for keyword in query_keywords}
+
+    jieba = Jieba(dataset=MagicMock())
+    with patch('core.rag.datasource.keyword.jieba.jieba.JiebaKeywordTableHandler') as handler:
+        handler.return_value.extract_keywords.return_value = query_keywords
+        count_ranked, count_elapsed = _measure(
+            lambda: jieba._retrieve_ids_by_query(keyword_table, 'query', k=TOP_K)
+        )
+
+    average_length = statistics.mean(length for node_lengths in postings.values() for length in node_lengths.values())
+    scorer = BM25Scorer(document_count=segment_count, average_length=average_length)
+    bm25_ranked, bm25_elapsed = _measure(
+        lambda: [node_id for node_id, _ in scorer.score(query_postings, top_k=TOP_K)]
+    )
+
+    count_precision = len(relevant_node_ids & set(count_ranked)) / TOP_K
+    bm25_precision = len(relevant_node_ids & set(bm25_ranked)) / TOP_K
+    print(f'\n{segment_count} segments, median of {ROUNDS} rounds, precision@{TOP_K}\n'
+          f'keyword count ranking: {count_elapsed * 1000:.2f}ms, {count_precision:.2f}\n'
+          f'bm25: {bm25_elapsed * 1000:.2f}ms, {bm25_precision:.2f}')
+
+    assert len(count_ranked) == len(bm25_ranked) == TOP_K
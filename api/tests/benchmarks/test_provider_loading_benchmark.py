@@ -0,0 +1,63 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROUNDS = 3
+
+# imports the tool manager and the model provider factory, then loads providers, in a fresh interpreter
+LOADING_SCRIPT = '''
+import json, time
+start = time.perf_counter()
+from core.tools.tool_manager import ToolManager
+from core.model_runtime.model_providers import model_provider_factory
+imported_at = time.perf_counter()
+if {eager}:
+    ToolManager.load_builtin_providers_cache()
+    model_provider_factory._get_model_provider_map()
+else:
+    ToolManager.get_tool_label('google_search')
+    ToolManager.get_builtin_provider('google')
+    model_provider_factory.get_provider_instance('openai')
+loaded_at = time.perf_counter()
+print(json.dumps({{
+    'import_seconds': imported_at - start,
+    'load_seconds': loaded_at - imported_at,
+    'tool_providers': len(ToolManager._builtin_providers),
+    'model_providers': len(model_provider_factory._model_provider_extensions),
+}}))
+'''
+
+
+def _run_loading(eager: bool) -> dict:
+    runs = []
+    for _ in range(ROUNDS):
+        result = subprocess.run([sys.executable, '-c', LOADING_SCRIPT.format(eager=eager)],
+                                capture_output=True, text=True,
+                                cwd=os.path.join(os.path.dirname(__file__), '../..'), check=True)
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    return {
+        'import_seconds': statistics.median(run['import_seconds'] for run in runs),
+        'load_seconds': statistics.median(run['load_seconds'] for run in runs),
+        'tool_providers': runs[0]['tool_providers'],
+        'model_providers': runs[0]['model_providers'],
+    }
+
+
+def test_provider_loading_benchmark():
+    """
+    Compare loading providers on first use from the manifests with loading all builtin tool providers
+    and model providers eagerly, both measured after the imports in a fresh interpreter.
+    """
+    lazy = _run_loading(eager=False)
+    eager = _run_loading(eager=True)
+
+    print(f'\nmedian of {ROUNDS} fresh interpreters')
+    for name, run in [('manifest, first use', lazy), ('eager', eager)]:
+        print(f"{name}: import {run['import_seconds']:.2f}s, load {run['load_seconds']:.2f}s, "
+              f"{run['tool_providers']} tool providers, {run['model_providers']} model providers")
+
+    assert lazy['tool_providers'] < eager['tool_providers']
+    assert lazy['model_providers'] < eager['model_providers']
@@ -0,0 +1,89 @@
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+from core.app.task_pipeline.workflow_node_execution_recorder import WorkflowNodeExecutionRecorder
+from models.workflow import WorkflowNodeExecution, WorkflowNodeExecutionStatus
+
+
+def _build_node_execution(node_execution_id: str) -> WorkflowNodeExecution:
+    return WorkflowNodeExecution(
+        id=node_execution_id,
+        node_id=f'node-{node_execution_id}',
+        status=WorkflowNodeExecutionStatus.RUNNING.value
+    )
+
+
+def test_recorder_writes_in_order_and_batches():
+    writes = []
+    first_write_started = threading.Event()
+    release_first_write = threading.Event()
+
+    def bulk_insert_mappings(model, mappings):
+        writes.append(('insert', [(values['id'], values['status']) for values in mappings]))
+        first_write_started.set()
+        release_first_write.wait(5)
+
+    def bulk_update_mappings(model, mappings):
+        writes.append(('update', [(values['id'], values['status']) for values in mappings]))
+
+    with patch('core.app.task_pipeline.workflow_node_execution_recorder.db') as db:
+        db.session.bulk_insert_mappings.side_effect = bulk_insert_mappings
+        db.session.bulk_update_mappings.side_effect = bulk_update_mappings
+
+        recorder = WorkflowNodeExecutionRecorder(MagicMock())
+        node_a = _build_node_execution('a')
+        recorder.save(node_a)
+        assert first_write_started.wait(5)
+
+        # changes saved while a batch is written are merged into the next batch
+        node_a.status = WorkflowNodeExecutionStatus.SUCCEEDED.value
+        recorder.save(node_a)
+        node_b = _build_node_execution('b')
+        recorder.save(node_b)
+        node_b.status = WorkflowNodeExecutionStatus.FAILED.value
+        recorder.save(node_b)
+
+        # stream responses are fed from memory before anything is written
+        assert recorder.get('b') is node_b
+
+        release_first_write.set()
+        recorder.flush()
+
+    assert writes == [
+        ('insert', [('a', 'running')]),
+        ('insert', [('b', 'failed')]),
+        ('update', [('a', 'succeeded')]),
+    ]
+    assert db.session.commit.call_count == 2
+    assert recorder._write_future is None
+    assert not recorder._pending_values
+
+
+def test_recorder_serializes_json_columns_when_written():
+    written = []
+
+    with patch('core.app.task_pipeline.workflow_node_execution_recorder.db') as db:
+        db.session.bulk_insert_mappings.side_effect = lambda model, mappings: written.extend(mappings)
+
+        recorder = WorkflowNodeExecutionRecorder(MagicMock())
+        node_a = _build_node_execution('a')
+        outputs = {'text': 'hello', 'usage': {'total_tokens': 3}}
+        with patch('core.app.task_pipeline.workflow_node_execution_recorder.json.dumps',
+                   wraps=json.dumps) as dumps:
+            recorder.save(node_a, json_values={'inputs': {'query': 'hi'}, 'outputs': outputs})
+
+            # stream responses are fed with the objects, they are not serialized on save
+            assert recorder.get_json_value('a', 'outputs') is outputs
+            assert recorder.get_json_value('a', 'process_data') is None
+
+            recorder.flush()
+
+    assert dumps.call_count == 2
+    assert len(written) == 1
+    assert json.loads(written[0]['inputs']) == {'query': 'hi'}
+    assert json.loads(written[0]['outputs']) == outputs
+    assert written[0]['process_data'] is None
+    assert written[0]['execution_metadata'] is None
+    # the in-memory node execution is not changed by the write
+    assert node_a.outputs is None
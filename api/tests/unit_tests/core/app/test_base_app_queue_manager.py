@@ -0,0 +1,98 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.app.apps.base_app_queue_manager import AppQueueManager, GenerateTaskStoppedException, PublishFrom
+from core.app.apps.message_based_app_queue_manager import MessageBasedAppQueueManager
+from core.app.apps.task_stop_listener import TaskStopListener
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.app.entities.queue_entities import QueueLLMChunkEvent, QueuePingEvent, QueueTextChunkEvent
+from core.model_runtime.entities.llm_entities import LLMResultChunk, LLMResultChunkDelta, LLMUsage
+from core.model_runtime.entities.message_entities import AssistantPromptMessage, UserPromptMessage
+
+
+@pytest.fixture
+def redis_client():
+    redis_client = MagicMock()
+    redis_client.get.return_value = None
+    # do not start the pub/sub listener thread
+    with patch('core.app.apps.base_app_queue_manager.redis_client', redis_client), \
+            patch('core.app.apps.task_stop_listener.redis_client', redis_client), \
+            patch.object(TaskStopListener, '_thread', MagicMock()):
+        yield redis_client
+
+
+def _build_queue_manager(task_id: str) -> MessageBasedAppQueueManager:
+    return MessageBasedAppQueueManager(
+        task_id=task_id,
+        user_id='user-id',
+        invoke_from=InvokeFrom.DEBUGGER,
+        conversation_id='conversation-id',
+        app_mode='chat',
+        message_id='message-id'
+    )
+
+
+def test_publish_does_not_poll_redis_per_event(redis_client):
+    queue_manager = _build_queue_manager('task-1')
+
+    for _ in range(2000):
+        queue_manager.publish(QueuePingEvent(), PublishFrom.APPLICATION_MANAGER)
+
+    # only the first check within the fallback poll interval reads the stop flag
+    assert redis_client.get.call_count == 1
+
+    TaskStopListener._set('task-1')
+    with pytest.raises(GenerateTaskStoppedException):
+        queue_manager.publish(QueuePingEvent(), PublishFrom.APPLICATION_MANAGER)
+
+
+def test_stop_flag_fallback_poll(redis_client):
+    redis_client.get.return_value = b'account-user-id'
+    AppQueueManager.set_stop_flag('task-2', InvokeFrom.DEBUGGER, 'user-id')
+
+    redis_client.setex.assert_called_with('generate_task_stopped:task-2', 600, 1)
+    redis_client.publish.assert_called_once_with('generate_task_stopped', 'task-2')
+
+    # the stop message was published before the task registered, the poll catches it up
+    queue_manager = _build_queue_manager('task-2')
+    with pytest.raises(GenerateTaskStoppedException):
+        queue_manager.publish(QueuePingEvent(), PublishFrom.APPLICATION_MANAGER)
+
+
+def test_publish_checks_fields_holding_arbitrary_objects(redis_client):
+    queue_manager = _build_queue_manager('task-3')
+
+    class Model:
+        _sa_instance_state = None
+
+    with pytest.raises(TypeError):
+        queue_manager.publish(QueueTextChunkEvent(text='a', metadata={'model': [Model()]}),
+                              PublishFrom.TASK_PIPELINE)
+
+
+def test_publish_checks_only_untyped_fields(redis_client):
+    queue_manager = _build_queue_manager('task-4')
+    chunk_event = QueueLLMChunkEvent(chunk=LLMResultChunk(
+        model='gpt-3.5-turbo',
+        prompt_messages=[UserPromptMessage(content='What is the meaning of life?')],
+        delta=LLMResultChunkDelta(
+            index=0,
+            message=AssistantPromptMessage(content='token'),
+            usage=LLMUsage.empty_usage()
+        )
+    ))
+    metadata = {'node_id': 'llm'}
+
+    with patch.object(queue_manager, '_check_for_sqlalchemy_models') as check_for_sqlalchemy_models, \
+            patch.object(queue_manager, '_publish') as publish:
+        # every field of an llm chunk is validated by pydantic, nothing is checked
+        for _ in range(100):
+            queue_manager.publish(chunk_event, PublishFrom.TASK_PIPELINE)
+        check_for_sqlalchemy_models.assert_not_called()
+
+        # only the untyped metadata of a text chunk is checked, not its text
+        queue_manager.publish(QueueTextChunkEvent(text='a', metadata=metadata), PublishFrom.TASK_PIPELINE)
+        check_for_sqlalchemy_models.assert_called_once_with(metadata)
+
+    assert publish.call_count == 101
@@ -0,0 +1,207 @@
+import threading
+import time
+from typing import Optional
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from core.embedding.cached_embedding import CacheEmbedding, LRUBytesCache
+from core.model_runtime.entities.model_entities import ModelPropertyKey
+from libs import helper
+
+
+def _mock_model_instance(model: str, release: Optional[threading.Event] = None) -> MagicMock:
+    def invoke_text_embedding(texts: list[str], user: str = None):
+        if release:
+            release.wait(timeout=10)
+        return MagicMock(embeddings=[[3.0, 4.0] for _ in texts])
+
+    model_instance = MagicMock()
+    model_instance.provider = 'openai'
+    model_instance.model = model
+    model_instance.invoke_text_embedding = MagicMock(side_effect=invoke_text_embedding)
+    return model_instance
+
+
+def _mock_redis_client() -> MagicMock:
+    redis_client = MagicMock()
+    redis_client.pipeline.return_value.execute.return_value = [None, False]
+    return redis_client
+
+
+def test_lru_bytes_cache():
+    cache = LRUBytesCache(max_bytes=10)
+    cache.set('a', b'12345')
+    cache.set('b', b'12345')
+    assert cache.get('a') == b'12345'
+
+    # least recently used value is evicted when size exceeded
+    cache.set('c', b'123')
+    assert cache.get('b') is None
+    assert cache.get('a') == b'12345'
+    assert cache.get('c') == b'123'
+
+    # values larger than the cache are not stored
+    cache.set('d', b'12345678901')
+    assert cache.get('d') is None
+
+
+def test_embed_query_local_cache():
+    model_instance = _mock_model_instance('test-local-cache')
+    redis_client = _mock_redis_client()
+
+    with patch('core.embedding.cached_embedding.redis_client', redis_client):
+        first = CacheEmbedding(model_instance).embed_query('hello')
+        second = CacheEmbedding(model_instance).embed_query('hello')
+
+    assert np.allclose(first, [0.6, 0.8])
+    assert second == first
+    assert model_instance.invoke_text_embedding.call_count == 1
+    assert redis_client.pipeline.call_count == 1
+    redis_client.setex.assert_called_once()
+
+
+def _count_query_waiters() -> int:
+    # callers waiting for the result of an in-flight query embedding
+    return sum(len(future._condition._waiters) for future in list(CacheEmbedding._query_inflight.values()))
+
+
+def test_embed_query_coalesce_concurrent_misses():
+    release = threading.Event()
+    model_instance = _mock_model_instance('test-coalesce', release)
+    redis_client = _mock_redis_client()
+
+    results = []
+
+    def embed_query():
+        results.append(CacheEmbedding(model_instance).embed_query('concurrent'))
+
+    with patch('core.embedding.cached_embedding.redis_client', redis_client):
+        threads = [threading.Thread(target=embed_query) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+
+        # the model is blocked until the other four callers wait for the embedding of the first one
+        deadline = time.monotonic() + 10
+        while _count_query_waiters() < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        waiters = _count_query_waiters()
+        release.set()
+
+        for thread in threads:
+            thread.join()
+
+    assert waiters == 4
+    assert len(results) == 5
+    assert all(np.allclose(result, [0.6, 0.8]) for result in results)
+    assert model_instance.invoke_text_embedding.call_count == 1
+
+
+class FakeEmbeddingSession:
+    """
+    Session serving cached embeddings to `IN (...)` lookups, which records the lookups and inserts.
+    """
+
+    def __init__(self, cached_embeddings: dict[str, list[float]]):
+        self.cached_embeddings = cached_embeddings
+        self.lookups = []
+        self.inserts = []
+        self.rollback = MagicMock()
+        self.commit = MagicMock()
+        self.insert_error = None
+
+    def query(self, model):
+        session = self
+
+        class Query:
+            def filter(self, *criteria):
+                # the last criterion is `Embedding.hash.in_(hashes)`
+                hashes = criteria[-1].right.value
+                session.lookups.append(hashes)
+                self.rows = [MagicMock(hash=hash, get_embedding=MagicMock(return_value=session.cached_embeddings[hash]))
+                             for hash in hashes if hash in session.cached_embeddings]
+                return self
+
+            def all(self):
+                return self.rows
+
+        return Query()
+
+    def execute(self, statement):
+        self.inserts.append(statement)
+        if self.insert_error:
+            raise self.insert_error
+
+
+def _mock_document_model_instance(model: str, max_chunks: int = 2) -> MagicMock:
+    model_instance = MagicMock()
+    model_instance.provider = 'openai'
+    model_instance.model = model
+    model_instance.model_type_instance.get_model_schema.return_value.model_properties = {
+        ModelPropertyKey.MAX_CHUNKS: max_chunks
+    }
+    model_instance.invoke_text_embedding.side_effect = lambda texts, user=None: MagicMock(
+        embeddings=[[float(len(text)), 0.0] for text in texts]
+    )
+    return model_instance
+
+
+@patch.object(CacheEmbedding, '_BULK_BATCH_SIZE', 2)
+def test_embed_documents_across_lookup_chunks():
+    texts = ['a', 'bb', 'ccc', 'dddd', 'bb', 'eeeee', 'a']
+    cached_embeddings = {helper.generate_text_hash(text): [0.0, 1.0] for text in ['bb', 'dddd']}
+    session = FakeEmbeddingSession(cached_embeddings)
+    model_instance = _mock_document_model_instance('test-documents')
+
+    with patch('core.embedding.cached_embedding.db') as db:
+        db.session = session
+        embeddings = CacheEmbedding(model_instance).embed_documents(texts)
+
+    # 5 distinct hashes looked up in IN (...) chunks of at most 2
+    assert sorted(len(hashes) for hashes in session.lookups) == [1, 2, 2]
+    assert embeddings == [[1.0, 0.0], [0.0, 1.0], [1.0, 0.0], [0.0, 1.0], [0.0, 1.0], [1.0, 0.0], [1.0, 0.0]]
+
+    # each missing text is embedded once, in requests of max chunks texts
+    embedded_texts = [call.kwargs['texts'] for call in model_instance.invoke_text_embedding.call_args_list]
+    assert embedded_texts == [['a', 'ccc'], ['eeeee']]
+
+    # new embeddings are inserted in chunks, ignoring rows inserted by others meanwhile
+    assert len(session.inserts) == 2
+    compiled = str(session.inserts[0].compile(dialect=postgresql.dialect()))
+    assert 'ON CONFLICT (model_name, hash, provider_name) DO NOTHING' in compiled
+    session.commit.assert_called_once()
+
+    stats = CacheEmbedding.get_cache_stats()['openai/test-documents']
+    assert (stats['hit'], stats['miss']) == (3, 4)
+    assert stats['hit_ratio'] == 3 / 7
+
+
+def test_embed_documents_tolerates_insert_conflicts():
+    session = FakeEmbeddingSession({})
+    session.insert_error = IntegrityError('insert', {}, Exception('duplicate key'))
+    model_instance = _mock_document_model_instance('test-conflicts')
+
+    with patch('core.embedding.cached_embedding.db') as db:
+        db.session = session
+        embeddings = CacheEmbedding(model_instance).embed_documents(['a', 'bb'])
+
+    # the embeddings are returned even if caching them failed
+    assert embeddings == [[1.0, 0.0], [1.0, 0.0]]
+    session.rollback.assert_called_once()
+    session.commit.assert_not_called()
+
+
+def test_cache_stats_logged_periodically():
+    embeddings = CacheEmbedding(_mock_document_model_instance('test-stats-log'))
+
+    with patch('core.embedding.cached_embedding.EMBEDDING_CACHE_STATS_LOG_INTERVAL', 60), \
+            patch.object(CacheEmbedding, '_cache_stats_logged_at', time.monotonic() - 60), \
+            patch('core.embedding.cached_embedding.logger') as logger:
+        embeddings._record_cache_stats(hit=1, miss=3)
+        embeddings._record_cache_stats(query_local_hit=1)
+
+    # logged once per interval, with the hit ratio of each provider and model
+    logger.info.assert_called_once()
+    assert 'openai/test-stats-log hit_ratio=0.25 hit=1 miss=3' in logger.info.call_args.args[2]
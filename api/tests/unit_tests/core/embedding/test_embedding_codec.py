@@ -0,0 +1,38 @@
+import base64
+import pickle
+
+import numpy as np
+import pytest
+
+from core.embedding.embedding_codec import decode_embedding, encode_embedding, is_encoded_embedding
+
+
+def test_encode_decode_embedding():
+    embedding = np.random.rand(1536).tolist()
+
+    data = encode_embedding(embedding)
+    assert len(data) == 8 + 1536 * 4
+    assert len(data) < len(pickle.dumps(embedding, protocol=pickle.HIGHEST_PROTOCOL))
+
+    vector = decode_embedding(data)
+    assert vector.dtype == np.float32
+    assert not vector.flags.owndata
+    assert np.allclose(vector, embedding, atol=1e-6)
+
+
+def test_legacy_formats_are_not_encoded():
+    embedding = np.random.rand(8).tolist()
+
+    assert not is_encoded_embedding(pickle.dumps(embedding, protocol=pickle.HIGHEST_PROTOCOL))
+    assert not is_encoded_embedding(base64.b64encode(np.array(embedding).tobytes()))
+    assert is_encoded_embedding(encode_embedding(embedding))
+
+
+def test_decode_invalid_embedding():
+    data = encode_embedding([0.1, 0.2, 0.3])
+
+    with pytest.raises(ValueError):
+        decode_embedding(data[:-1])
+
+    with pytest.raises(ValueError):
+        decode_embedding(pickle.dumps([0.1, 0.2, 0.3]))
@@ -0,0 +1,126 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from core.embedding.embedding_scheduler import (
+    AIMDConcurrencyLimiter,
+    EmbeddingBatchScheduler,
+    get_provider_max_concurrency,
+)
+from core.model_runtime.errors.invoke import InvokeRateLimitError
+
+
+def test_plan_batches_bounded_by_chunks_and_tokens():
+    items = list(range(7))
+    token_counts = [10, 10, 10, 50, 10, 10, 100]
+
+    batches = EmbeddingBatchScheduler.plan_batches(items, token_counts, max_chunks=3, max_tokens=60, min_size=1)
+
+    assert batches == [[0, 1, 2], [3, 4], [5], [6]]
+
+
+def test_plan_batches_hold_multiple_of_chunks():
+    items = list(range(25))
+    token_counts = [10] * 25
+
+    # models without max chunks embed one text per request, batches still group the min size
+    batches = EmbeddingBatchScheduler.plan_batches(items, token_counts, max_chunks=1, min_size=10)
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+
+    batches = EmbeddingBatchScheduler.plan_batches(items, token_counts, max_chunks=4, min_size=10)
+    assert [len(batch) for batch in batches] == [12, 12, 1]
+
+    batches = EmbeddingBatchScheduler.plan_batches(items, token_counts, max_chunks=16, min_size=10)
+    assert [len(batch) for batch in batches] == [16, 9]
+
+
+@patch('core.embedding.embedding_scheduler.INDEXING_EMBEDDING_PROVIDER_MAX_CONCURRENCY', 'openai=32, cohere=4')
+@patch('core.embedding.embedding_scheduler.INDEXING_EMBEDDING_MAX_CONCURRENCY', 10)
+def test_get_provider_max_concurrency():
+    assert get_provider_max_concurrency('openai') == 32
+    assert get_provider_max_concurrency('cohere') == 4
+    assert get_provider_max_concurrency('jina') == 10
+
+
+def test_limiter_increases_additively_and_decreases_multiplicatively():
+    limiter = AIMDConcurrencyLimiter(max_limit=8, initial_limit=4)
+
+    # a limit's worth of successful batches raises the limit by about one
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release()
+    assert int(limiter.limit) == 5
+
+    limiter.acquire()
+    limiter.release(rate_limited=True)
+    assert int(limiter.limit) == 2
+
+    # rate limit errors right after a decrease belong to the same overload
+    limiter.acquire()
+    limiter.release(rate_limited=True)
+    assert int(limiter.limit) == 2
+
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.limit == 8
+
+
+def test_run_retries_rate_limited_batches_with_bounded_concurrency():
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    calls: dict[int, int] = {}
+
+    def embed(batch: int) -> None:
+        nonlocal in_flight, max_in_flight
+        with lock:
+            calls[batch] = calls.get(batch, 0) + 1
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            rate_limited = calls[batch] == 1 and batch % 3 == 0
+        try:
+            time.sleep(0.01)
+            if rate_limited:
+                raise InvokeRateLimitError('rate limited')
+        finally:
+            with lock:
+                in_flight -= 1
+
+    with patch.object(EmbeddingBatchScheduler, 'BACKOFF_BASE', 0.01):
+        scheduler = EmbeddingBatchScheduler(tenant_id='test-retry', provider='openai')
+        scheduler.run(list(range(30)), embed)
+
+    assert sorted(calls) == list(range(30))
+    assert all(count == (2 if batch % 3 == 0 else 1) for batch, count in calls.items())
+    assert max_in_flight <= scheduler.limiter.max_limit
+    assert scheduler.limiter.limit < scheduler.limiter.max_limit
+
+
+@patch('core.embedding.embedding_scheduler.INDEXING_EMBEDDING_MAX_RETRIES', 1)
+def test_run_raises_when_retries_are_exhausted():
+    def embed(batch: int) -> None:
+        raise InvokeRateLimitError('rate limited')
+
+    with patch.object(EmbeddingBatchScheduler, 'BACKOFF_BASE', 0.01):
+        scheduler = EmbeddingBatchScheduler(tenant_id='test-exhausted', provider='openai')
+        with pytest.raises(InvokeRateLimitError):
+            scheduler.run([1, 2], embed)
+
+
+def test_run_stops_on_error():
+    calls = []
+
+    def embed(batch: int) -> None:
+        calls.append(batch)
+        if batch == 0:
+            raise ValueError('invalid batch')
+        time.sleep(0.01)
+
+    scheduler = EmbeddingBatchScheduler(tenant_id='test-error', provider='openai')
+    with pytest.raises(ValueError):
+        scheduler.run(list(range(200)), embed)
+
+    assert len(calls) < 200
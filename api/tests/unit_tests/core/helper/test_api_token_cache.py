@@ -0,0 +1,89 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from core.helper import api_token_cache
+from core.helper.api_token_cache import ApiTokenCache, ApiTokenLastUsedAtBuffer
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        value = self.values.get(key)
+        return value.encode('utf-8') if value is not None else None
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def rename(self, key, new_key):
+        self.values[new_key] = self.values.pop(key)
+
+    def hset(self, key, field, value):
+        self.values.setdefault(key, {})[field] = value
+
+    def hmget(self, key, fields):
+        hash_values = self.values.get(key, {})
+        return [hash_values[field].encode('utf-8') if field in hash_values else None for field in fields]
+
+    def hgetall(self, key):
+        return {field.encode('utf-8'): value.encode('utf-8') for field, value in self.values.get(key, {}).items()}
+
+
+@pytest.fixture
+def redis():
+    redis = FakeRedis()
+    with patch.object(api_token_cache, 'redis_client', redis):
+        yield redis
+
+
+def test_api_token_cache(redis):
+    cache = ApiTokenCache('app', 'app-secret')
+    cache.set({'id': 'token-id', 'app_id': 'app-id', 'tenant_id': 'tenant-id', 'type': 'app'})
+
+    assert cache.get()['app_id'] == 'app-id'
+    assert ApiTokenCache('dataset', 'app-secret').get() is None
+    assert 'app-secret' not in cache.cache_key
+
+    cache.delete()
+
+    assert cache.get() is None
+
+
+def test_last_used_at_coalesced_until_flushed(redis):
+    first_used_at = datetime(2024, 1, 1, 0, 0, 0)
+    last_used_at = datetime(2024, 1, 1, 0, 0, 1)
+    ApiTokenLastUsedAtBuffer.set('token-id', first_used_at)
+    ApiTokenLastUsedAtBuffer.set('token-id', last_used_at)
+
+    assert ApiTokenLastUsedAtBuffer.begin_flush() == {'token-id': last_used_at}
+
+    # used again while flushing
+    used_while_flushing_at = datetime(2024, 1, 1, 0, 0, 2)
+    ApiTokenLastUsedAtBuffer.set('token-id', used_while_flushing_at)
+    assert ApiTokenLastUsedAtBuffer.get(['token-id', 'other-id']) == {'token-id': used_while_flushing_at}
+
+    ApiTokenLastUsedAtBuffer.complete_flush()
+
+    assert ApiTokenLastUsedAtBuffer.begin_flush() == {'token-id': used_while_flushing_at}
+
+
+def test_failed_flush_retried(redis):
+    used_at = datetime(2024, 1, 1)
+    ApiTokenLastUsedAtBuffer.set('token-id', used_at)
+    ApiTokenLastUsedAtBuffer.begin_flush()
+
+    # not completed, the next flush takes the same times
+    assert ApiTokenLastUsedAtBuffer.begin_flush() == {'token-id': used_at}
+
+    ApiTokenLastUsedAtBuffer.complete_flush()
+
+    assert ApiTokenLastUsedAtBuffer.begin_flush() == {}
@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.helper import model_provider_cache
+from core.helper.model_provider_cache import ProviderConfigurationsCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        value = self.values.get(key)
+        return str(value).encode('utf-8') if value is not None else None
+
+    def incr(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+
+@pytest.fixture
+def redis():
+    redis = FakeRedis()
+    with patch.object(model_provider_cache, 'redis_client', redis), \
+            patch.object(ProviderConfigurationsCache, '_entries', model_provider_cache.OrderedDict()):
+        yield redis
+
+
+def test_get_cached_configurations(redis):
+    configurations = MagicMock()
+    ProviderConfigurationsCache.set('tenant', ProviderConfigurationsCache.get_version('tenant'), configurations)
+
+    assert ProviderConfigurationsCache.get('tenant') is configurations
+    assert ProviderConfigurationsCache.get('other') is None
+
+
+def test_invalidate_drops_local_entry(redis):
+    ProviderConfigurationsCache.set('tenant', 0, MagicMock())
+
+    ProviderConfigurationsCache.invalidate('tenant')
+
+    assert ProviderConfigurationsCache.get('tenant') is None
+    assert ProviderConfigurationsCache.get_version('tenant') == 1
+
+
+@patch.object(model_provider_cache, 'PROVIDER_CONFIGURATIONS_CACHE_CHECK_INTERVAL', 0)
+def test_version_bumped_by_other_process(redis):
+    ProviderConfigurationsCache.set('tenant', 0, MagicMock())
+
+    # another process invalidated the tenant
+    redis.incr(ProviderConfigurationsCache._version_key('tenant'))
+
+    assert ProviderConfigurationsCache.get('tenant') is None
+
+
+def test_version_not_checked_within_interval(redis):
+    configurations = MagicMock()
+    ProviderConfigurationsCache.set('tenant', 0, configurations)
+
+    redis.incr(ProviderConfigurationsCache._version_key('tenant'))
+
+    assert ProviderConfigurationsCache.get('tenant') is configurations
+
+
+@patch.object(model_provider_cache, 'PROVIDER_CONFIGURATIONS_CACHE_TTL', -1)
+def test_expired_configurations(redis):
+    ProviderConfigurationsCache.set('tenant', 0, MagicMock())
+
+    assert ProviderConfigurationsCache.get('tenant') is None
+
+
+@patch.object(model_provider_cache, 'PROVIDER_CONFIGURATIONS_CACHE_MAX_TENANTS', 2)
+def test_least_recently_used_tenant_evicted(redis):
+    for tenant_id in ['a', 'b']:
+        ProviderConfigurationsCache.set(tenant_id, 0, MagicMock())
+
+    ProviderConfigurationsCache.get('a')
+    ProviderConfigurationsCache.set('c', 0, MagicMock())
+
+    assert ProviderConfigurationsCache.get('a') is not None
+    assert ProviderConfigurationsCache.get('b') is None
+    assert ProviderConfigurationsCache.get('c') is not None
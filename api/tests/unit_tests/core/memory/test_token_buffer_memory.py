@@ -0,0 +1,67 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.memory.token_buffer_memory import TokenBufferMemory
+from core.model_runtime.entities.message_entities import AssistantPromptMessage, UserPromptMessage
+
+
+class CountingLLM:
+    """
+    Tokenizer with per message and per count overhead like chat models, which records the counted messages.
+    """
+
+    def __init__(self):
+        self.counts = 0
+        self.counted_messages = 0
+
+    def get_num_tokens(self, model, credentials, prompt_messages) -> int:
+        self.counts += 1
+        self.counted_messages += len(prompt_messages)
+        return 3 + sum(4 + len(prompt_message.content.split()) for prompt_message in prompt_messages)
+
+
+def _prune_by_recounting(llm: CountingLLM, prompt_messages: list, max_token_limit: int) -> list:
+    prompt_messages = list(prompt_messages)
+    while llm.get_num_tokens(None, None, prompt_messages) > max_token_limit and prompt_messages:
+        prompt_messages.pop(0)
+
+    return prompt_messages
+
+
+@pytest.mark.parametrize('max_token_limit', [10, 100, 1000, 2000, 100000])
+def test_prune_prompt_messages_matches_recounting(max_token_limit: int):
+    prompt_messages = []
+    for i in range(50):
+        prompt_messages.append(UserPromptMessage(content=' '.join(['question'] * (i % 7 + 1))))
+        prompt_messages.append(AssistantPromptMessage(content=' '.join(['answer'] * (i % 13 * 5 + 1))))
+
+    llm = CountingLLM()
+    memory = TokenBufferMemory(conversation=MagicMock(), model_instance=MagicMock())
+    with patch('core.memory.token_buffer_memory.model_provider_factory') as model_provider_factory:
+        model_provider_factory.get_provider_instance.return_value.get_model_instance.return_value = llm
+        pruned_messages = memory._prune_prompt_messages(prompt_messages, max_token_limit)
+
+    reference_llm = CountingLLM()
+    assert pruned_messages == _prune_by_recounting(reference_llm, prompt_messages, max_token_limit)
+    # each message is counted at most three times, instead of once per prune
+    assert llm.counted_messages <= 3 * len(prompt_messages)
+    # one count per pruned message, like recounting, instead of one per message
+    pruned_count = len(prompt_messages) - len(pruned_messages)
+    assert llm.counts <= max(pruned_count + 2, reference_llm.counts)
+
+
+@pytest.mark.parametrize('pruned_count', [1, 2, 5])
+def test_prune_prompt_messages_counts_only_pruned_messages(pruned_count: int):
+    prompt_messages = [UserPromptMessage(content=' '.join(['question'] * (i % 7 + 1))) for i in range(100)]
+    max_token_limit = CountingLLM().get_num_tokens(None, None, prompt_messages[pruned_count:])
+
+    llm = CountingLLM()
+    memory = TokenBufferMemory(conversation=MagicMock(), model_instance=MagicMock())
+    with patch('core.memory.token_buffer_memory.model_provider_factory') as model_provider_factory:
+        model_provider_factory.get_provider_instance.return_value.get_model_instance.return_value = llm
+        pruned_messages = memory._prune_prompt_messages(prompt_messages, max_token_limit)
+
+    assert pruned_messages == prompt_messages[pruned_count:]
+    # remote tokenizers are called about once per pruned message, not once per message of the history
+    assert llm.counts == (2 if pruned_count == 1 else pruned_count + 2)
@@ -0,0 +1,54 @@
+from unittest.mock import MagicMock, patch
+
+from core.model_runtime.entities.llm_entities import LLMResult, LLMUsage
+from core.model_runtime.entities.message_entities import AssistantPromptMessage, UserPromptMessage
+from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
+
+
+class FakeClock:
+    """
+    Monotonic clock which only advances on sleep, recording the sleeps among the yielded chunks.
+    """
+
+    def __init__(self, events: list):
+        self.now = 0.0
+        self.events = events
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.events.append(('sleep', seconds))
+        self.now += seconds
+
+
+def test_llm_result_to_stream_paces_chunks_lazily():
+    tool_call = AssistantPromptMessage.ToolCall(
+        id='call',
+        type='function',
+        function=AssistantPromptMessage.ToolCall.ToolCallFunction(name='search', arguments='{}')
+    )
+    result = LLMResult(
+        model='gpt-3.5-turbo',
+        prompt_messages=[UserPromptMessage(content='hi')],
+        message=AssistantPromptMessage(content='one two three', tool_calls=[tool_call]),
+        usage=LLMUsage.empty_usage()
+    )
+
+    events = []
+    with patch('core.model_runtime.utils.text_stream.time', FakeClock(events)), \
+            patch('core.model_runtime.utils.text_stream.STREAM_CHUNK_SIZE', 4), \
+            patch('core.model_runtime.utils.text_stream.STREAM_FLUSH_INTERVAL', 0.5):
+        for chunk in LargeLanguageModel._llm_result_to_stream(MagicMock(), result):
+            events.append(('chunk', chunk.delta.message.content, len(chunk.delta.message.tool_calls)))
+
+    # each chunk is yielded before the flush interval of the next one, tool calls come with the last chunk
+    assert events == [
+        ('chunk', 'one ', 0),
+        ('sleep', 0.5),
+        ('chunk', 'two ', 0),
+        ('sleep', 0.5),
+        ('chunk', 'thre', 0),
+        ('sleep', 0.5),
+        ('chunk', 'e', 1),
+    ]
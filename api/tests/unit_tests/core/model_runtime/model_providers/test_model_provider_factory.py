@@ -0,0 +1,29 @@
+from core.model_runtime.model_providers.model_provider_factory import ModelProviderFactory
+
+
+def test_manifest_sorted_by_position():
+    manifest = ModelProviderFactory.build_manifest()
+
+    names = [provider['name'] for provider in manifest['providers']]
+    assert names[:3] == ['modelhub', 'openai_api_compatible', 'openai']
+    assert len(names) == len(set(names))
+
+
+def test_provider_loaded_on_first_use():
+    factory = ModelProviderFactory()
+
+    provider_instance = factory.get_provider_instance('anthropic')
+
+    assert provider_instance is ModelProviderFactory().get_provider_instance('anthropic')
+    assert 'anthropic' in ModelProviderFactory._model_provider_extensions
+
+
+def test_get_providers_does_not_modify_provider_schema():
+    factory = ModelProviderFactory()
+
+    models = [provider.models for provider in factory.get_providers() if provider.provider == 'anthropic'][0]
+    models_again = [provider.models for provider in factory.get_providers() if provider.provider == 'anthropic'][0]
+
+    assert models
+    assert len(models_again) == len(models)
+    assert factory.get_provider_instance('anthropic').get_provider_schema().models == []
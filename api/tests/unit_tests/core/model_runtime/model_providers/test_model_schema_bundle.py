@@ -0,0 +1,42 @@
+from unittest.mock import patch
+
+import pytest
+
+from core.model_runtime.entities.model_entities import FetchFrom, ModelType
+from core.model_runtime.model_providers.__base.model_schema_bundle import ModelSchemaBundle
+
+
+@pytest.fixture
+def bundle_path(tmp_path):
+    bundle_path = str(tmp_path / '_schema_bundle.pkl')
+    with patch.object(ModelSchemaBundle, 'bundle_file_name', bundle_path), \
+            patch.object(ModelSchemaBundle, '_provider_schemas', {}), \
+            patch.object(ModelSchemaBundle, '_model_schemas', {}), \
+            patch.object(ModelSchemaBundle, '_loaded', False):
+        yield bundle_path
+
+
+def test_schemas_parsed_from_yaml_without_bundle(bundle_path):
+    provider_schema = ModelSchemaBundle.get_provider_schema('anthropic')
+    model_schemas = ModelSchemaBundle.get_model_schemas('anthropic', ModelType.LLM)
+
+    assert ModelType.LLM in provider_schema.supported_model_types
+    assert model_schemas
+    assert all(model_schema.fetch_from == FetchFrom.PREDEFINED_MODEL for model_schema in model_schemas)
+    assert ModelSchemaBundle.get_model_schemas('anthropic', ModelType.LLM) is model_schemas
+
+
+def test_schemas_loaded_from_bundle(bundle_path):
+    assert ModelSchemaBundle.dump() == bundle_path
+    expected_model_schemas = ModelSchemaBundle._load_model_schemas_from_yaml('openai', 'text_embedding')
+
+    with patch.object(ModelSchemaBundle, '_provider_schemas', {}), \
+            patch.object(ModelSchemaBundle, '_model_schemas', {}), \
+            patch.object(ModelSchemaBundle, '_loaded', False), \
+            patch.object(ModelSchemaBundle, '_load_provider_schema_from_yaml', side_effect=AssertionError), \
+            patch.object(ModelSchemaBundle, '_load_model_schemas_from_yaml', side_effect=AssertionError):
+        provider_schema = ModelSchemaBundle.get_provider_schema('openai')
+        model_schemas = ModelSchemaBundle.get_model_schemas('openai', ModelType.TEXT_EMBEDDING)
+
+    assert provider_schema.provider == 'openai'
+    assert model_schemas == expected_model_schemas
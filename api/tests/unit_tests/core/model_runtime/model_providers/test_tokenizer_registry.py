@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, join
+
+from transformers import GPT2Tokenizer as TransformerGPT2Tokenizer
+
+from core.model_runtime.model_providers.__base.tokenizers import tokenizer_registry
+from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
+from core.model_runtime.model_providers.__base.tokenizers.tokenizer_registry import TokenizerRegistry
+
+TEXTS = [
+    '',
+    'hello world',
+    '  leading and trailing spaces  ',
+    'line\nbreaks\n\nand\ttabs',
+    '中文分词和 English mixed',
+    'emoji 😀 and accents éàü',
+    'special token <|endoftext|> inside text',
+    'x' * 3000,
+]
+
+
+def test_gpt2_batch_counts_match_transformers_tokenizer():
+    transformer_tokenizer = TransformerGPT2Tokenizer.from_pretrained(join(dirname(tokenizer_registry.__file__), 'gpt2'))
+    expected = [len(transformer_tokenizer.encode(text, verbose=False)) for text in TEXTS]
+
+    assert TokenizerRegistry.count_tokens_batch(TEXTS) == expected
+    assert GPT2Tokenizer.get_num_tokens_batch(TEXTS) == expected
+    assert [GPT2Tokenizer.get_num_tokens(text) for text in TEXTS] == expected
+
+
+def test_gpt2_tokenizer_is_shared_across_threads():
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        counts = list(executor.map(lambda _: TokenizerRegistry.count_tokens_batch(TEXTS), range(32)))
+        tokenizers = set(executor.map(lambda _: id(TokenizerRegistry.get_gpt2_tokenizer()), range(32)))
+
+    assert all(count == counts[0] for count in counts)
+    assert len(tokenizers) == 1
@@ -0,0 +1,29 @@
+import time
+
+from core.model_runtime.utils.text_stream import iter_text_chunks
+
+
+def test_iter_text_chunks():
+    text = 'Hello, this is a static answer template.\n' * 25
+
+    chunks = list(iter_text_chunks(text, chunk_size=20, flush_interval=0))
+
+    assert ''.join(chunks) == text
+    assert all(0 < len(chunk) <= 20 for chunk in chunks)
+    # chunks end after whitespace, words are not split
+    assert all(chunk[-1] in ' \n' for chunk in chunks)
+    assert len(chunks) < len(text) // 10
+
+    # no whitespace to break at
+    assert list(iter_text_chunks('你好世界你好世界', chunk_size=3, flush_interval=0)) == ['你好世', '界你好', '世界']
+    assert list(iter_text_chunks('', chunk_size=3, flush_interval=0)) == []
+
+
+def test_iter_text_chunks_flush_interval():
+    start_at = time.perf_counter()
+    chunks = list(iter_text_chunks('a' * 1000, chunk_size=250, flush_interval=0.02))
+    elapsed = time.perf_counter() - start_at
+
+    # paced per chunk rather than per character
+    assert len(chunks) == 4
+    assert 0.06 <= elapsed < 1
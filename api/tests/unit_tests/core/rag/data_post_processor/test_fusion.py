@@ -0,0 +1,45 @@
+import pytest
+
+from core.rag.data_post_processor.fusion import FusionMethod, FusionRunner
+from core.rag.models.document import Document
+
+
+def _documents(*doc_ids_and_scores) -> list[Document]:
+    return [
+        Document(page_content=doc_id, metadata={'doc_id': doc_id, 'score': score})
+        for doc_id, score in doc_ids_and_scores
+    ]
+
+
+def test_reciprocal_rank_fusion():
+    fusion_runner = FusionRunner(FusionMethod.RECIPROCAL_RANK_FUSION)
+    documents = fusion_runner.run({
+        'semantic_search': _documents(('a', 0.9), ('b', 0.8), ('c', 0.7)),
+        'full_text_search': _documents(('c', None), ('b', None), ('d', None)),
+    }, top_n=3)
+
+    # documents found by both sources are deduplicated and rank first
+    assert [document.metadata['doc_id'] for document in documents] == ['c', 'b', 'a']
+    assert documents[0].metadata['score'] == pytest.approx(1 / 63 + 1 / 61)
+    assert documents[1].metadata['score'] == pytest.approx(1 / 62 + 1 / 62)
+
+
+def test_weighted_score_fusion():
+    fusion_runner = FusionRunner(FusionMethod.WEIGHTED_SCORE, {'semantic_search': 0.8, 'full_text_search': 0.2})
+    documents = fusion_runner.run({
+        'semantic_search': _documents(('a', 0.9), ('b', 0.5)),
+        # full text results without scores are normalized by rank
+        'full_text_search': _documents(('b', None), ('c', None)),
+    }, score_threshold=0.2)
+
+    assert [document.metadata['doc_id'] for document in documents] == ['a', 'b']
+    assert documents[0].metadata['score'] == pytest.approx(0.8)
+    assert documents[1].metadata['score'] == pytest.approx(0.2)
+
+
+def test_invalid_fusion_method():
+    with pytest.raises(ValueError):
+        FusionMethod.value_of('unknown')
+
+    with pytest.raises(ValueError):
+        FusionRunner(FusionMethod.RERANK)
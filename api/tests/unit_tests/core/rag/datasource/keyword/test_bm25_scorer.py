@@ -0,0 +1,47 @@
+from unittest.mock import MagicMock, patch
+
+from core.rag.datasource.keyword.bm25_scorer import BM25Scorer
+from core.rag.datasource.keyword.jieba.jieba import Jieba
+
+
+def test_bm25_scorer():
+    scorer = BM25Scorer(document_count=100, average_length=100)
+
+    # rare keywords weigh more than common ones
+    assert scorer.idf(1) > scorer.idf(50)
+
+    scored = scorer.score({
+        'common': {str(i): 100 for i in range(50)},
+        'rare': {'7': 100},
+    }, top_k=3)
+    assert scored[0][0] == '7'
+    assert len(scored) == 3
+
+    # shorter segments rank higher with the same matched keywords
+    scored = scorer.score({'rare': {'short': 50, 'long': 500}}, top_k=2)
+    assert [node_id for node_id, _ in scored] == ['short', 'long']
+    assert scored[0][1] > scored[1][1] > 0
+
+
+def test_bm25_scorer_ranking():
+    # segment lengths: s1 100, s2 100, s3 40, s4 200, s5 100, s6 300
+    postings = {
+        'common': {'s1': 100, 's2': 100, 's3': 40, 's4': 200},
+        'mid': {'s2': 100, 's5': 100, 's6': 300},
+        'rare': {'s5': 100},
+    }
+    keyword_table = {keyword: set(node_lengths) for keyword, node_lengths in postings.items()}
+
+    jieba = Jieba(dataset=MagicMock())
+    with patch('core.rag.datasource.keyword.jieba.jieba.JiebaKeywordTableHandler') as handler:
+        handler.return_value.extract_keywords.return_value = ['common', 'mid', 'rare']
+        count_ranked = jieba._retrieve_ids_by_query(keyword_table, 'query', k=2)
+
+    scorer = BM25Scorer(document_count=6, average_length=140)
+    bm25_ranked = [node_id for node_id, _ in scorer.score(postings, top_k=6)]
+
+    # keyword count ranking ties the segment matching the rare keyword with one matching the common keyword,
+    # and ranks the one found first higher
+    assert count_ranked == ['s2', 's5']
+    # bm25 ranks the rare keyword first, then shorter segments among the same matched keywords
+    assert bm25_ranked == ['s5', 's2', 's3', 's1', 's6', 's4']
@@ -0,0 +1,31 @@
+from unittest.mock import MagicMock, patch
+
+from core.rag.datasource.keyword.jieba.jieba import Jieba
+from core.rag.models.document import Document
+
+
+@patch('core.rag.datasource.keyword.jieba.jieba.redis_client')
+@patch('core.rag.datasource.keyword.jieba.jieba.db')
+def test_keyword_table_saved_once_per_document(db, redis_client):
+    jieba = Jieba(MagicMock(id='dataset-id'))
+    saved_segments = [MagicMock(index_node_id='1', keywords=['apple']), MagicMock(index_node_id='2', keywords=None)]
+    db.session.query.return_value.filter.return_value.all.return_value = saved_segments
+
+    with patch.object(jieba, '_get_dataset_keyword_table', return_value={'pear': {'0'}}), \
+            patch.object(jieba, '_save_dataset_keyword_table') as save_dataset_keyword_table, \
+            patch.object(jieba, '_update_segments_keywords') as update_segments_keywords, \
+            patch('core.rag.datasource.keyword.jieba.jieba.JiebaKeywordTableHandler') as keyword_table_handler:
+        keyword_table_handler.return_value.extract_keywords.return_value = {'plum'}
+
+        for batch in [['1'], ['2']]:
+            jieba.add_texts_of_document([Document(page_content=doc_id, metadata={'doc_id': doc_id})
+                                         for doc_id in batch])
+        # keywords of the batches are only saved on their segments
+        assert update_segments_keywords.call_count == 2
+        save_dataset_keyword_table.assert_not_called()
+
+        # the second segment was saved without keywords, as if its batch was interrupted
+        jieba.complete_document('document-id')
+
+    save_dataset_keyword_table.assert_called_once_with({'pear': {'0'}, 'apple': {'1'}, 'plum': {'2'}})
+    assert saved_segments[1].keywords == ['plum']
@@ -0,0 +1,72 @@
+from unittest.mock import MagicMock, patch
+
+from core.rag.datasource.keyword.bm25_scorer import BM25Scorer
+from core.rag.datasource.keyword.jieba.jieba_postings import JiebaPostings, KeywordPostingsCache
+
+
+def _mock_redis_client() -> MagicMock:
+    versions = {}
+
+    def set_version(key, value, nx=False):
+        if nx and key in versions:
+            return None
+        versions[key] = value
+        return True
+
+    redis_client = MagicMock()
+    redis_client.get.side_effect = lambda key: versions.get(key)
+    redis_client.set.side_effect = set_version
+    return redis_client
+
+
+def test_keyword_postings_cache_version():
+    KeywordPostingsCache.clear()
+
+    with patch('core.rag.datasource.keyword.jieba.jieba_postings.redis_client', _mock_redis_client()):
+        version = KeywordPostingsCache.get_version('dataset')
+        assert version == KeywordPostingsCache.get_version('dataset')
+
+        KeywordPostingsCache.set('dataset', version, {'apple': {'1': 10, '2': 20}, 'pear': {}})
+        assert KeywordPostingsCache.get('dataset', version, ['apple', 'pear', 'plum']) == {
+            'apple': {'1': 10, '2': 20},
+            'pear': {},
+        }
+
+        # postings cached under an older version are never served
+        KeywordPostingsCache.refresh_version('dataset')
+        new_version = KeywordPostingsCache.get_version('dataset')
+        assert new_version != version
+        assert KeywordPostingsCache.get('dataset', new_version, ['apple', 'pear']) == {}
+
+
+def test_keyword_postings_cache_eviction():
+    KeywordPostingsCache.clear()
+
+    with patch('core.rag.datasource.keyword.jieba.jieba_postings.KEYWORD_POSTINGS_CACHE_MAX_SIZE', 5):
+        KeywordPostingsCache.set('dataset', 'v1', {'apple': {'1': 10, '2': 20}})
+        KeywordPostingsCache.set('dataset', 'v1', {'pear': {'3': 30}})
+        assert KeywordPostingsCache.get('dataset', 'v1', ['apple']) == {'apple': {'1': 10, '2': 20}}
+
+        # least recently used postings are evicted when size exceeded
+        KeywordPostingsCache.set('dataset', 'v1', {'plum': {}})
+        assert KeywordPostingsCache.get('dataset', 'v1', ['apple', 'pear', 'plum']) == {
+            'apple': {'1': 10, '2': 20},
+            'plum': {},
+        }
+
+    KeywordPostingsCache.clear()
+
+
+def test_retrieve_ids_by_query():
+    dataset = MagicMock()
+    dataset.id = 'dataset'
+    keyword = JiebaPostings(dataset)
+    keyword._get_postings = MagicMock(return_value={
+        'apple': {'1': 100, '2': 100},
+        'pear': {'2': 100, '3': 100},
+    })
+    keyword._get_scorer = MagicMock(return_value=BM25Scorer(document_count=10, average_length=100))
+
+    scored_chunk_indices = keyword._retrieve_ids_by_query('apple pear', k=2)
+    assert scored_chunk_indices[0][0] == '2'
+    assert len(scored_chunk_indices) == 2
@@ -0,0 +1,126 @@
+import threading
+import time
+from typing import Optional
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from core.rag.datasource.retrieval_service import RetrievalService
+from core.rag.models.document import Document
+
+
+def _mock_dataset() -> MagicMock:
+    dataset = MagicMock()
+    dataset.id = 'dataset'
+    dataset.tenant_id = 'tenant'
+    dataset.available_document_count = 1
+    dataset.available_segment_count = 1
+    return dataset
+
+
+def _mock_vector(barrier: Optional[threading.Barrier] = None, release: Optional[threading.Event] = None) -> MagicMock:
+    def search(query: str, **kwargs) -> list[Document]:
+        if barrier:
+            # broken if the other search stage does not run meanwhile
+            barrier.wait(timeout=10)
+        if release:
+            release.wait(timeout=10)
+        return [Document(page_content=query, metadata={'doc_id': 'doc'})]
+
+    vector = MagicMock()
+    vector.search_by_vector.side_effect = search
+    vector.search_by_full_text.side_effect = search
+    return vector
+
+
+def test_retrieve_stages_concurrently():
+    barrier = threading.Barrier(2)
+    with Flask(__name__).app_context(), \
+            patch('core.rag.datasource.retrieval_service.Vector', return_value=_mock_vector(barrier)) as vector_cls, \
+            patch('core.rag.datasource.retrieval_service.DataPostProcessor') as data_post_processor:
+        data_post_processor.return_value.invoke.side_effect = lambda documents, **kwargs: documents
+
+        retrieval = RetrievalService.submit(dataset=_mock_dataset(), retrival_method='hybrid_search',
+                                            query='query', top_k=2)
+        documents = RetrievalService.collect(retrieval)
+
+    # embedding and full text search share one vector, and both passed the barrier, so they ran concurrently
+    vector_cls.assert_called_once()
+    assert not barrier.broken
+    assert len(documents) == 2
+
+    stats = RetrievalService.get_stage_stats()
+    assert stats['embedding_search']['count'] >= 1
+    assert stats['full_text_search']['count'] >= 1
+    assert stats['rerank']['count'] >= 1
+
+
+def test_retrieve_hybrid_fusion():
+    with Flask(__name__).app_context(), \
+            patch('core.rag.datasource.retrieval_service.Vector', return_value=_mock_vector()), \
+            patch('core.rag.datasource.retrieval_service.DataPostProcessor') as data_post_processor:
+        documents = RetrievalService.collect(RetrievalService.submit(
+            dataset=_mock_dataset(), retrival_method='hybrid_search', query='query', top_k=2,
+            fusion_method='reciprocal_rank_fusion'
+        ))
+
+    # same doc found by both searches is fused locally without rerank model
+    data_post_processor.assert_not_called()
+    assert len(documents) == 1
+    assert documents[0].metadata['score'] > 0
+
+
+def test_retrieve_deadline():
+    # the search never finishes before the deadline
+    release = threading.Event()
+    timeouts = RetrievalService.get_stage_stats().get('embedding_search', {}).get('timeout', 0)
+    try:
+        with Flask(__name__).app_context(), \
+                patch('core.rag.datasource.retrieval_service.Vector', return_value=_mock_vector(release=release)):
+            retrieval = RetrievalService.submit(dataset=_mock_dataset(), retrival_method='semantic_search',
+                                                query='query', top_k=2, deadline=time.monotonic() + 0.1)
+            documents = RetrievalService.collect(retrieval)
+    finally:
+        release.set()
+
+    # stages not finished before deadline are skipped
+    assert documents == []
+    assert RetrievalService.get_stage_stats()['embedding_search']['timeout'] > timeouts
+
+
+def test_retrieve_empty_dataset():
+    dataset = _mock_dataset()
+    dataset.available_segment_count = 0
+    assert RetrievalService.submit(dataset=dataset, retrival_method='semantic_search', query='query', top_k=2) is None
+    assert RetrievalService.collect(None) == []
+
+
+def test_abandoned_stage_skips_rerank():
+    vector = _mock_vector()
+    with patch('core.rag.datasource.retrieval_service.DataPostProcessor') as data_post_processor:
+        documents = RetrievalService.embedding_search(
+            vector=vector, dataset_id='dataset', tenant_id='tenant', query='query', top_k=2,
+            score_threshold=None, reranking_model={'reranking_provider_name': 'cohere'},
+            retrival_method='semantic_search', rerank_deadline=time.monotonic() - 1
+        )
+
+    # the retrieval gave up on the stage, the rerank model is not invoked for nothing
+    assert documents is None
+    data_post_processor.assert_not_called()
+
+
+def test_stage_stats_logged_periodically():
+    with patch('core.rag.datasource.retrieval_service.RETRIEVAL_STATS_LOG_INTERVAL', 60), \
+            patch.object(RetrievalService, '_stage_stats_logged_at', time.monotonic()), \
+            patch('core.rag.datasource.retrieval_service.logger') as logger:
+        RetrievalService._record_stage_stats('stats_log_stage', count=1, latency=0.5)
+        logger.info.assert_not_called()
+
+        RetrievalService._stage_stats_logged_at -= 60
+        RetrievalService._record_stage_stats('stats_log_stage', count=1, latency=0.5)
+        RetrievalService._record_stage_stats('stats_log_stage', count=1, latency=0.5)
+
+    # logged once per interval, with the latency of each stage
+    logger.info.assert_called_once()
+    assert 'stats_log_stage count=' in logger.info.call_args.args[2]
+    assert 'max_latency=0.500s' in logger.info.call_args.args[2]
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from core.splitter.fixed_text_splitter import FixedRecursiveCharacterTextSplitter
+
+
+class CountingTokenizer:
+    """
+    Whitespace tokenizer which records how many times it is called.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_num_tokens(self, text: str) -> int:
+        self.calls += 1
+        return len(text.split())
+
+    def get_num_tokens_batch(self, texts: list[str]) -> list[int]:
+        self.calls += 1
+        return [len(text.split()) for text in texts]
+
+
+def _build_splitter(tokenizer: CountingTokenizer) -> FixedRecursiveCharacterTextSplitter:
+    return FixedRecursiveCharacterTextSplitter(
+        chunk_size=500,
+        chunk_overlap=50,
+        fixed_separator='\n\n',
+        separators=['\n\n', '。', '.', ' ', ''],
+        length_function=tokenizer.get_num_tokens,
+        batch_length_function=tokenizer.get_num_tokens_batch,
+    )
+
+
+def _build_document(size: int) -> str:
+    rng = random.Random(42)
+    vocabulary = [f'word{i}' for i in range(5000)]
+    paragraphs = []
+    length = 0
+    while length < size:
+        # mix short paragraphs with long ones which have to be split recursively
+        sentences = [' '.join(rng.choices(vocabulary, k=rng.randint(5, 30))) for _ in range(rng.randint(1, 200))]
+        paragraph = '. '.join(sentences)
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+
+    return '\n\n'.join(paragraphs)[:size]
+
+
+def test_length_cache_keeps_chunks():
+    tokenizer = CountingTokenizer()
+    splitter = _build_splitter(tokenizer)
+    text = _build_document(200_000)
+
+    # without the length cache of split_text, every fragment is tokenized on every measure
+    uncached_chunks = splitter._split_fixed_text(text)
+    uncached_calls = tokenizer.calls
+
+    tokenizer.calls = 0
+    chunks = splitter.split_text(text)
+
+    assert chunks == uncached_chunks
+    assert tokenizer.calls < uncached_calls
+    # the cache does not outlive the split
+    assert splitter._length_cache is None
+
+
+@pytest.mark.parametrize('document_size', [10 * 1024 * 1024])
+def test_length_cache_on_large_document(document_size: int):
+    """
+    Compare tokenizer work of splitting a large document with and without the length cache.
+    """
+    text = _build_document(document_size)
+
+    uncached_tokenizer = CountingTokenizer()
+    uncached_chunks = _build_splitter(uncached_tokenizer)._split_fixed_text(text)
+
+    tokenizer = CountingTokenizer()
+    chunks = _build_splitter(tokenizer).split_text(text)
+
+    assert chunks == uncached_chunks
+    assert tokenizer.calls < uncached_tokenizer.calls
@@ -0,0 +1,58 @@
+from unittest.mock import patch
+
+from core.indexing_checkpoint import IndexingCheckpoint
+
+
+class FakeRedis:
+    """
+    In-memory redis hash commands, with pipelines executed immediately.
+    """
+
+    def __init__(self):
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k.encode(): str(v).encode() for k, v in mapping.items()})
+
+    def hincrby(self, key, field, amount):
+        values = self.hashes.setdefault(key, {})
+        values[field.encode()] = str(int(values.get(field.encode(), 0)) + amount).encode()
+
+
+@patch('core.indexing_checkpoint.redis_client', new_callable=FakeRedis)
+def test_checkpoint_records_split_progress_and_tokens(redis_client):
+    checkpoint = IndexingCheckpoint('document-id')
+    assert not checkpoint.is_splitting()
+
+    checkpoint.save_split_progress(0, 0)
+    checkpoint.save_split_progress(3, 100)
+    checkpoint.add_tokens(10)
+    checkpoint.add_tokens(5)
+
+    # a resumed run on another worker sees the progress
+    resumed_checkpoint = IndexingCheckpoint('document-id')
+    assert resumed_checkpoint.is_splitting()
+    assert resumed_checkpoint.get_split_progress() == (3, 100)
+    assert resumed_checkpoint.get_tokens() == 15
+
+    resumed_checkpoint.complete_split()
+    assert not resumed_checkpoint.is_splitting()
+
+    resumed_checkpoint.reset()
+    assert resumed_checkpoint.get_split_progress() == (0, 0)
+    assert resumed_checkpoint.get_tokens() == 0
@@ -0,0 +1,185 @@
+import queue
+import threading
+from collections import deque
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.indexing_checkpoint import IndexingCheckpoint
+from core.indexing_runner import IndexingRunner
+from core.rag.models.document import Document
+from tests.unit_tests.core.test_indexing_checkpoint import FakeRedis
+
+
+def _build_index_processor(segments_per_text_doc: int) -> MagicMock:
+    index_processor = MagicMock()
+    index_processor.transform.side_effect = lambda text_docs, **kwargs: [
+        Document(page_content=f'{text_doc.page_content}-{i}', metadata={'doc_id': f'{text_doc.page_content}-{i}'})
+        for text_doc in text_docs for i in range(segments_per_text_doc)
+    ]
+    return index_processor
+
+
+def _split_in_batches(text_doc_count: int, document_batches: queue.Queue, stop_event: threading.Event):
+    IndexingRunner()._split_in_batches(
+        flask_app=MagicMock(),
+        index_processor=_build_index_processor(segments_per_text_doc=3),
+        text_docs=deque(Document(page_content=str(i)) for i in range(text_doc_count)),
+        embedding_model_instance=None,
+        process_rule={'mode': 'automatic'},
+        tenant_id='tenant-id',
+        doc_language='English',
+        document_batches=document_batches,
+        stop_event=stop_event,
+        split_result={}
+    )
+
+
+@patch('core.indexing_runner.INDEXING_STREAMING_BATCH_SIZE', 4)
+def test_split_in_batches_applies_backpressure():
+    document_batches = queue.Queue(maxsize=2)
+    stop_event = threading.Event()
+    split_thread = threading.Thread(target=_split_in_batches, args=(10, document_batches, stop_event))
+    split_thread.start()
+
+    # the producer blocks on the bounded queue until the consumer catches up
+    split_thread.join(0.5)
+    assert split_thread.is_alive()
+    assert document_batches.qsize() == 2
+
+    batches = []
+    split_text_docs = []
+    while True:
+        item = document_batches.get(timeout=5)
+        if item is None:
+            break
+        batches.append(item[0])
+        split_text_docs.append(item[1:])
+    split_thread.join(5)
+
+    assert [len(batch) for batch in batches] == [4] * 7 + [2]
+    assert [document.page_content for document in batches[0]] == ['0-0', '0-1', '0-2', '1-0']
+    # a text document is checkpointed with its documents once all of its 3 documents are put
+    assert split_text_docs == [(1, 3), (2, 6), (4, 12), (5, 15), (6, 18), (8, 24), (9, 27), (10, 30)]
+
+
+@patch('core.indexing_runner.INDEXING_STREAMING_BATCH_SIZE', 4)
+def test_split_in_batches_stops_with_consumer():
+    document_batches = queue.Queue(maxsize=1)
+    stop_event = threading.Event()
+    split_thread = threading.Thread(target=_split_in_batches, args=(100, document_batches, stop_event))
+    split_thread.start()
+
+    document_batches.get(timeout=5)
+    # the consumer failed, the producer stops without filling the queue forever
+    stop_event.set()
+    split_thread.join(5)
+    assert not split_thread.is_alive()
+
+
+@pytest.mark.parametrize('error', [ValueError('extract failed')])
+def test_split_in_batches_forwards_errors(error: Exception):
+    document_batches = queue.Queue(maxsize=1)
+    runner = IndexingRunner()
+    index_processor = MagicMock()
+    index_processor.transform.side_effect = error
+
+    runner._split_in_batches(
+        flask_app=MagicMock(),
+        index_processor=index_processor,
+        text_docs=deque([Document(page_content='text')]),
+        embedding_model_instance=None,
+        process_rule={'mode': 'automatic'},
+        tenant_id='tenant-id',
+        doc_language='English',
+        document_batches=document_batches,
+        stop_event=threading.Event(),
+        split_result={}
+    )
+
+    assert document_batches.get_nowait() is error
+
+
+class FakeDocumentStore:
+    """
+    Saved segments of a document, with increasing positions.
+    """
+
+    def __init__(self):
+        self.segments: list[dict] = []
+
+    def add_documents(self, documents: list[Document]) -> None:
+        position = max([segment['position'] for segment in self.segments], default=0)
+        for document in documents:
+            position += 1
+            self.segments.append({'content': document.page_content, 'position': position, 'completed': False})
+
+
+@patch('core.indexing_runner.INDEXING_STREAMING_BATCH_SIZE', 4)
+@patch('core.indexing_checkpoint.redis_client', new_callable=FakeRedis)
+def test_streaming_pipeline_resumes_without_duplicates(redis_client):
+    runner = IndexingRunner()
+    doc_store = FakeDocumentStore()
+    dataset_document = MagicMock(id='document-id')
+    text_docs = [Document(page_content=name) for name in ['A', 'B', 'C']]
+    loaded_documents = []
+    deleted_positions = []
+    process_keyword_index = MagicMock()
+    keyword = MagicMock()
+
+    def load_batch(index_processor, dataset, dataset_document, documents):
+        if not documents:
+            return
+        # interrupted while loading the second batch
+        if not resume and loaded_documents:
+            raise RuntimeError('worker lost')
+        contents = [document.page_content for document in documents]
+        loaded_documents.extend(contents)
+        for segment in doc_store.segments:
+            if segment['content'] in contents:
+                segment['completed'] = True
+
+    def delete_segments_after(index_processor, dataset, dataset_document, position):
+        deleted_positions.append(position)
+        doc_store.segments = [segment for segment in doc_store.segments if segment['position'] <= position]
+
+    def get_pending_documents(dataset_document):
+        return [Document(page_content=segment['content']) for segment in doc_store.segments
+                if not segment['completed']]
+
+    with patch('core.indexing_runner.current_app', MagicMock()), \
+            patch('core.indexing_runner.db'), \
+            patch('core.indexing_runner.DocumentSegment'), \
+            patch('core.indexing_runner.DatasetDocumentStore', return_value=doc_store), \
+            patch.object(runner, '_extract', return_value=text_docs), \
+            patch.object(runner, '_extract_text_docs', return_value=text_docs), \
+            patch.object(runner, '_get_embedding_model_instance', return_value=None), \
+            patch.object(runner, '_update_document_index_status'), \
+            patch.object(runner, '_get_pending_documents', side_effect=get_pending_documents), \
+            patch.object(runner, '_delete_segments_after', side_effect=delete_segments_after), \
+            patch.object(runner, '_process_keyword_index', process_keyword_index), \
+            patch('core.indexing_runner.Keyword', keyword), \
+            patch.object(runner, '_load_chunks', side_effect=load_batch):
+        resume = False
+        with pytest.raises(RuntimeError):
+            runner._run_streaming_pipeline(_build_index_processor(segments_per_text_doc=3), MagicMock(),
+                                           dataset_document, MagicMock())
+
+        # batches ['A-0', 'A-1', 'A-2', 'B-0'] and ['B-1', 'B-2', 'C-0', 'C-1'] are saved, C is not completely split
+        assert IndexingCheckpoint('document-id').get_split_progress() == (2, 6)
+
+        resume = True
+        runner._run_streaming_pipeline(_build_index_processor(segments_per_text_doc=3), MagicMock(),
+                                       dataset_document, MagicMock(), resume=True)
+
+    # C-0 and C-1 saved after the checkpoint are deleted and split again with C
+    assert deleted_positions == [6]
+    assert [segment['content'] for segment in doc_store.segments] == [
+        'A-0', 'A-1', 'A-2', 'B-0', 'B-1', 'B-2', 'C-0', 'C-1', 'C-2'
+    ]
+    assert [segment['position'] for segment in doc_store.segments] == list(range(1, 10))
+    assert all(segment['completed'] for segment in doc_store.segments)
+    assert sorted(loaded_documents) == sorted(segment['content'] for segment in doc_store.segments)
+    # keywords are added per batch, the keyword index of the document is completed once by the finished run
+    assert all(call.kwargs == {'in_batches': True} for call in process_keyword_index.call_args_list)
+    keyword.return_value.complete_document.assert_called_once_with('document-id')
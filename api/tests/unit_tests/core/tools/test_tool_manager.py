@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+
+from core.tools.tool_manager import ToolManager
+
+# uses one provider of each kind in a fresh interpreter, and prints which providers are loaded
+STARTUP_SCRIPT = '''
+import json
+from core.tools.tool_manager import ToolManager
+from core.model_runtime.model_providers import model_provider_factory
+ToolManager.get_tool_label('google_search')
+ToolManager.get_builtin_provider('google')
+model_provider_factory.get_provider_instance('openai')
+print(json.dumps({
+    'tool_providers': sorted(ToolManager._builtin_providers),
+    'model_providers': sorted(model_provider_factory._model_provider_extensions),
+}))
+'''
+
+
+def test_tool_label_from_manifest():
+    label = ToolManager.get_tool_label('google_search')
+
+    assert label.en_US == 'GoogleSearch'
+    assert ToolManager.get_tool_label('not_a_tool') is None
+
+
+def test_manifest_lists_builtin_providers():
+    manifest = ToolManager.build_builtin_providers_manifest()
+
+    assert 'google_search' in manifest['providers']['google']
+    assert not any(provider.startswith('__') for provider in manifest['providers'])
+
+
+def test_startup_loads_providers_on_first_use():
+    result = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], capture_output=True, text=True,
+                            cwd=os.path.join(os.path.dirname(__file__), '../../../..'), check=True)
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+
+    # only the providers used are loaded
+    assert loaded['tool_providers'] == ['google']
+    assert loaded['model_providers'] == ['openai']
@@ -0,0 +1,42 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from core.entities.provider_entities import QuotaUnit
+from core.model_runtime.entities.llm_entities import LLMUsage
+from core.workflow.nodes.llm.llm_node import LLMNode
+from models.provider import ProviderQuotaType, ProviderType
+
+
+def _mock_model_instance() -> MagicMock:
+    quota_configuration = MagicMock(quota_type=ProviderQuotaType.TRIAL, quota_unit=QuotaUnit.TIMES, quota_limit=10)
+    model_instance = MagicMock()
+    model_instance.provider = 'openai'
+    model_instance.model = 'gpt-3.5-turbo'
+    configuration = model_instance.provider_model_bundle.configuration
+    configuration.using_provider_type = ProviderType.SYSTEM
+    configuration.system_configuration.current_quota_type = ProviderQuotaType.TRIAL
+    configuration.system_configuration.quota_configurations = [quota_configuration]
+    return model_instance
+
+
+@pytest.mark.parametrize(('quota', 'invalidated'), [
+    (MagicMock(quota_used=9, quota_limit=10), False),
+    # this deduction exhausted the quota
+    (MagicMock(quota_used=10, quota_limit=10), True),
+    # the quota was exhausted before, nothing was deducted
+    (None, True),
+])
+def test_deduct_llm_quota_invalidates_cache_when_exhausted(quota, invalidated: bool):
+    with patch('core.workflow.nodes.llm.llm_node.db') as db, \
+            patch('core.workflow.nodes.llm.llm_node.ProviderConfigurationsCache') as provider_configurations_cache:
+        db.session.execute.return_value.first.return_value = quota
+        LLMNode.deduct_llm_quota('tenant', _mock_model_instance(), LLMUsage.empty_usage())
+
+    # deducted and read back in one statement
+    statement = db.session.execute.call_args.args[0]
+    compiled = str(statement.compile(dialect=postgresql.dialect()))
+    assert 'RETURNING providers.quota_used, providers.quota_limit' in compiled
+    db.session.commit.assert_called_once()
+    assert provider_configurations_cache.invalidate.called == invalidated
@@ -0,0 +1,129 @@
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+from core.workflow.entities.base_node_data_entities import BaseNodeData
+from core.workflow.entities.node_entities import NodeRunResult, NodeType
+from core.workflow.entities.variable_pool import VariablePool
+from core.workflow.entities.workflow_graph import WorkflowGraphCache
+from core.workflow.nodes.base_node import BaseNode, UserFrom
+from core.workflow.workflow_engine_manager import WorkflowEngineManager, node_classes
+from extensions.ext_database import db
+from models.workflow import WorkflowNodeExecutionStatus
+
+# parallel branch nodes which wait for each other, only pass when the branches run concurrently
+parallel_branches_barrier = threading.Barrier(2)
+
+
+class BranchNodeData(BaseNodeData):
+    wait_parallel_branches: bool = False
+    source_handle: str = None
+
+
+class BranchNode(BaseNode):
+    _node_data_cls = BranchNodeData
+    node_type = NodeType.HTTP_REQUEST
+
+    def _run(self, variable_pool: VariablePool) -> NodeRunResult:
+        if self.node_data.wait_parallel_branches:
+            # broken if the other branch does not run meanwhile
+            parallel_branches_barrier.wait(timeout=10)
+        return NodeRunResult(
+            status=WorkflowNodeExecutionStatus.SUCCEEDED,
+            outputs={'result': self.node_id},
+            edge_source_handle=self.node_data.source_handle
+        )
+
+    @classmethod
+    def _extract_variable_selector_to_variable_mapping(cls, node_data: BaseNodeData) -> dict[str, list[str]]:
+        return {}
+
+
+def _run_workflow(graph: dict) -> MagicMock:
+    WorkflowGraphCache.clear()
+
+    workflow = MagicMock()
+    workflow.id = 'workflow'
+    workflow.version = 'draft'
+    workflow.type = 'workflow'
+    workflow.graph = json.dumps(graph)
+    workflow.graph_dict = graph
+
+    # Mock db.session.close()
+    db.session.close = MagicMock()
+
+    callback = MagicMock()
+    with patch.dict(node_classes, {NodeType.HTTP_REQUEST: BranchNode}):
+        WorkflowEngineManager().run_workflow(
+            workflow=workflow,
+            user_id='1',
+            user_from=UserFrom.ACCOUNT,
+            user_inputs={},
+            system_inputs={},
+            callbacks=[callback]
+        )
+
+    return callback
+
+
+def _node(node_id: str, node_type: str, **data) -> dict:
+    return {'id': node_id, 'data': {'title': node_id, 'type': node_type, **data}}
+
+
+def test_run_parallel_branches():
+    graph = {
+        'nodes': [
+            _node('start', 'start'),
+            _node('http1', 'http-request', wait_parallel_branches=True),
+            _node('http2', 'http-request', wait_parallel_branches=True),
+            _node('end', 'end', outputs=[
+                {'variable': 'a', 'value_selector': ['http1', 'result']},
+                {'variable': 'b', 'value_selector': ['http2', 'result']},
+            ]),
+        ],
+        'edges': [
+            {'source': 'start', 'target': 'http1'},
+            {'source': 'start', 'target': 'http2'},
+            {'source': 'http1', 'target': 'end'},
+            {'source': 'http2', 'target': 'end'},
+        ]
+    }
+
+    parallel_branches_barrier.reset()
+    callback = _run_workflow(graph)
+
+    # both branches passed the barrier, so they ran concurrently
+    assert not parallel_branches_barrier.broken
+    callback.on_workflow_run_succeeded.assert_called_once()
+
+    started_node_ids = [c.kwargs['node_id'] for c in callback.on_workflow_node_execute_started.call_args_list]
+    assert sorted(started_node_ids) == ['end', 'http1', 'http2', 'start']
+    assert started_node_ids[-1] == 'end'
+
+    end_outputs = callback.on_workflow_node_execute_succeeded.call_args_list[-1].kwargs['outputs']
+    assert end_outputs == {'a': 'http1', 'b': 'http2'}
+
+
+def test_run_skips_untaken_branch():
+    graph = {
+        'nodes': [
+            _node('start', 'start'),
+            _node('router', 'http-request', source_handle='true'),
+            _node('yes', 'http-request'),
+            _node('no', 'http-request'),
+            _node('end', 'end', outputs=[]),
+        ],
+        'edges': [
+            {'source': 'start', 'target': 'router'},
+            {'source': 'router', 'sourceHandle': 'true', 'target': 'yes'},
+            {'source': 'router', 'sourceHandle': 'false', 'target': 'no'},
+            {'source': 'yes', 'target': 'end'},
+            {'source': 'no', 'target': 'end'},
+        ]
+    }
+
+    callback = _run_workflow(graph)
+
+    callback.on_workflow_run_succeeded.assert_called_once()
+    started_node_ids = [c.kwargs['node_id'] for c in callback.on_workflow_node_execute_started.call_args_list]
+    assert started_node_ids == ['start', 'router', 'yes', 'end']
@@ -0,0 +1,79 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.workflow.entities.node_entities import NodeType
+from core.workflow.entities.workflow_graph import WorkflowGraph, WorkflowGraphCache
+from core.workflow.workflow_engine_manager import node_classes
+
+graph = {
+    'nodes': [
+        {'id': 'start', 'data': {'type': 'start', 'title': 'Start'}},
+        {'id': 'if-else', 'data': {'type': 'if-else', 'title': 'IF/ELSE'}},
+        {'id': 'llm', 'data': {'type': 'llm', 'title': 'LLM'}},
+        {'id': 'end', 'data': {'type': 'end', 'title': 'End'}},
+    ],
+    'edges': [
+        {'id': '1', 'source': 'start', 'target': 'if-else'},
+        {'id': '2', 'source': 'if-else', 'sourceHandle': 'true', 'target': 'llm'},
+        {'id': '3', 'source': 'if-else', 'sourceHandle': 'false', 'target': 'end'},
+        {'id': '4', 'source': 'llm', 'target': 'end'},
+    ]
+}
+
+
+def test_workflow_graph_index():
+    workflow_graph = WorkflowGraph(graph=graph, node_classes=node_classes)
+
+    assert workflow_graph.start_node_id == 'start'
+    assert workflow_graph.get_node_type('llm') == NodeType.LLM
+    assert workflow_graph.get_node_class('end') == node_classes[NodeType.END]
+    assert workflow_graph.get_node_config('missing') is None
+
+    assert [edge['target'] for edge in workflow_graph.get_outgoing_edges('if-else')] == ['llm', 'end']
+    assert workflow_graph.get_outgoing_edges('end') == ()
+    assert len(workflow_graph.get_incoming_edges('end')) == 2
+
+    assert workflow_graph.get_upstream_edge_count('start') == 0
+    assert workflow_graph.get_upstream_edge_count('end') == 2
+
+
+def test_workflow_graph_unreachable_upstream():
+    workflow_graph = WorkflowGraph(graph={
+        'nodes': graph['nodes'] + [{'id': 'orphan', 'data': {'type': 'llm', 'title': 'Orphan'}}],
+        'edges': graph['edges'] + [{'id': '5', 'source': 'orphan', 'target': 'end'}],
+    }, node_classes=node_classes)
+
+    # edges from nodes unreachable from start node are never resolved
+    assert len(workflow_graph.get_incoming_edges('end')) == 3
+    assert workflow_graph.get_upstream_edge_count('end') == 2
+    assert workflow_graph.get_upstream_edge_count('orphan') == 0
+
+
+def test_workflow_graph_invalid():
+    with pytest.raises(ValueError):
+        WorkflowGraph(graph={'nodes': []}, node_classes=node_classes)
+
+    with pytest.raises(ValueError):
+        WorkflowGraph(graph={'nodes': {}, 'edges': []}, node_classes=node_classes)
+
+
+def test_workflow_graph_cache():
+    WorkflowGraphCache.clear()
+
+    workflow = MagicMock()
+    workflow.id = 'workflow'
+    workflow.version = 'draft'
+    workflow.graph = json.dumps(graph)
+    workflow.graph_dict = graph
+
+    first = WorkflowGraphCache.get(workflow=workflow, node_classes=node_classes)
+    assert WorkflowGraphCache.get(workflow=workflow, node_classes=node_classes) is first
+
+    # draft graph updated in place
+    workflow.graph = json.dumps({**graph, 'edges': []})
+    workflow.graph_dict = {**graph, 'edges': []}
+    second = WorkflowGraphCache.get(workflow=workflow, node_classes=node_classes)
+    assert second is not first
+    assert second.get_outgoing_edges('start') == ()
@@ -0,0 +1,80 @@
+import base64
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.helper import encrypter
+from libs import rsa
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+class FakeStorage:
+    def __init__(self):
+        self.files = {}
+
+    def save(self, filename, data):
+        self.files[filename] = data
+
+    def load(self, filename):
+        if filename not in self.files:
+            raise FileNotFoundError(filename)
+        return self.files[filename]
+
+
+@pytest.fixture
+def storage():
+    storage = FakeStorage()
+    with patch.object(rsa, 'redis_client', FakeRedis()), patch.object(rsa, 'storage', storage):
+        rsa._decoding_cache.clear()
+        yield storage
+
+
+def test_private_key_imported_once(storage):
+    public_key = rsa.generate_key_pair('tenant')
+    encrypted_texts = [rsa.encrypt('secret', public_key), rsa.encrypt('another secret', public_key)]
+
+    with patch.object(rsa.RSA, 'import_key', wraps=rsa.RSA.import_key) as import_key:
+        assert rsa.decrypt(encrypted_texts[0], 'tenant') == 'secret'
+        assert rsa.decrypt(encrypted_texts[1], 'tenant') == 'another secret'
+
+    assert import_key.call_count == 1
+
+
+def test_key_pair_reset_by_another_process(storage):
+    public_key = rsa.generate_key_pair('tenant')
+    assert rsa.decrypt(rsa.encrypt('secret', public_key), 'tenant') == 'secret'
+
+    # reset the key pair in another process, the private key stays cached in this process
+    cached_decoding = rsa._decoding_cache['tenant']
+    new_public_key = rsa.generate_key_pair('tenant')
+    rsa._decoding_cache['tenant'] = cached_decoding
+
+    assert rsa.decrypt(rsa.encrypt('new secret', new_public_key), 'tenant') == 'new secret'
+    with pytest.raises(ValueError):
+        rsa.decrypt(rsa.encrypt('secret', public_key), 'tenant')
+
+
+def test_decrypted_token_cached():
+    token = base64.b64encode(b'encrypted').decode()
+    decrypt = MagicMock(return_value='secret')
+
+    with patch.object(rsa, 'decrypt', decrypt):
+        encrypter._decrypted_token_cache.clear()
+        assert encrypter.decrypt_token('tenant', token) == 'secret'
+        assert encrypter.batch_decrypt_token('tenant', [token]) == ['secret']
+        assert encrypter.decrypt_token('other tenant', token) == 'secret'
+
+    assert decrypt.call_count == 2
@@ -0,0 +1,61 @@
+from unittest.mock import MagicMock, patch
+
+from tasks.batch_create_segment_to_index_task import batch_create_segment_to_index_task
+
+
+@patch('tasks.batch_create_segment_to_index_task.SEGMENT_BATCH_IMPORT_BATCH_SIZE', 4)
+@patch('tasks.batch_create_segment_to_index_task.VectorService')
+@patch('tasks.batch_create_segment_to_index_task.redis_client')
+@patch('tasks.batch_create_segment_to_index_task.db')
+def test_segments_are_created_in_bulk(db, redis_client, vector_service):
+    dataset = MagicMock(indexing_technique='economy')
+    dataset_document = MagicMock(id='document-id', enabled=True, archived=False, indexing_status='completed',
+                                 doc_form='text_model')
+    db.session.query.return_value.filter.return_value.first.side_effect = [dataset, dataset_document]
+    db.session.query.return_value.filter.return_value.scalar.return_value = 5
+
+    content = [{'content': 'segment {}'.format(i)} for i in range(10)]
+    batch_create_segment_to_index_task('job-id', content, 'dataset-id', 'document-id', 'tenant-id', 'user-id')
+
+    # positions are allocated once, rows are inserted and indexed per batch
+    assert db.session.query.return_value.filter.return_value.scalar.call_count == 1
+    inserted = [call.args[1] for call in db.session.bulk_insert_mappings.call_args_list]
+    assert [len(mappings) for mappings in inserted] == [4, 4, 2]
+    assert [mapping['position'] for mappings in inserted for mapping in mappings] == list(range(6, 16))
+    assert [len(call.args[1]) for call in vector_service.create_segments_vector.call_args_list] == [4, 4, 2]
+
+    statuses = [call.args[2] for call in redis_client.setex.call_args_list]
+    assert statuses == ['processing:4/10', 'processing:8/10', 'processing:10/10', 'completed']
+
+
+@patch('tasks.batch_create_segment_to_index_task.SEGMENT_BATCH_IMPORT_BATCH_SIZE', 4)
+@patch('tasks.batch_create_segment_to_index_task.IndexProcessorFactory')
+@patch('tasks.batch_create_segment_to_index_task.VectorService')
+@patch('tasks.batch_create_segment_to_index_task.redis_client')
+@patch('tasks.batch_create_segment_to_index_task.db')
+def test_failed_import_deletes_created_segments(db, redis_client, vector_service, index_processor_factory):
+    dataset = MagicMock(indexing_technique='economy')
+    dataset_document = MagicMock(id='document-id', enabled=True, archived=False, indexing_status='completed',
+                                 doc_form='text_model')
+    db.session.query.return_value.filter.return_value.first.side_effect = [dataset, dataset_document]
+    db.session.query.return_value.filter.return_value.scalar.return_value = 0
+    # the last batch fails to be indexed
+    vector_service.create_segments_vector.side_effect = [None, None, Exception('vector store is down')]
+
+    content = [{'content': 'segment {}'.format(i)} for i in range(10)]
+    batch_create_segment_to_index_task('job-id', content, 'dataset-id', 'document-id', 'tenant-id', 'user-id')
+
+    inserted = [mapping for call in db.session.bulk_insert_mappings.call_args_list for mapping in call.args[1]]
+    # the index of every batch is cleaned, including the failed one which may be partially indexed
+    index_processor = index_processor_factory.return_value.init_index_processor.return_value
+    index_processor.clean.assert_called_once_with(dataset, [mapping['index_node_id'] for mapping in inserted])
+    # the committed batches are deleted
+    deleted_ids = [criterion.right.value
+                   for call in db.session.query.return_value.filter.call_args_list[-2:]
+                   for criterion in call.args]
+    assert deleted_ids == [[mapping['id'] for mapping in inserted[:4]], [mapping['id'] for mapping in inserted[4:8]]]
+    assert db.session.query.return_value.filter.return_value.delete.call_count == 2
+    db.session.rollback.assert_called_once()
+
+    statuses = [call.args[2] for call in redis_client.setex.call_args_list]
+    assert statuses == ['processing:4/10', 'processing:8/10', 'error']
@@ -0,0 +1,5 @@
+#!/bin/bash
+set -x
+
+# benchmarks print their reports, they are not part of the unit tests
+pytest -s api/tests/benchmarks